@@ -0,0 +1,471 @@
+"""
+可复现的负载测试
+
+在本地依次启动:
+    模拟模型服务  bench.mock_llm，各模型的上游地址通过 MODEL_CONFIGS_OVERRIDE 指向它
+    Redis         默认使用 fakeredis 的TCP服务（--redis fake），也可指定本地Redis（--redis host:port）
+    翻译服务      uvicorn main:app，以子进程运行
+
+然后以固定并发的闭环方式驱动 /translate、/translate/text-stream、/trans-word 和 /ocr（按 --mix 的权重混合）。
+片段数与文本长度服从对数正态分布，文本从固定的文本池中按Zipf分布抽取，以模拟真实页面中的重复内容；
+相同的 --seed 生成相同的请求序列。
+
+--paragraph-sentences 开启段落模式（片段由共享的句子组成），--text-noise 让部分片段只在空白或HTML实体上不同，
+用于衡量文本规范化与按句拆分（SENTENCE_SPLIT_ENABLED）对缓存命中的影响。
+
+输出JSON结果（吞吐量、p50/p95/p99延迟、错误数、上游调用次数与原文字符数、缓存命中率），
+可通过 --compare 与另一次运行的结果对比，例如比较两个提交:
+    python -m bench.load --output base.json
+    git checkout <新提交>
+    python -m bench.load --output new.json --compare base.json
+或比较同一提交的两种配置:
+    python -m bench.load --paragraph-sentences 4 --text-noise 0.2 --env TEXT_NORMALIZE_ENABLED=false --output before.json
+    python -m bench.load --paragraph-sentences 4 --text-noise 0.2 --env SENTENCE_SPLIT_ENABLED=true --compare before.json
+
+用法:
+    python -m bench.load [--requests 500] [--concurrency 16] [--mix translate=8,trans-word=2]
+                         [--latency-ms 300] [--error-rate 0.01] [--max-concurrency 64]
+                         [--env BATCH_SCHEDULER_ENABLED=true] [--output result.json] [--compare base.json]
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+
+# 生成文本使用的词表
+VOCABULARY = (
+    "the page content translation service model cache request response latency browser extension "
+    "user text paragraph sentence word image button menu settings account profile search result "
+    "article title author date comment share download upload network server client error message"
+).split()
+
+# 各场景对应的接口
+SCENARIOS = ("translate", "text-stream", "trans-word", "ocr")
+
+def free_port() -> int:
+    """
+    获取一个空闲的本地端口
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """
+    计算百分位数（最近秩法）
+    
+    Args:
+        values: 样本列表
+        fraction: 百分位，取值0-1
+        
+    Returns:
+        对应的样本值，没有样本时返回None
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def lognormal_int(rng: random.Random, median: float, sigma: float, low: int, high: int) -> int:
+    """
+    按对数正态分布抽取整数并截断到 [low, high]
+    """
+    return max(low, min(high, int(round(rng.lognormvariate(0, sigma) * median))))
+
+class Workload:
+    """
+    请求生成器：文本池与各场景的请求体，同一种子生成相同的序列
+    """
+    
+    def __init__(self, args: argparse.Namespace):
+        """
+        生成文本池、单词池和图片池
+        
+        Args:
+            args: 命令行参数
+        """
+        self.args = args
+        rng = random.Random(args.seed)
+        self.texts = []
+        for _ in range(args.unique_texts):
+            length = lognormal_int(rng, args.text_chars, 0.8, 5, 1000)
+            words = []
+            while sum(len(word) + 1 for word in words) < length:
+                words.append(rng.choice(VOCABULARY))
+            self.texts.append(" ".join(words).capitalize() + ".")
+        self.words = sorted(set(VOCABULARY))
+        # Zipf分布：第k个文本被抽中的权重为 1/k^s
+        self.text_weights = [1 / (rank ** args.zipf) for rank in range(1, len(self.texts) + 1)]
+        if args.paragraph_sentences:
+            # 段落模式：文本池改为由句子池中的句子（按Zipf分布抽取）组成的段落，不同段落之间共享部分句子
+            self.texts = [
+                " ".join(rng.choices(self.texts, self.text_weights, k=lognormal_int(rng, args.paragraph_sentences, 0.6, 1, 50)))
+                for _ in range(args.unique_texts)
+            ]
+        self.images = [self._make_image(index) for index in range(args.ocr_images)] if args.mix.get("ocr") else []
+        self.scenarios = [name for name in SCENARIOS if args.mix.get(name)]
+        self.scenario_weights = [args.mix[name] for name in self.scenarios]
+    
+    def _make_image(self, index: int) -> bytes:
+        """
+        生成包含若干行文本的PNG图片
+        """
+        from PIL import Image, ImageDraw
+        lines = 3 + index % 6
+        image = Image.new("RGB", (800, 40 * lines + 40), "white")
+        draw = ImageDraw.Draw(image)
+        for line in range(lines):
+            draw.text((20, 20 + line * 40), self.texts[(index * 7 + line) % len(self.texts)][:60], fill="black")
+        buffer = io.BytesIO()
+        image.save(buffer, "PNG")
+        return buffer.getvalue()
+    
+    def _perturb(self, rng: random.Random, text: str) -> str:
+        """
+        按 --text-noise 的概率改变文本的格式（多余空白、换行或HTML实体），不改变其内容
+        """
+        if rng.random() >= self.args.text_noise or " " not in text:
+            return text
+        position = rng.choice([index for index, char in enumerate(text) if char == " "])
+        return text[:position] + rng.choice(("  ", "\n", "&nbsp;", " \t")) + text[position + 1:]
+    
+    def next_request(self, rng: random.Random) -> Tuple[str, Dict[str, Any]]:
+        """
+        生成下一个请求
+        
+        Args:
+            rng: 工作协程自己的随机数生成器
+            
+        Returns:
+            (场景名称, httpx请求参数)
+        """
+        scenario = rng.choices(self.scenarios, self.scenario_weights)[0]
+        if scenario == "translate":
+            count = lognormal_int(rng, self.args.segments, 0.9, 1, 500)
+            texts = [self._perturb(rng, text) for text in rng.choices(self.texts, self.text_weights, k=count)]
+            body = {
+                "target": self.args.target,
+                "segments": [{"id": str(index), "text": text, "model": self.args.model} for index, text in enumerate(texts)]
+            }
+            if self.args.extra_args:
+                body["extra_args"] = self.args.extra_args
+            return scenario, {"url": "/translate", "json": body}
+        if scenario == "text-stream":
+            text = self._perturb(rng, rng.choices(self.texts, self.text_weights)[0])
+            body = {"target": self.args.target, "text": text, "model": self.args.model}
+            if self.args.extra_args:
+                body["extra_args"] = self.args.extra_args
+            return scenario, {"url": "/translate/text-stream", "json": body}
+        if scenario == "trans-word":
+            words = rng.sample(self.words, rng.randint(1, 3))
+            body = {
+                "target": self.args.target,
+                "model": self.args.model,
+                "word": [{"id": str(index), "word": word} for index, word in enumerate(words)]
+            }
+            return scenario, {"url": "/trans-word", "json": body}
+        image = rng.choice(self.images)
+        return scenario, {"url": "/ocr", "files": {"image": ("page.png", image, "image/png")}}
+
+def count_errors(scenario: str, response: httpx.Response) -> int:
+    """
+    统计一个响应中的错误：非200视为整个请求失败，翻译接口中以“翻译错误”开头的片段各计一次
+    """
+    if response.status_code != 200:
+        return 1
+    if scenario == "translate":
+        return sum(1 for segment in response.json()["segments"] if segment["text"].startswith("翻译错误"))
+    if scenario == "text-stream":
+        return int(response.text.startswith("翻译错误"))
+    if scenario == "trans-word":
+        return sum(1 for word in response.json()["translated_word"] if word["word"].startswith("翻译错误"))
+    return 0
+
+async def run_load(base_url: str, workload: Workload, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    以固定并发的闭环方式发送请求
+    
+    Returns:
+        各场景的请求数、错误数、延迟分位数与吞吐量
+    """
+    latencies: Dict[str, List[float]] = {name: [] for name in workload.scenarios}
+    errors: Dict[str, int] = {name: 0 for name in workload.scenarios}
+    failed_requests: Dict[str, int] = {name: 0 for name in workload.scenarios}
+    items: Dict[str, int] = {name: 0 for name in workload.scenarios}
+    counter = iter(range(args.requests))
+    
+    async def worker(index: int, client: httpx.AsyncClient) -> None:
+        rng = random.Random(args.seed * 1000 + index)
+        for _ in counter:
+            scenario, request = workload.next_request(rng)
+            start_time = time.perf_counter()
+            try:
+                response = await client.post(**request)
+                error_count = count_errors(scenario, response)
+                failed = response.status_code != 200
+            except httpx.HTTPError:
+                error_count, failed = 1, True
+            latencies[scenario].append(time.perf_counter() - start_time)
+            errors[scenario] += error_count
+            failed_requests[scenario] += int(failed)
+            units = request["json"].get("segments") or request["json"].get("word") if "json" in request else None
+            items[scenario] += len(units) if units else 1
+            
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        start_time = time.perf_counter()
+        await asyncio.gather(*[worker(index, client) for index in range(args.concurrency)])
+        elapsed = time.perf_counter() - start_time
+    
+    def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+        return {
+            "p50_ms": round(percentile(values, 0.50) * 1000, 2) if values else None,
+            "p95_ms": round(percentile(values, 0.95) * 1000, 2) if values else None,
+            "p99_ms": round(percentile(values, 0.99) * 1000, 2) if values else None,
+            "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else None
+        }
+        
+    scenarios = {}
+    for name in workload.scenarios:
+        scenarios[name] = {
+            "requests": len(latencies[name]),
+            "failed_requests": failed_requests[name],
+            "errors": errors[name],
+            "items": items[name],
+            "throughput_rps": round(len(latencies[name]) / elapsed, 2),
+            **summarize(latencies[name])
+        }
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(all_latencies) / elapsed, 2),
+        "items_per_second": round(sum(items.values()) / elapsed, 2),
+        **summarize(all_latencies),
+        "scenarios": scenarios
+    }
+
+def cache_summary(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    根据服务的 /stats 计算缓存命中率
+    
+    Args:
+        stats: /stats 返回的统计信息
+        
+    Returns:
+        L1与Redis的命中次数、查询次数和总体命中率
+    """
+    redis_stats = stats["cache"]["redis"]
+    # 翻译结果与OCR结果使用各自的L1缓存，所有查询都先经过其中一个
+    l1_hits = stats["cache"]["l1"]["hits"] + stats["cache"]["ocr_l1"]["hits"]
+    lookups = l1_hits + stats["cache"]["l1"]["misses"] + stats["cache"]["ocr_l1"]["misses"]
+    hits = l1_hits + redis_stats["hits"]
+    return {
+        "lookups": lookups,
+        "l1_hits": l1_hits,
+        "redis_hits": redis_stats["hits"],
+        "redis_errors": redis_stats["errors"],
+        "hit_ratio": round(hits / lookups, 4) if lookups else None
+    }
+
+def start_fake_redis() -> Tuple[str, int, Any]:
+    """
+    在后台线程中启动 fakeredis 的TCP服务
+    
+    Returns:
+        (主机, 端口, 服务对象)
+    """
+    from fakeredis import TcpFakeServer
+    port = free_port()
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return "127.0.0.1", port, server
+
+def wait_until(url: str, timeout: float, accept_503: bool = False) -> None:
+    """
+    轮询接口直到其返回200
+    
+    Args:
+        url: 接口地址
+        timeout: 最长等待时间（秒）
+        accept_503: 是否把503也视为服务已启动（就绪检查接口在OCR预热期间返回503）
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            status = httpx.get(url, timeout=10).status_code
+            if status == 200 or (accept_503 and status == 503):
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"等待 {url} 超时")
+
+def git_revision() -> Optional[str]:
+    """
+    获取当前代码的提交号，有未提交的修改时附加 -dirty
+    """
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return revision + ("-dirty" if dirty else "")
+
+def compare(baseline: Dict[str, Any], result: Dict[str, Any]) -> None:
+    """
+    输出两次运行的主要指标对比
+    """
+    rows = [("throughput_rps", ()), ("items_per_second", ()), ("p50_ms", ()), ("p95_ms", ()), ("p99_ms", ()),
+            ("upstream_calls", ("upstream", "calls")), ("upstream_chars", ("upstream", "source_chars")),
+            ("hit_ratio", ("cache", "hit_ratio"))]
+    for name in result["load"]["scenarios"]:
+        rows += [(f"{name}.p95_ms", ("load", "scenarios", name, "p95_ms")),
+                 (f"{name}.errors", ("load", "scenarios", name, "errors"))]
+    
+    def lookup(data: Dict[str, Any], path: Tuple[str, ...], name: str) -> Any:
+        for key in path or ("load", name):
+            if not isinstance(data, dict) or key not in data:
+                return None
+            data = data[key]
+        return data
+        
+    print(f"{'metric':<24} {baseline.get('revision') or 'baseline':>14} {result.get('revision') or 'current':>14} {'change':>9}")
+    for name, path in rows:
+        old, new = lookup(baseline, path, name), lookup(result, path, name)
+        change = f"{(new - old) / old * 100:+.1f}%" if isinstance(old, (int, float)) and isinstance(new, (int, float)) and old else ""
+        print(f"{name:<24} {str(old):>14} {str(new):>14} {change:>9}")
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """
+    解析场景权重，如 translate=8,trans-word=2
+    """
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"未知场景: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def main() -> None:
+    """
+    解析命令行参数，启动依赖服务并运行负载测试
+    """
+    parser = argparse.ArgumentParser(description="可复现的负载测试")
+    parser.add_argument("--requests", type=int, default=500, help="请求总数")
+    parser.add_argument("--concurrency", type=int, default=16, help="并发客户端数")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("translate=8,trans-word=2"), help="场景权重")
+    parser.add_argument("--seed", type=int, default=42, help="随机数种子")
+    parser.add_argument("--segments", type=float, default=12, help="/translate 每个请求片段数的中位数")
+    parser.add_argument("--text-chars", type=float, default=60, help="文本长度的中位数（字符）")
+    parser.add_argument("--unique-texts", type=int, default=2000, help="文本池大小")
+    parser.add_argument("--zipf", type=float, default=1.1, help="文本抽取的Zipf指数，越大重复越多")
+    parser.add_argument("--paragraph-sentences", type=float, default=0, help="段落模式下每个片段句子数的中位数，0表示每个片段只有一句")
+    parser.add_argument("--text-noise", type=float, default=0.0, help="片段文本被改变格式（空白、HTML实体）的概率")
+    parser.add_argument("--ocr-images", type=int, default=8, help="OCR场景的图片池大小")
+    parser.add_argument("--target", default="中文", help="目标语言")
+    parser.add_argument("--model", default="qwen-turbo-latest", help="请求使用的模型")
+    parser.add_argument("--extra-args", type=json.loads, default=None, help="/translate 与 /translate/text-stream 的 extra_args（JSON）")
+    parser.add_argument("--latency-ms", type=float, default=300, help="模拟模型的延迟中位数（毫秒）")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="模拟模型延迟的对数正态sigma")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模拟模型返回500的概率")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="模拟模型随机返回429的概率")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="模拟模型的并发上限，超过时返回429，0表示不限")
+    parser.add_argument("--redis", default="fake", help="fake 或 host:port")
+    parser.add_argument("--env", action="append", default=[], help="传给翻译服务的环境变量，如 BATCH_SCHEDULER_ENABLED=true")
+    parser.add_argument("--timeout", type=float, default=120, help="单个请求的超时时间（秒）")
+    parser.add_argument("--output", help="结果JSON的保存路径，不指定时输出到标准输出")
+    parser.add_argument("--compare", help="与之对比的历史结果JSON")
+    args = parser.parse_args()
+    
+    mock_port, service_port = free_port(), free_port()
+    env = dict(os.environ)
+    env.update({
+        "MODEL_CONFIGS_OVERRIDE": json.dumps({"*": {"url": f"http://127.0.0.1:{mock_port}/v1/chat/completions"}}),
+        "DEEPSEEK_API_KEY": "bench", "QWEN_API_KEY": "bench", "OPENAI_API_KEY": "bench", "KIMI_API_KEY": "bench",
+        "OCR_ENABLED": "true" if args.mix.get("ocr") else "false",
+        "PYTHONUNBUFFERED": "1"
+    })
+    redis_server = None
+    if args.redis == "fake":
+        host, port, redis_server = start_fake_redis()
+    else:
+        host, _, port = args.redis.partition(":")
+        port = int(port or 6379)
+    env.update({"REDIS_HOST": host, "REDIS_PORT": str(port)})
+    env.update(item.split("=", 1) for item in args.env)
+    
+    mock = subprocess.Popen(
+        [sys.executable, "-m", "bench.mock_llm", "--port", str(mock_port), "--seed", str(args.seed),
+         "--latency-ms", str(args.latency_ms), "--latency-sigma", str(args.latency_sigma),
+         "--error-rate", str(args.error_rate), "--throttle-rate", str(args.throttle_rate),
+         "--max-concurrency", str(args.max_concurrency)]
+    )
+    service_log = tempfile.NamedTemporaryFile(prefix="wistrans-bench-", suffix=".log", delete=False)
+    service = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(service_port), "--log-level", "warning"],
+        env=env, stdout=service_log, stderr=subprocess.STDOUT
+    )
+    base_url = f"http://127.0.0.1:{service_port}"
+    try:
+        wait_until(f"http://127.0.0.1:{mock_port}/mock/stats", 30)
+        wait_until(f"{base_url}/ready", 60, accept_503=True)
+        if args.mix.get("ocr"):
+            # 等待OCR模型预热完成
+            wait_until(f"{base_url}/ready", 600)
+            
+        workload = Workload(args)
+        load = asyncio.run(run_load(base_url, workload, args))
+        stats = httpx.get(f"{base_url}/stats", timeout=10).json()
+        mock_stats = httpx.get(f"http://127.0.0.1:{mock_port}/mock/stats", timeout=10).json()
+    except Exception:
+        print(f"负载测试失败，翻译服务日志: {service_log.name}", file=sys.stderr)
+        raise
+    finally:
+        service_log.close()
+        service.terminate()
+        mock.terminate()
+        service.wait()
+        mock.wait()
+        if redis_server is not None:
+            redis_server.shutdown()
+            
+    result = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "load": load,
+        "upstream": {
+            "calls": mock_stats["calls"],
+            "source_chars": mock_stats["source_chars"],
+            "status": mock_stats["status"],
+            "models": mock_stats["models"],
+            "peak_in_flight": mock_stats["peak_in_flight"],
+            "retries": stats["limits"]["retries"]
+        },
+        "cache": cache_summary(stats)
+    }
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as result_file:
+            result_file.write(output + "\n")
+    else:
+        print(output)
+    os.unlink(service_log.name)
+    
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            compare(json.load(baseline_file), result)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+本地OpenAI兼容模拟模型服务，供负载测试使用（通过 MODEL_CONFIGS_OVERRIDE 把各模型的上游地址指向本服务）
+
+模拟行为:
+    延迟    对数正态分布，中位数 --latency-ms，离散程度 --latency-sigma
+    错误    按 --error-rate 的概率返回500
+    限流    进行中请求数超过 --max-concurrency 时，或按 --throttle-rate 的概率返回429（带 Retry-After）
+    响应    按提示词中的输出格式返回 <translated_text>、<translated_word> 或逐个 <seg id> 的译文，并附带 usage
+
+统计接口:
+    GET  /mock/stats  调用次数、成功翻译的原文字符数、各状态码次数、各模型调用次数、进行中请求数峰值
+    POST /mock/reset  清空统计
+
+用法:
+    python -m bench.mock_llm [--port 9100] [--latency-ms 300] [--error-rate 0.01] [--max-concurrency 64]
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+from collections import Counter
+from typing import Any, Dict
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# 模拟行为配置，由命令行参数覆盖
+CONFIG: Dict[str, Any] = {
+    "latency_ms": 300.0,
+    "latency_sigma": 0.5,
+    "error_rate": 0.0,
+    "throttle_rate": 0.0,
+    "max_concurrency": 0,
+    "retry_after": 1,
+    "seed": 0
+}
+
+# 提示词中输入部分与输出格式说明的分界
+PROMPT_INSTRUCTIONS_MARKER = "请严格按照以下格式输出"
+
+app = FastAPI()
+_random = random.Random(0)
+_state: Dict[str, Any] = {"in_flight": 0, "peak_in_flight": 0, "source_chars": 0, "status": Counter(), "models": Counter()}
+
+def _translate(text: str) -> str:
+    """
+    生成模拟译文（长度与原文相近）
+    """
+    return f"译:{text}"
+
+def _completion(prompt: str) -> str:
+    """
+    按提示词要求的输出格式生成模拟输出
+    
+    Args:
+        prompt: 用户提示词
+        
+    Returns:
+        模型输出内容
+    """
+    source, _, instructions = prompt.partition(PROMPT_INSTRUCTIONS_MARKER)
+    segments = re.findall(r'<seg id="([^"]*)">(.*?)</seg>', source, re.DOTALL)
+    if segments:
+        _state["source_chars"] += sum(len(text) for _, text in segments)
+        return "".join(f'<seg id="{seg_id}">{_translate(text)}</seg>' for seg_id, text in segments)
+    tag = "translated_word" if "<translated_word>" in instructions else "translated_text"
+    text = source.rsplit("：", 1)[-1].strip()
+    _state["source_chars"] += len(text)
+    return f"<{tag}>{_translate(text)}</{tag}>"
+
+def _sse(content: str, usage: dict) -> str:
+    """
+    把完整输出拆成若干数据块，按OpenAI兼容的SSE格式返回
+    """
+    chunks = [content[index:index + 8] for index in range(0, len(content), 8)]
+    lines = [f"data: {json.dumps({'choices': [{'delta': {'content': chunk}}]}, ensure_ascii=False)}\n\n" for chunk in chunks]
+    lines.append(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n")
+    lines.append("data: [DONE]\n\n")
+    return "".join(lines)
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    """
+    OpenAI兼容的 chat/completions 接口
+    """
+    body = await request.json()
+    _state["models"][body.get("model", "")] += 1
+    _state["in_flight"] += 1
+    _state["peak_in_flight"] = max(_state["peak_in_flight"], _state["in_flight"])
+    try:
+        if (CONFIG["max_concurrency"] and _state["in_flight"] > CONFIG["max_concurrency"]) \
+                or _random.random() < CONFIG["throttle_rate"]:
+            _state["status"]["429"] += 1
+            return JSONResponse(status_code=429, content={"error": {"message": "rate limited"}},
+                                headers={"Retry-After": str(CONFIG["retry_after"])})
+                                
+        await asyncio.sleep(_random.lognormvariate(0, CONFIG["latency_sigma"]) * CONFIG["latency_ms"] / 1000)
+        if _random.random() < CONFIG["error_rate"]:
+            _state["status"]["500"] += 1
+            return JSONResponse(status_code=500, content={"error": {"message": "mock error"}})
+            
+        prompt = body["messages"][-1]["content"]
+        content = _completion(prompt)
+        usage = {"prompt_tokens": len(prompt), "completion_tokens": len(content), "total_tokens": len(prompt) + len(content)}
+        _state["status"]["200"] += 1
+        if body.get("stream"):
+            return StreamingResponse(iter([_sse(content, usage)]), media_type="text/event-stream")
+        return {"choices": [{"message": {"role": "assistant", "content": content}}], "usage": usage}
+    finally:
+        _state["in_flight"] -= 1
+
+@app.get("/mock/stats")
+def mock_stats():
+    """
+    模拟服务统计
+    """
+    return {
+        "calls": sum(_state["models"].values()),
+        "source_chars": _state["source_chars"],
+        "status": dict(_state["status"]),
+        "models": dict(_state["models"]),
+        "peak_in_flight": _state["peak_in_flight"]
+    }
+
+@app.post("/mock/reset")
+def mock_reset():
+    """
+    清空统计并按种子重置随机数
+    """
+    _random.seed(CONFIG["seed"])
+    _state.update(in_flight=0, peak_in_flight=0, source_chars=0, status=Counter(), models=Counter())
+    return {"reset": True}
+
+def main() -> None:
+    """
+    解析命令行参数并启动模拟服务
+    """
+    parser = argparse.ArgumentParser(description="本地OpenAI兼容模拟模型服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=CONFIG["latency_ms"], help="延迟中位数（毫秒）")
+    parser.add_argument("--latency-sigma", type=float, default=CONFIG["latency_sigma"], help="对数正态分布的sigma，0表示固定延迟")
+    parser.add_argument("--error-rate", type=float, default=CONFIG["error_rate"], help="返回500的概率")
+    parser.add_argument("--throttle-rate", type=float, default=CONFIG["throttle_rate"], help="随机返回429的概率")
+    parser.add_argument("--max-concurrency", type=int, default=CONFIG["max_concurrency"], help="进行中请求数上限，超过时返回429，0表示不限")
+    parser.add_argument("--retry-after", type=int, default=CONFIG["retry_after"], help="429响应的 Retry-After 秒数")
+    parser.add_argument("--seed", type=int, default=CONFIG["seed"], help="随机数种子")
+    args = parser.parse_args()
+    
+    CONFIG.update(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        max_concurrency=args.max_concurrency,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+    _random.seed(args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
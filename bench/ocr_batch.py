@@ -0,0 +1,80 @@
+"""
+批量OCR吞吐量基准测试
+
+对比同一组图片的两种识别方式（均不经过结果缓存）:
+    single  逐张调用 recognize_image（与 /ocr 相同）
+    batch   整批调用 recognize_images（与 /ocr/batch 相同），流水线每批处理 OCR_PIPELINE_BATCH_SIZE 张图片，
+            识别阶段的裁剪图跨图片组批；设置 OCR_PIPELINE_BATCH_SIZE=1 可得到不跨图片组批时的对照结果
+
+需要安装 PaddleOCR，首次运行会下载模型。
+
+用法:
+    python -m bench.ocr_batch [--images 8] [--lines 6] [--repeat 3]
+"""
+import argparse
+import time
+from typing import List
+import numpy as np
+from PIL import Image, ImageDraw
+from services.ocr_service import recognize_image, recognize_images, OCR_REC_BATCH_SIZE, OCR_PIPELINE_BATCH_SIZE
+
+def make_text_image(index: int, lines: int) -> np.ndarray:
+    """
+    生成包含多行文本的测试图片，模拟网页截图中的文字区域
+    
+    Args:
+        index: 图片序号，用于生成不同的文本
+        lines: 文本行数
+        
+    Returns:
+        RGB图片数组
+    """
+    image = Image.new("RGB", (800, 40 * lines + 40), "white")
+    draw = ImageDraw.Draw(image)
+    for line in range(lines):
+        draw.text((20, 20 + line * 40), f"Sample text {index}-{line}: the quick brown fox", fill="black")
+    return np.asarray(image)
+
+def measure(images: List[np.ndarray], batch: bool, repeat: int) -> float:
+    """
+    测量一种识别方式的吞吐量
+    
+    Args:
+        images: 图片数组列表
+        batch: 是否整批识别
+        repeat: 重复次数
+        
+    Returns:
+        每秒处理的图片数
+    """
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        if batch:
+            recognize_images(images, [(1.0, 1.0)] * len(images))
+        else:
+            for image in images:
+                recognize_image(image)
+    return len(images) * repeat / (time.perf_counter() - start_time)
+
+def main() -> None:
+    """
+    解析命令行参数并输出两种识别方式的吞吐量对比
+    """
+    parser = argparse.ArgumentParser(description="批量OCR吞吐量基准测试")
+    parser.add_argument("--images", type=int, default=8, help="每批图片数")
+    parser.add_argument("--lines", type=int, default=6, help="每张图片的文本行数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数")
+    args = parser.parse_args()
+    
+    images = [make_text_image(index, args.lines) for index in range(args.images)]
+    # 预热：加载模型并完成首次推理的初始化
+    recognize_images(images[:1], [(1.0, 1.0)])
+    
+    single = measure(images, batch=False, repeat=args.repeat)
+    batch = measure(images, batch=True, repeat=args.repeat)
+    print(f"images={args.images} lines={args.lines} pipeline_batch_size={OCR_PIPELINE_BATCH_SIZE} rec_batch_size={OCR_REC_BATCH_SIZE}")
+    print(f"single: {single:.2f} images/s")
+    print(f"batch:  {batch:.2f} images/s ({batch / single:.2f}x)")
+
+if __name__ == "__main__":
+    main()
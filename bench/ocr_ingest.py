@@ -0,0 +1,138 @@
+"""
+OCR图片接入路径基准测试
+
+对比 /ocr 的两种图片接入方式（不包含OCR推理本身）:
+    legacy  上传字节 -> base64编码 -> base64解码 -> PIL解码完整尺寸 -> np.array 复制
+    direct  上传缓冲区 -> load_image（JPEG draft 降采样解码、整数倍缩小到 OCR_MAX_SIDE 以内、np.asarray）
+
+每种方式、每种图片在独立的子进程中运行，以便分别统计峰值内存（ru_maxrss）。
+
+用法:
+    python -m bench.ocr_ingest [--sizes 1024x768,4000x3000] [--formats JPEG,PNG] [--repeat 5]
+"""
+import argparse
+import base64
+import io
+import json
+import resource
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+import numpy as np
+from PIL import Image
+
+def make_image(width: int, height: int, image_format: str) -> bytes:
+    """
+    生成带有噪声纹理的测试图片（纯色图片压缩后过小，不能反映真实解码开销）
+    
+    Args:
+        width: 宽度
+        height: 高度
+        image_format: 图片格式，如 JPEG、PNG
+        
+    Returns:
+        编码后的图片字节
+    """
+    rng = np.random.default_rng(0)
+    tile = rng.integers(0, 256, size=(256, 256, 3), dtype=np.uint8)
+    pixels = np.tile(tile, (height // 256 + 1, width // 256 + 1, 1))[:height, :width]
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, image_format)
+    return buffer.getvalue()
+
+def ingest_legacy(image_bytes: bytes) -> np.ndarray:
+    """
+    旧的接入路径：base64往返后解码完整尺寸图片
+    """
+    image_base64 = base64.b64encode(image_bytes).decode("utf-8")
+    image = Image.open(io.BytesIO(base64.b64decode(image_base64)))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return np.array(image)
+
+def ingest_direct(image_bytes: bytes) -> np.ndarray:
+    """
+    新的接入路径：直接从缓冲区解码并缩放
+    """
+    from services.ocr_service import load_image
+    return load_image(image_bytes)[0]
+
+INGEST_PATHS = {"legacy": ingest_legacy, "direct": ingest_direct}
+
+def run_worker(path: str, width: int, height: int, image_format: str, repeat: int) -> Dict[str, float]:
+    """
+    在当前进程中执行一种接入方式并统计耗时与峰值内存
+    
+    Args:
+        path: 接入方式名称
+        width: 图片宽度
+        height: 图片高度
+        image_format: 图片格式
+        repeat: 重复次数
+        
+    Returns:
+        平均耗时、每百万像素耗时和峰值内存
+    """
+    image_bytes = make_image(width, height, image_format)
+    ingest = INGEST_PATHS[path]
+    # 预热一次，排除导入模块的开销
+    ingest(image_bytes)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        ingest(image_bytes)
+    seconds = (time.perf_counter() - start_time) / repeat
+    megapixels = width * height / 1e6
+    return {
+        "avg_ms": round(seconds * 1000, 2),
+        "ms_per_megapixel": round(seconds * 1000 / megapixels, 2),
+        # Linux 下 ru_maxrss 的单位为KB
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "baseline_rss_mb": round(baseline_rss / 1024, 1),
+        "input_mb": round(len(image_bytes) / 1024 / 1024, 2)
+    }
+
+def parse_sizes(value: str) -> List[Tuple[int, int]]:
+    """
+    解析形如 1024x768,4000x3000 的尺寸列表
+    """
+    sizes = []
+    for item in value.split(","):
+        width, height = item.lower().split("x")
+        sizes.append((int(width), int(height)))
+    return sizes
+
+def main() -> None:
+    """
+    解析命令行参数，为每种图片和接入方式启动子进程并输出对比结果
+    """
+    parser = argparse.ArgumentParser(description="OCR图片接入路径基准测试")
+    parser.add_argument("--sizes", default="1024x768,2048x1536,4000x3000,6000x4000", help="图片尺寸列表")
+    parser.add_argument("--formats", default="JPEG,PNG", help="图片格式列表")
+    parser.add_argument("--repeat", type=int, default=5, help="每种组合的重复次数")
+    parser.add_argument("--worker", choices=sorted(INGEST_PATHS), help=argparse.SUPPRESS)
+    parser.add_argument("--size", help=argparse.SUPPRESS)
+    parser.add_argument("--format", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.worker:
+        (width, height), = parse_sizes(args.size)
+        print(json.dumps(run_worker(args.worker, width, height, args.format, args.repeat)))
+        return
+        
+    print(f"{'format':<6} {'size':>10} {'input_mb':>9} {'path':<7} {'avg_ms':>9} {'ms/MP':>8} {'peak_rss_mb':>12}")
+    for image_format in args.formats.split(","):
+        for width, height in parse_sizes(args.sizes):
+            for path in ("legacy", "direct"):
+                output = subprocess.run(
+                    [sys.executable, "-m", "bench.ocr_ingest", "--worker", path,
+                     "--size", f"{width}x{height}", "--format", image_format, "--repeat", str(args.repeat)],
+                    check=True, capture_output=True, text=True
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(f"{image_format:<6} {f'{width}x{height}':>10} {result['input_mb']:>9} {path:<7} "
+                      f"{result['avg_ms']:>9} {result['ms_per_megapixel']:>8} {result['peak_rss_mb']:>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+启动耗时与内存基准测试
+
+在独立的子进程中分别以三种模式启动应用（执行 lifespan 启动阶段），统计:
+    import_seconds   导入 main 模块的耗时
+    startup_seconds  lifespan 启动阶段的耗时（此后翻译接口即可提供服务）
+    ready_seconds    从进程开始到 /ready 就绪的耗时（预热模式下包含模型加载）
+    rss_mb           就绪后的常驻内存
+
+模式:
+    translation  OCR_ENABLED=false，只提供翻译服务
+    lazy         OCR_ENABLED=true OCR_WARMUP=false，模型在首次OCR请求时加载
+    warmup       OCR_ENABLED=true OCR_WARMUP=true，启动后在后台预热模型
+
+用法:
+    python -m bench.startup [--modes translation,lazy,warmup] [--timeout 300]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+START_TIME = time.perf_counter()
+
+MODES = {
+    "translation": {"OCR_ENABLED": "false"},
+    "lazy": {"OCR_ENABLED": "true", "OCR_WARMUP": "false"},
+    "warmup": {"OCR_ENABLED": "true", "OCR_WARMUP": "true"}
+}
+
+def current_rss_mb() -> float:
+    """
+    读取当前进程的常驻内存（MB），非Linux系统退化为峰值常驻内存
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+async def run_child(timeout: float) -> dict:
+    """
+    在当前进程中导入应用并执行启动阶段，等待就绪后返回统计结果
+    
+    Args:
+        timeout: 等待OCR预热完成的最长时间（秒）
+        
+    Returns:
+        各阶段耗时与内存
+    """
+    import asyncio
+    import main
+    
+    imported = time.perf_counter()
+    async with main.lifespan(main.app):
+        started = time.perf_counter()
+        while main.ocr_pool.status == "loading" and time.perf_counter() - started < timeout:
+            await asyncio.sleep(0.05)
+        ready = time.perf_counter()
+        return {
+            "import_seconds": round(imported - START_TIME, 3),
+            "startup_seconds": round(started - imported, 3),
+            "ready_seconds": round(ready - START_TIME, 3),
+            "ocr_status": main.ocr_pool.status,
+            "rss_mb": current_rss_mb()
+        }
+
+def main() -> None:
+    """
+    解析命令行参数，为每种模式启动子进程并输出对比结果
+    """
+    parser = argparse.ArgumentParser(description="启动耗时与内存基准测试")
+    parser.add_argument("--modes", default=",".join(MODES), help="要测试的模式列表")
+    parser.add_argument("--timeout", type=float, default=300, help="等待OCR预热完成的最长时间（秒）")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        import asyncio
+        print(json.dumps(asyncio.run(run_child(args.timeout))))
+        return
+        
+    print(f"{'mode':<12} {'import_s':>9} {'startup_s':>10} {'ready_s':>8} {'ocr_status':>11} {'rss_mb':>8}")
+    for mode in args.modes.split(","):
+        env = dict(os.environ, **MODES[mode])
+        output = subprocess.run(
+            [sys.executable, "-m", "bench.startup", "--child", "--timeout", str(args.timeout)],
+            env=env, check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:<12} {result['import_seconds']:>9} {result['startup_seconds']:>10} "
+              f"{result['ready_seconds']:>8} {result['ocr_status']:>11} {result['rss_mb']:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,148 @@
-from fastapi import FastAPI, UploadFile, File
-from utils.schemas import TranslateRequest, TranslateResponse, TranslatedSegment, WordTranslateRequest, WordTranslateResponse, OCRResponse
-from services.model_service import translate_segments, translate_word
-from services.ocr_service import process_image_from_base64
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, Form, Request, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from utils.schemas import Segment, TranslateRequest, TranslateResponse, TranslatedSegment, TextStreamRequest, WordTranslateRequest, WordTranslateResponse, OCRResponse, OCRBatchResponse
+from services.model_service import translate_segments, translate_segments_stream, translate_words, stream_sentence_translation, MODEL_CONFIGS, batch_scheduler, singleflight, provider_router
+from services.translation_memory import translation_memory
+from services.word_dictionary import word_dictionary
+from services.http_client_service import http_client_service
+from services.upstream_limiter import upstream_limiter
+from services.cache_service import cache_service
+from services.metrics_service import metrics_service, MetricsMiddleware
+from services.ocr_service import prepare_image, recognize_image, prepare_images, recognize_images, digest_image, digest_images, process_image, process_images, ocr_pool, OCRQueueFullError, OCR_BATCH_MAX_IMAGES
+from typing import List, Optional, Tuple
+import time
 import uvicorn
 import logging
-import base64
+import json
 
 # 创建logger实例
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用生命周期管理：启动时创建各提供商的共享HTTP客户端、打开本地单词词典并在后台预热OCR模型，
+    关闭时释放上游连接、Redis连接、OCR工作池与词典
+    """
+    providers = {config["provider"] for config in MODEL_CONFIGS.values()}
+    await http_client_service.startup(providers)
+    logger.info("上游HTTP客户端已就绪: %s", ", ".join(sorted(providers)))
+    word_dictionary.load()
+    if ocr_pool.enabled:
+        # 预热在后台进行，翻译接口无需等待OCR模型加载即可提供服务
+        ocr_pool.start_warmup()
+    else:
+        logger.info("未启用OCR，本进程只提供翻译服务")
+    yield
+    await batch_scheduler.shutdown()
+    await http_client_service.shutdown()
+    await cache_service.close()
+    ocr_pool.shutdown()
+    word_dictionary.close()
+
+app = FastAPI(lifespan=lifespan)
+# 记录每个请求的端到端耗时
+app.add_middleware(MetricsMiddleware)
 
 # 智慧译项目根路由
 @app.get("/")
 def wistrans():
     return {"message": "欢迎来到wistrans智慧译"}
 
+# 就绪检查接口
+@app.get("/ready")
+async def ready():
+    """
+    就绪检查接口，供负载均衡或容器编排判断实例能否接收流量
+    
+    Returns:
+        各子系统的就绪状态；翻译与OCR（未启用时忽略）均就绪时返回200，否则返回503。
+        Redis不可用时翻译仍可使用进程内缓存，因此只报告状态、不影响就绪判断
+    """
+    subsystems = {
+        "translation": {"ready": http_client_service.started},
+        "cache": {"ready": await cache_service.ping()},
+        "ocr": {"ready": ocr_pool.ready, "status": ocr_pool.status}
+    }
+    is_ready = subsystems["translation"]["ready"] and (ocr_pool.ready or not ocr_pool.enabled)
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"ready": is_ready, "subsystems": subsystems}
+    )
+
+# 运行状态统计接口
+@app.get("/stats")
+def stats():
+    """
+    服务运行状态统计接口
+    
+    Returns:
+        各子系统的统计信息，如上游连接池使用情况、上游限流与熔断情况、各级缓存命中情况、微批调度与单飞合并情况、翻译记忆复用情况、本地词典命中情况、模型路由与对冲情况、OCR工作池队列情况
+    """
+    return {
+        "upstream": http_client_service.get_stats(),
+        "limits": upstream_limiter.get_stats(),
+        "cache": cache_service.get_stats(),
+        "batching": batch_scheduler.get_stats(),
+        "singleflight": singleflight.get_stats(),
+        "memory": translation_memory.get_stats(),
+        "dictionary": word_dictionary.get_stats(),
+        "routing": provider_router.get_stats(),
+        "ocr": ocr_pool.get_stats()
+    }
+
+# Prometheus指标接口
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus指标接口
+    
+    Returns:
+        Prometheus文本格式的指标，包括接口耗时、上游模型耗时与错误、token用量、缓存命中与查询耗时、OCR各阶段耗时、每个请求的片段数
+    """
+    content, content_type = metrics_service.render()
+    return Response(content=content, media_type=content_type)
+
+async def _recognize_upload(image: UploadFile) -> Tuple[dict, bool]:
+    """
+    识别上传的单张图片：在OCR工作池中解码并计算像素摘要，命中缓存时直接返回缓存结果，否则推理并写入缓存
+    
+    Args:
+        image: 上传的图片文件
+        
+    Returns:
+        (OCR结果, 是否命中缓存)
+    """
+    if not ocr_pool.enabled:
+        raise HTTPException(status_code=503, detail="当前实例未启用OCR服务")
+    try:
+        if ocr_pool.shares_memory:
+            # 线程池模式直接从上传的临时文件解码，解码结果留给识别任务复用
+            image_np, scale, digest = await ocr_pool.run(prepare_image, image.file)
+        else:
+            # 进程池模式只能传递字节，且像素数组往返进程需要两次pickle复制，因此只取回摘要
+            source = await image.read()
+            digest = await ocr_pool.run(digest_image, source)
+        
+        # 相同像素内容的图片直接返回缓存的识别结果
+        cached_result = await cache_service.get_ocr_cache(digest)
+        if cached_result is not None:
+            return cached_result, True
+        
+        if ocr_pool.shares_memory:
+            result = await ocr_pool.run(recognize_image, image_np, scale)
+        else:
+            # 未命中缓存时在同一个工作进程调用中重新解码并识别
+            result = await ocr_pool.run(process_image, source)
+        await cache_service.set_ocr_cache(digest, result)
+        return result, False
+    except OCRQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        logger.error("OCR处理失败: %s", str(e))
+        raise Exception(f"OCR处理失败: {str(e)}")
+
 # OCR接口
 @app.post("/ocr", response_model=OCRResponse)
 async def ocr_endpoint(image: UploadFile = File(...)):
@@ -28,21 +155,167 @@ async def ocr_endpoint(image: UploadFile = File(...)):
     Returns:
         OCR识别结果，包括检测到的文本列表和完整文本
     """
+    logger.info("收到OCR请求")
+    result, cached = await _recognize_upload(image)
+    return OCRResponse(
+        detected_text=result["detected_text"],
+        full_text=result["full_text"],
+        cached=cached
+    )
+
+# 批量OCR接口
+@app.post("/ocr/batch", response_model=OCRBatchResponse)
+async def ocr_batch_endpoint(images: List[UploadFile] = File(...), ids: Optional[List[str]] = Form(None)):
+    """
+    批量OCR文字识别接口：一次上传多张图片，未命中缓存的图片合并为一批进行推理
+    
+    Args:
+        images: 上传的图片文件列表
+        ids: 与图片一一对应的客户端ID列表，不传时使用文件名（重复时使用序号）
+        
+    Returns:
+        以客户端ID为键的各图片OCR识别结果，以及整批处理的吞吐量
+    """
+    if not ocr_pool.enabled:
+        raise HTTPException(status_code=503, detail="当前实例未启用OCR服务")
+    if len(images) > OCR_BATCH_MAX_IMAGES:
+        raise HTTPException(status_code=400, detail=f"单次最多上传 {OCR_BATCH_MAX_IMAGES} 张图片")
+    if ids is None:
+        filenames = [image.filename or "" for image in images]
+        ids = filenames if all(filenames) and len(set(filenames)) == len(filenames) else [str(index) for index in range(len(images))]
+    elif len(ids) != len(images) or len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="ids 必须与图片一一对应且不能重复")
+    
     try:
-        logger.info("收到OCR请求")
-        # 读取上传的图片文件并转换为base64
-        image_bytes = await image.read()
-        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-        
-        result = process_image_from_base64(image_base64)
-        return OCRResponse(
-            detected_text=result["detected_text"],
-            full_text=result["full_text"]
+        logger.info("收到批量OCR请求，共 %d 张图片", len(images))
+        start_time = time.perf_counter()
+        if ocr_pool.shares_memory:
+            # 线程池模式直接从上传的临时文件解码全部图片并计算像素摘要
+            prepared = await ocr_pool.run(prepare_images, [image.file for image in images])
+            digests = [digest for _, _, digest in prepared]
+        else:
+            # 进程池模式只取回摘要，像素数组不往返进程
+            sources = [await image.read() for image in images]
+            digests = await ocr_pool.run(digest_images, sources)
+        
+        # 一次MGET查询所有图片的缓存结果
+        cached_results = await cache_service.get_ocr_cache_many(digests)
+        results = {digest: cached for digest, cached in zip(digests, cached_results) if cached is not None}
+        cached_digests = set(results)
+        
+        # 未命中缓存的图片（相同像素内容只识别一次）合并为一批推理
+        pending = {}
+        for index, digest in enumerate(digests):
+            if digest not in results and digest not in pending:
+                pending[digest] = index
+        if pending:
+            if ocr_pool.shares_memory:
+                recognized = await ocr_pool.run(
+                    recognize_images,
+                    [prepared[index][0] for index in pending.values()],
+                    [prepared[index][1] for index in pending.values()]
+                )
+            else:
+                # 在同一个工作进程调用中重新解码并批量识别
+                recognized = await ocr_pool.run(process_images, [sources[index] for index in pending.values()])
+            results.update(zip(pending, recognized))
+            await cache_service.set_ocr_cache_many(list(zip(pending, recognized)))
+        
+        elapsed = time.perf_counter() - start_time
+        return OCRBatchResponse(
+            results={
+                client_id: OCRResponse(
+                    detected_text=results[digest]["detected_text"],
+                    full_text=results[digest]["full_text"],
+                    cached=digest in cached_digests
+                )
+                for client_id, digest in zip(ids, digests)
+            },
+            elapsed_seconds=round(elapsed, 4),
+            images_per_second=round(len(images) / elapsed, 2) if elapsed > 0 else 0.0
         )
+    except OCRQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
-        logger.error("OCR处理失败: %s", str(e))
+        logger.error("批量OCR处理失败: %s", str(e))
         raise Exception(f"OCR处理失败: {str(e)}")
 
+# OCR识别并翻译接口
+@app.post("/ocr/translate")
+async def ocr_translate_endpoint(
+    raw_request: Request,
+    image: UploadFile = File(...),
+    target: str = Form("中文"),
+    model: str = Form("qwen-turbo-latest"),
+    extra_args: Optional[str] = Form(None)
+):
+    """
+    OCR识别并翻译接口：识别图片中的文字后直接翻译各行文本，以NDJSON流式返回。
+    第一行为识别结果，之后每翻译完成一行输出一行（附带原始坐标），最后一行为汇总信息
+    
+    Args:
+        raw_request: 原始请求，用于检测客户端是否断开
+        image: 上传的图片文件
+        target: 目标语言
+        model: 模型名称
+        extra_args: JSON格式的额外翻译要求
+        
+    Returns:
+        NDJSON流式响应
+    """
+    try:
+        extra_args_dict = json.loads(extra_args) if extra_args else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="extra_args 必须是JSON对象")
+    if extra_args_dict is not None and not isinstance(extra_args_dict, dict):
+        raise HTTPException(status_code=400, detail="extra_args 必须是JSON对象")
+    
+    logger.info("收到OCR识别并翻译请求")
+    # 识别在开始流式响应之前完成，繁忙或失败时仍可返回对应的状态码
+    result, cached = await _recognize_upload(image)
+    
+    # 每个非空文本行作为一个片段，片段ID为该行在 detected_text 中的序号
+    lines = {
+        str(index): item
+        for index, item in enumerate(result["detected_text"])
+        if item["text"].strip()
+    }
+    segments = [Segment(id=line_id, text=item["text"], model=model) for line_id, item in lines.items()]
+    metrics_service.observe_segments("/ocr/translate", len(segments))
+    
+    async def generate():
+        yield json.dumps({
+            "type": "ocr",
+            "cached": cached,
+            "full_text": result["full_text"],
+            "lines": [
+                {"id": line_id, "text": item["text"], "confidence": item["confidence"], "coordinates": item["coordinates"]}
+                for line_id, item in lines.items()
+            ]
+        }, ensure_ascii=False) + "\n"
+        
+        records = translate_segments_stream(
+            segments=segments,
+            target_language=target,
+            extra_args=extra_args_dict
+        )
+        try:
+            async for record in records:
+                if await raw_request.is_disconnected():
+                    logger.info("客户端已断开，停止流式翻译")
+                    break
+                if record["type"] == "segment":
+                    # 附带原文和坐标，客户端可直接覆盖到图片上
+                    line = lines[record["id"]]
+                    record["source"] = line["text"]
+                    record["coordinates"] = line["coordinates"]
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+        finally:
+            # 关闭生成器以取消未完成的模型调用
+            await records.aclose()
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 # 翻译接口
 @app.post("/translate", response_model=TranslateResponse)
 async def translate(request: TranslateRequest):
@@ -55,6 +328,7 @@ async def translate(request: TranslateRequest):
     Returns:
         翻译结果
     """
+    metrics_service.observe_segments("/translate", len(request.segments))
     try:
         translated_segments = await translate_segments(
             segments=request.segments,
@@ -80,6 +354,66 @@ async def translate(request: TranslateRequest):
             segments=error_segments
         )
 
+# 流式翻译接口
+@app.post("/translate/stream")
+async def translate_stream(request: TranslateRequest, raw_request: Request):
+    """
+    流式网页翻译接口，以NDJSON逐行返回翻译完成的片段，最后一行为汇总信息
+    
+    Args:
+        request: 翻译请求参数
+        raw_request: 原始请求，用于检测客户端是否断开
+        
+    Returns:
+        NDJSON流式响应
+    """
+    metrics_service.observe_segments("/translate/stream", len(request.segments))
+    
+    async def generate():
+        records = translate_segments_stream(
+            segments=request.segments,
+            target_language=request.target,
+            extra_args=request.extra_args
+        )
+        try:
+            async for record in records:
+                if await raw_request.is_disconnected():
+                    logger.info("客户端已断开，停止流式翻译")
+                    break
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+        finally:
+            # 关闭生成器以取消未完成的模型调用
+            await records.aclose()
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+# 文本流式翻译接口
+@app.post("/translate/text-stream")
+async def translate_text_stream(request: TextStreamRequest):
+    """
+    单段文本流式翻译接口，上游模型生成译文的同时逐块返回
+    
+    Args:
+        request: 文本流式翻译请求参数
+        
+    Returns:
+        纯文本流式响应，内容为译文
+    """
+    async def generate():
+        try:
+            async for chunk in stream_sentence_translation(
+                text=request.text,
+                target_language=request.target,
+                model_name=request.model or "qwen-turbo-latest",
+                extra_args=request.extra_args
+            ):
+                yield chunk
+        except Exception as e:
+            logger.error("流式翻译失败: %s", str(e))
+            yield f"翻译错误: {str(e)}"
+    
+    return StreamingResponse(generate(), media_type="text/plain; charset=utf-8")
+
 # 单词翻译接口
 @app.post("/trans-word", response_model=WordTranslateResponse)
 async def trans_word(request: WordTranslateRequest):
@@ -92,28 +426,19 @@ async def trans_word(request: WordTranslateRequest):
     Returns:
         单词翻译结果
     """
+    metrics_service.observe_segments("/trans-word", len(request.word))
     try:
-        translated_words = []
         target_language = request.target or "中文"
         model_name = request.model or "qwen-turbo-latest"
         
-        for word_item in request.word:
-            try:
-                translated_word = await translate_word(
-                    word=word_item.word,
-                    target_language=target_language,
-                    model_name=model_name,
-                    extra_args=request.extra_args
-                )
-                translated_words.append({
-                    "id": word_item.id,
-                    "word": translated_word
-                })
-            except Exception as e:
-                translated_words.append({
-                    "id": word_item.id,
-                    "word": f"翻译错误: {str(e)}"
-                })
+        # 并发翻译所有单词，单个单词失败只影响其自身结果
+        translated_words = await translate_words(
+            words=request.word,
+            target_language=target_language,
+            model_name=model_name,
+            extra_args=request.extra_args,
+            source_language=request.source
+        )
         
         return WordTranslateResponse(
             translated_word=translated_words
@@ -0,0 +1,75 @@
+"""
+本地单词词典构建命令
+
+从TSV文件编译 /trans-word 使用的内存映射词典文件（*.wdict），放入 WORD_DICT_DIR 目录后重启服务即可生效。
+TSV每行为 单词<TAB>译文，以 # 开头的行和空行被忽略；译文中的换行和制表符分别写作 \\n 和 \\t。
+
+用法:
+    python -m scripts.build_word_dict words.tsv -o dicts/en-zh.wdict --source en --target 中文 [--target zh]
+    python -m scripts.build_word_dict dicts/en-zh.wdict --lookup apple   # 查询已构建的词典
+"""
+import argparse
+import logging
+from typing import Iterator, Tuple
+from services.word_dictionary import build_dictionary, normalize_word, SortedStringTable
+
+# 配置日志记录器
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# 创建控制台处理器（如果还没有的话）
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+def read_tsv(path: str) -> Iterator[Tuple[str, str]]:
+    """
+    读取TSV词条
+    
+    Args:
+        path: TSV文件路径
+        
+    Returns:
+        (单词, 译文) 迭代器，格式不正确的行记录警告后跳过
+    """
+    with open(path, encoding="utf-8") as tsv_file:
+        for line_number, line in enumerate(tsv_file, 1):
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            word, separator, translation = line.partition("\t")
+            if not separator or not word.strip() or not translation.strip():
+                logger.warning(f"第 {line_number} 行格式不正确，已跳过")
+                continue
+            yield word, translation.strip().replace("\\n", "\n").replace("\\t", "\t")
+
+def main() -> None:
+    """
+    解析命令行参数，构建或查询词典
+    """
+    parser = argparse.ArgumentParser(description="wistrans 本地单词词典构建命令")
+    parser.add_argument("input", help="TSV词条文件（使用 --lookup 时为词典文件）")
+    parser.add_argument("-o", "--output", help="输出的词典文件路径（*.wdict）")
+    parser.add_argument("--source", default="en", help="源语言，需与请求中的 source 一致")
+    parser.add_argument("--target", action="append", default=[], help="目标语言，需与请求中的 target 一致，可重复指定多个别名")
+    parser.add_argument("--lookup", action="append", default=[], help="查询已构建词典中的单词")
+    args = parser.parse_args()
+    
+    if args.lookup:
+        table = SortedStringTable(args.input)
+        try:
+            for word in args.lookup:
+                print(f"{word}\t{table.get(normalize_word(word).encode('utf-8'))}")
+        finally:
+            table.close()
+        return
+        
+    if not args.output or not args.target:
+        parser.error("构建词典需要指定 --output 和至少一个 --target")
+    count = build_dictionary(read_tsv(args.input), args.output, args.source, args.target)
+    logger.info(f"已写入 {args.output}: {args.source} -> {'/'.join(args.target)}，{count} 个词条")
+
+if __name__ == "__main__":
+    main()
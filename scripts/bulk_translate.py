@@ -0,0 +1,376 @@
+"""
+离线批量翻译命令
+
+流式读取JSONL或CSV语料（不把整个文件读入内存），按批调用 services.model_service 的批量翻译（与 /translate 相同的
+缓存查询、单飞合并、限流重试和翻译记忆），多批并发执行，结果按输入顺序流式写出，并写入与在线接口相同的缓存，
+之后在线接口翻译相同的文本时直接命中缓存（需要Redis，否则结果只保存在本进程的L1缓存中）。
+
+每写完一批就更新检查点（已完成的记录数和输出文件长度），中断后使用相同的参数重新运行即从检查点继续，
+输出文件中检查点之后不完整的内容会被截断。结束时输出记录数、吞吐量、缓存命中和上游调用次数。
+
+输入格式（按扩展名判断，也可用 --format 指定）:
+    JSONL  每行一个JSON对象，--text-field（默认 text）为原文，可选的 model 字段指定该条记录使用的模型；
+           不是JSON对象的行作为失败记录输出（原行保存在 raw 字段中），不中断运行
+    CSV    带表头，列名含义同上
+输出与输入格式相同：原记录加上 --output-field（默认 translation）列，翻译失败时该列为错误信息，JSONL还会附加 "error": true
+
+用法:
+    python -m scripts.bulk_translate corpus.jsonl -o corpus.zh.jsonl --target 中文 [--model qwen-turbo-latest]
+                                     [--batch-size 50] [--concurrency 8] [--extra-args '{"pack": true}'] [--restart]
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from utils.schemas import Segment
+from services.model_service import translate_segments, MODEL_CONFIGS, batch_scheduler
+from services.http_client_service import http_client_service
+from services.cache_service import cache_service
+from services.upstream_limiter import upstream_limiter
+from services.translation_memory import translation_memory
+
+# 配置日志记录器
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# 创建控制台处理器（如果还没有的话）
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+# 进度日志的最小间隔（秒）
+PROGRESS_INTERVAL = 5.0
+
+def detect_format(path: str, value: Optional[str]) -> str:
+    """
+    确定语料格式
+    
+    Args:
+        path: 输入文件路径
+        value: 命令行指定的格式
+        
+    Returns:
+        "jsonl" 或 "csv"
+    """
+    if value:
+        return value
+    return "csv" if path.lower().endswith((".csv", ".tsv")) else "jsonl"
+
+class BadRecord(dict):
+    """
+    无法解析为JSON对象的JSONL行：原行保存在 raw 字段中，不翻译，作为失败记录输出
+    """
+    
+    def __init__(self, line: str, reason: str):
+        super().__init__(raw=line.rstrip("\r\n"))
+        self.reason = reason
+
+def parse_jsonl(line: str) -> Dict[str, Any]:
+    """
+    解析一行JSONL
+    
+    Args:
+        line: 原始行
+        
+    Returns:
+        解析出的记录；不是合法JSON或不是JSON对象时返回 BadRecord
+    """
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        return BadRecord(line, f"无效的JSON: {str(e)}")
+    if not isinstance(record, dict):
+        return BadRecord(line, f"记录不是JSON对象: {type(record).__name__}")
+    return record
+
+def read_records(path: str, file_format: str, skip: int) -> Tuple[Iterator[Dict[str, Any]], List[str]]:
+    """
+    流式读取语料记录
+    
+    Args:
+        path: 输入文件路径
+        file_format: 语料格式
+        skip: 跳过的记录数（从检查点继续时为已完成的记录数）
+        
+    Returns:
+        (记录迭代器, CSV表头；JSONL为空列表)
+    """
+    input_file = open(path, encoding="utf-8", newline="")
+    if file_format == "csv":
+        reader = csv.DictReader(input_file, dialect="excel-tab" if path.lower().endswith(".tsv") else "excel")
+        fieldnames = list(reader.fieldnames or [])
+        rows: Iterator[Any] = iter(reader)
+    else:
+        fieldnames = []
+        rows = (line for line in input_file if line.strip())
+    
+    def generate() -> Iterator[Dict[str, Any]]:
+        try:
+            for index, row in enumerate(rows):
+                if index < skip:
+                    continue
+                # JSONL跳过的行不解析
+                yield row if file_format == "csv" else parse_jsonl(row)
+        finally:
+            input_file.close()
+    return generate(), fieldnames
+
+def load_checkpoint(path: str, identity: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    读取检查点
+    
+    Args:
+        path: 检查点文件路径
+        identity: 本次运行的输入、输出和翻译参数，与检查点中记录的不一致时拒绝继续
+        
+    Returns:
+        检查点内容，不存在时为从头开始的检查点
+        
+    Raises:
+        ValueError: 检查点属于参数不同的另一次运行
+    """
+    if not os.path.exists(path):
+        return {"records": 0, "output_bytes": 0}
+    with open(path, encoding="utf-8") as checkpoint_file:
+        checkpoint = json.load(checkpoint_file)
+    if checkpoint.get("identity") != identity:
+        raise ValueError(f"检查点 {path} 与本次运行的参数不一致，使用 --restart 重新开始")
+    return checkpoint
+
+def save_checkpoint(path: str, identity: Dict[str, Any], records: int, output_bytes: int) -> None:
+    """
+    原子地更新检查点（先写临时文件再替换）
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as checkpoint_file:
+        json.dump({"identity": identity, "records": records, "output_bytes": output_bytes}, checkpoint_file, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+class BulkWriter:
+    """
+    按输入格式写出翻译结果，每批写完后刷新到磁盘
+    """
+    
+    def __init__(self, path: str, file_format: str, fieldnames: List[str], output_field: str, output_bytes: int):
+        """
+        打开输出文件：从检查点继续时截断到检查点记录的长度，否则清空并写入表头
+        
+        Args:
+            path: 输出文件路径
+            file_format: 输出格式
+            fieldnames: CSV输入的表头
+            output_field: 译文所在的列名
+            output_bytes: 检查点记录的输出文件长度
+            
+        Raises:
+            ValueError: 输出文件比检查点记录的短
+        """
+        self.file_format = file_format
+        self.output_field = output_field
+        if output_bytes and (not os.path.exists(path) or os.path.getsize(path) < output_bytes):
+            raise ValueError(f"输出文件 {path} 比检查点记录的短，使用 --restart 重新开始")
+        self._file = open(path, "r+" if output_bytes else "w", encoding="utf-8", newline="")
+        self._file.seek(output_bytes)
+        self._file.truncate()
+        if file_format == "csv":
+            columns = fieldnames + ([output_field] if output_field not in fieldnames else [])
+            self._writer = csv.DictWriter(self._file, fieldnames=columns, extrasaction="ignore",
+                                          dialect="excel-tab" if path.lower().endswith(".tsv") else "excel")
+            if not output_bytes:
+                self._writer.writeheader()
+    
+    def write(self, records: List[Dict[str, Any]], translations: List[Tuple[str, bool]]) -> int:
+        """
+        写出一批记录并刷新到磁盘
+        
+        Args:
+            records: 原记录
+            translations: 各记录的 (译文或错误信息, 是否成功)
+            
+        Returns:
+            写出后的输出文件长度
+        """
+        for record, (translation, ok) in zip(records, translations):
+            record = dict(record, **{self.output_field: translation})
+            if self.file_format == "csv":
+                self._writer.writerow(record)
+            else:
+                if not ok:
+                    record["error"] = True
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+    
+    def close(self) -> None:
+        self._file.close()
+
+async def translate_batch(records: List[Dict[str, Any]], args: argparse.Namespace) -> List[Tuple[str, bool]]:
+    """
+    翻译一批记录，空文本和无法解析的记录不调用模型
+    
+    Args:
+        records: 记录列表
+        args: 命令行参数
+        
+    Returns:
+        各记录的 (译文或错误信息, 是否成功)
+    """
+    segments = []
+    results: List[Tuple[str, bool]] = [("", True)] * len(records)
+    for index, record in enumerate(records):
+        if isinstance(record, BadRecord):
+            results[index] = (record.reason, False)
+            continue
+        text = str(record.get(args.text_field) or "")
+        if text.strip():
+            segments.append(Segment(
+                id=str(index),
+                text=text,
+                model=record.get("model") or args.model
+            ))
+    if segments:
+        translated = await translate_segments(segments, args.target, args.extra_args)
+        for item in translated:
+            results[int(item["id"])] = (item["text"], not item["error"])
+    return results
+
+def upstream_calls() -> int:
+    """
+    累计的上游模型请求数（包括重试）
+    """
+    return sum(stats["requests"] for stats in upstream_limiter.get_stats()["providers"].values())
+
+def cache_hits() -> int:
+    """
+    累计的缓存命中数（L1 + Redis）
+    """
+    stats = cache_service.get_stats()
+    return stats["l1"]["hits"] + stats["redis"]["hits"]
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    批量翻译语料，返回汇总统计
+    """
+    file_format = detect_format(args.input, args.format)
+    checkpoint_path = args.checkpoint or f"{args.output}.checkpoint"
+    identity = {
+        "input": os.path.abspath(args.input),
+        "output": os.path.abspath(args.output),
+        "target": args.target,
+        "model": args.model,
+        "extra_args": args.extra_args,
+        "text_field": args.text_field,
+        "output_field": args.output_field
+    }
+    if args.restart and os.path.exists(checkpoint_path):
+        os.unlink(checkpoint_path)
+    checkpoint = load_checkpoint(checkpoint_path, identity)
+    done = checkpoint["records"]
+    if done:
+        logger.info(f"从检查点继续：跳过已完成的 {done} 条记录")
+        
+    records, fieldnames = read_records(args.input, file_format, done)
+    writer = BulkWriter(args.output, file_format, fieldnames, args.output_field, checkpoint["output_bytes"])
+    # 首次运行写入表头后立即记录检查点，继续运行时不会重复写表头
+    save_checkpoint(checkpoint_path, identity, done, writer.write([], []))
+    
+    totals = {"records": 0, "chars": 0, "errors": 0}
+    calls_before, hits_before, avoided_before = upstream_calls(), cache_hits(), translation_memory.get_stats()["llm_calls_avoided"]
+    retries_before = upstream_limiter.get_stats()["retries"]
+    start_time = last_progress = time.perf_counter()
+    # 按提交顺序排列的进行中批次，写出时保持输入顺序
+    in_flight: Deque[Tuple[List[Dict[str, Any]], asyncio.Task]] = deque()
+    
+    async def write_oldest() -> None:
+        nonlocal done, last_progress
+        batch, task = in_flight.popleft()
+        translations = await task
+        output_bytes = writer.write(batch, translations)
+        done += len(batch)
+        save_checkpoint(checkpoint_path, identity, done, output_bytes)
+        totals["records"] += len(batch)
+        totals["chars"] += sum(len(str(record.get(args.text_field) or "")) for record in batch)
+        totals["errors"] += sum(1 for _, ok in translations if not ok)
+        now = time.perf_counter()
+        if now - last_progress >= PROGRESS_INTERVAL:
+            last_progress = now
+            logger.info(f"已完成 {done} 条记录，{totals['records'] / (now - start_time):.1f} 条/秒，失败 {totals['errors']} 条")
+            
+    try:
+        batch: List[Dict[str, Any]] = []
+        for record in records:
+            batch.append(record)
+            if len(batch) < args.batch_size:
+                continue
+            in_flight.append((batch, asyncio.ensure_future(translate_batch(batch, args))))
+            batch = []
+            if len(in_flight) >= args.concurrency:
+                await write_oldest()
+        if batch:
+            in_flight.append((batch, asyncio.ensure_future(translate_batch(batch, args))))
+        while in_flight:
+            await write_oldest()
+    finally:
+        for _, task in in_flight:
+            task.cancel()
+        writer.close()
+        
+    elapsed = time.perf_counter() - start_time
+    return {
+        "records": totals["records"],
+        "total_records": done,
+        "errors": totals["errors"],
+        "elapsed_seconds": round(elapsed, 3),
+        "records_per_second": round(totals["records"] / elapsed, 2) if elapsed else None,
+        "chars_per_second": round(totals["chars"] / elapsed, 2) if elapsed else None,
+        "cache_hits": cache_hits() - hits_before,
+        "upstream_calls": upstream_calls() - calls_before,
+        "upstream_retries": upstream_limiter.get_stats()["retries"] - retries_before,
+        "llm_calls_avoided": translation_memory.get_stats()["llm_calls_avoided"] - avoided_before
+    }
+
+async def main() -> None:
+    """
+    解析命令行参数，启动上游客户端并执行批量翻译
+    """
+    parser = argparse.ArgumentParser(description="wistrans 离线批量翻译命令")
+    parser.add_argument("input", help="输入语料（JSONL或CSV）")
+    parser.add_argument("-o", "--output", required=True, help="输出文件路径")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="语料格式，默认按扩展名判断")
+    parser.add_argument("--target", default="中文", help="目标语言")
+    parser.add_argument("--model", default="qwen-turbo-latest", help="记录未指定 model 时使用的模型")
+    parser.add_argument("--extra-args", type=json.loads, default=None, help="翻译的额外要求（JSON），与 /translate 的 extra_args 相同")
+    parser.add_argument("--text-field", default="text", help="原文所在的字段或列")
+    parser.add_argument("--output-field", default="translation", help="写入译文的字段或列")
+    parser.add_argument("--batch-size", type=int, default=50, help="每批翻译的记录数")
+    parser.add_argument("--concurrency", type=int, default=8, help="同时进行的批次数")
+    parser.add_argument("--checkpoint", help="检查点文件路径，默认为 <输出文件>.checkpoint")
+    parser.add_argument("--restart", action="store_true", help="忽略已有检查点，从头开始")
+    args = parser.parse_args()
+    
+    await http_client_service.startup({config["provider"] for config in MODEL_CONFIGS.values()})
+    try:
+        summary = await run(args)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(2)
+    finally:
+        await batch_scheduler.shutdown()
+        await http_client_service.shutdown()
+        await cache_service.close()
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if summary["errors"]:
+        logger.warning(f"{summary['errors']} 条记录翻译失败，译文列为错误信息；使用 --restart 重新运行时，成功的记录直接命中缓存，只重新翻译失败的记录")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,282 @@
+"""
+缓存维护命令
+
+旧版缓存键只保留了截断的原文和编码片段，无法还原出语言、模型等信息，
+因此不做键迁移，而是清理旧键，由新键在后续请求中重新填充。
+
+用法:
+    python -m scripts.cache_admin flush-legacy [--yes]   # 清理旧格式（无版本前缀）的缓存键
+    python -m scripts.cache_admin flush-version [--yes]  # 清理非当前版本的 wistrans:* 缓存键
+    python -m scripts.cache_admin report [--sample 2000] # 抽样统计缓存值的格式、压缩节省的字节数和编解码耗时
+    python -m scripts.cache_admin train-dict -o cache.zdict [--sample 20000] [--dict-size 16384]
+                                                         # 用已有的译文训练zstd压缩字典（需安装zstandard）
+
+不带 --yes 时只统计将被删除的键数量，不做删除。
+"""
+import argparse
+import asyncio
+import json
+import logging
+import re
+import time
+from typing import Any, Callable, Dict, List, Tuple
+from services.cache_service import cache_service, CACHE_KEY_PREFIX, CACHE_KEY_VERSION
+from services.cache_codec import model_tag
+from services.model_service import MODEL_CONFIGS
+
+# 配置日志记录器
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# 创建控制台处理器（如果还没有的话）
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+# 旧格式的键：原文前30个字符（空格替换为 _）+ "_" + base64("<类型>:<原文>:...") 的前20个字符，
+# 编码片段总是以 "sentence:"（c2VudGVuY2U6）或 "word:"（d29yZD）的base64编码开头。
+# 只扫描和删除带有这两个固定前缀的键，避免误删共用同一Redis数据库的其他应用的键
+LEGACY_KEY_MATCHES = ("*_c2VudGVuY2U6*", "*_d29yZD*")
+LEGACY_KEY_PATTERN = re.compile(
+    r"^.{0,30}_(?=[A-Za-z0-9+/=]{1,20}$)(?:c2VudGVuY2U6|d29yZD)[A-Za-z0-9+/]*={0,2}$",
+    re.DOTALL
+)
+
+def is_legacy_key(key: str) -> bool:
+    """
+    判断是否为旧格式的缓存键
+    
+    Args:
+        key: 缓存键
+        
+    Returns:
+        是否为旧格式
+    """
+    return not key.startswith(f"{CACHE_KEY_PREFIX}:") and bool(LEGACY_KEY_PATTERN.match(key))
+
+def is_stale_version_key(key: str) -> bool:
+    """
+    判断是否为非当前版本的缓存键
+    
+    Args:
+        key: 缓存键
+        
+    Returns:
+        是否为其他版本的 wistrans 缓存键
+    """
+    return key.startswith(f"{CACHE_KEY_PREFIX}:") and not key.startswith(f"{CACHE_KEY_PREFIX}:{CACHE_KEY_VERSION}:")
+
+async def flush_keys(match: str, predicate: Callable[[str], bool], apply: bool, batch_size: int = 500) -> int:
+    """
+    扫描并删除满足条件的缓存键
+    
+    Args:
+        match: SCAN 使用的匹配模式
+        predicate: 判断键是否需要删除
+        apply: 是否真正删除（否则只统计）
+        batch_size: 每批删除的键数
+        
+    Returns:
+        匹配（或已删除）的键数量
+    """
+    client = cache_service.redis_client
+    batch = []
+    total = 0
+    async for key in client.scan_iter(match=match, count=batch_size):
+        # Redis客户端不自动解码，键为 bytes；无法按UTF-8解码的键不是本服务写入的
+        try:
+            matched = predicate(key.decode("utf-8"))
+        except UnicodeDecodeError:
+            matched = False
+        if not matched:
+            continue
+        total += 1
+        if apply:
+            batch.append(key)
+            if len(batch) >= batch_size:
+                await client.unlink(*batch)
+                batch = []
+    if apply and batch:
+        await client.unlink(*batch)
+    return total
+
+# 存放译文和OCR结果的缓存键类型
+VALUE_KEY_TYPES = ("sentence", "word", "ocr")
+
+async def sample_values(sample: int, batch_size: int = 500) -> List[Tuple[str, str, bytes]]:
+    """
+    扫描当前版本的缓存键，抽取前 sample 个缓存值
+    
+    Args:
+        sample: 最多抽取的缓存值数量
+        batch_size: 每批扫描/读取的键数
+        
+    Returns:
+        (键类型, 缓存键, Redis中的原始值) 列表
+    """
+    client = cache_service.redis_client
+    keys: List[Tuple[str, str]] = []
+    async for key in client.scan_iter(match=f"{CACHE_KEY_PREFIX}:{CACHE_KEY_VERSION}:*", count=batch_size):
+        key = key.decode("utf-8")
+        parts = key.split(":")
+        if len(parts) == 4 and parts[2] in VALUE_KEY_TYPES:
+            keys.append((parts[2], key))
+            if len(keys) >= sample:
+                break
+    values = []
+    for start in range(0, len(keys), batch_size):
+        batch = keys[start:start + batch_size]
+        raws = await client.mget([key for _, key in batch])
+        values.extend((key_type, key, raw) for (key_type, key), raw in zip(batch, raws) if raw)
+    return values
+
+async def memory_usage(keys: List[str], batch_size: int = 500) -> Any:
+    """
+    使用 MEMORY USAGE 统计键在Redis中实际占用的字节数（包括键和对象开销）
+    
+    Returns:
+        总字节数，Redis不支持该命令时返回None
+    """
+    total = 0
+    try:
+        for start in range(0, len(keys), batch_size):
+            async with cache_service.redis_client.pipeline(transaction=False) as pipe:
+                for key in keys[start:start + batch_size]:
+                    pipe.memory_usage(key)
+                total += sum(usage or 0 for usage in await pipe.execute())
+    except Exception as e:
+        logger.warning(f"无法统计Redis内存占用: {str(e)}")
+        return None
+    return total
+
+async def report(sample: int) -> Dict[str, Any]:
+    """
+    抽样统计缓存值：各格式和各模型的数量、原文与存储字节数、Redis内存占用，
+    读取（解码）的平均耗时，以及按当前压缩配置以封装格式重写时的字节数和平均耗时。
+    直接解析和压缩抽样值，不计入服务的编解码统计
+    
+    Args:
+        sample: 抽样的缓存值数量
+        
+    Returns:
+        按键类型汇总的统计结果
+    """
+    codec = cache_service.codec
+    model_names = {model_tag(name): name for name in MODEL_CONFIGS}
+    values = await sample_values(sample)
+    summary: Dict[str, Dict[str, Any]] = {}
+    for key_type, key, raw in values:
+        item = summary.setdefault(key_type, {
+            "keys": 0, "formats": {}, "models": {}, "text_bytes": 0, "stored_bytes": 0, "encoded_bytes": 0,
+            "decode_seconds": 0.0, "encode_seconds": 0.0, "errors": 0, "_keys": []
+        })
+        start_time = time.perf_counter()
+        try:
+            parsed = codec.inspect(raw)
+        except (ValueError, UnicodeDecodeError):
+            item["errors"] += 1
+            continue
+        item["decode_seconds"] += time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        encoded_size = codec.estimate(parsed["text"])
+        item["encode_seconds"] += time.perf_counter() - start_time
+        item["keys"] += 1
+        item["formats"][parsed["format"]] = item["formats"].get(parsed["format"], 0) + 1
+        if parsed["model_tag"] is not None:
+            model = model_names.get(parsed["model_tag"], f"tag:{parsed['model_tag']}")
+            item["models"][model] = item["models"].get(model, 0) + 1
+        item["text_bytes"] += len(parsed["text"].encode("utf-8"))
+        item["stored_bytes"] += len(raw)
+        item["encoded_bytes"] += encoded_size
+        item["_keys"].append(key)
+        
+    for item in summary.values():
+        keys = item.pop("_keys")
+        count = item["keys"] or 1
+        item["saved_bytes"] = item["text_bytes"] - item["stored_bytes"]
+        item["saved_ratio"] = round(item["saved_bytes"] / item["text_bytes"], 4) if item["text_bytes"] else 0.0
+        # 按当前压缩配置以封装格式重写全部抽样值后相对原文节省的比例（未开启封装写入时可据此评估开启的收益）
+        item["projected_saved_ratio"] = round(1 - item["encoded_bytes"] / item["text_bytes"], 4) if item["text_bytes"] else 0.0
+        item["avg_decode_us"] = round(item.pop("decode_seconds") / count * 1e6, 2)
+        item["avg_encode_us"] = round(item.pop("encode_seconds") / count * 1e6, 2)
+        item["redis_memory_bytes"] = await memory_usage(keys)
+    return {
+        "sampled": len(values),
+        "codec": {
+            "envelope": codec.envelope_enabled,
+            "compression": codec.compression,
+            "level": codec.level,
+            "min_bytes": codec.min_bytes,
+            "zstd_dict_id": codec.dict_id
+        },
+        "types": summary
+    }
+
+async def train_dictionary(output: str, sample: int, dict_size: int) -> int:
+    """
+    用抽样的句子和单词译文训练zstd压缩字典
+    
+    Args:
+        output: 字典文件路径
+        sample: 抽样的缓存值数量
+        dict_size: 字典大小（字节）
+        
+    Returns:
+        训练使用的样本数
+    """
+    import zstandard
+    samples = []
+    for key_type, _, raw in await sample_values(sample):
+        if key_type == "ocr":
+            continue
+        try:
+            samples.append(cache_service.codec.inspect(raw)["text"].encode("utf-8"))
+        except (ValueError, UnicodeDecodeError):
+            continue
+    dictionary = zstandard.train_dictionary(dict_size, samples)
+    with open(output, "wb") as dict_file:
+        dict_file.write(dictionary.as_bytes())
+    logger.info(f"已写入zstd压缩字典 {output}，字典ID: {dictionary.dict_id()}")
+    return len(samples)
+
+async def main() -> None:
+    """
+    解析命令行参数并执行对应的维护命令
+    """
+    parser = argparse.ArgumentParser(description="wistrans 缓存维护命令")
+    parser.add_argument("command", choices=["flush-legacy", "flush-version", "report", "train-dict"], help="要执行的维护命令")
+    parser.add_argument("--yes", action="store_true", help="确认删除（默认只统计）")
+    parser.add_argument("--batch-size", type=int, default=500, help="每批扫描/删除的键数")
+    parser.add_argument("--sample", type=int, default=None, help="report/train-dict 抽样的缓存值数量（默认分别为2000和20000）")
+    parser.add_argument("--dict-size", type=int, default=16 * 1024, help="train-dict 生成的字典大小（字节）")
+    parser.add_argument("-o", "--output", help="train-dict 输出的字典文件路径")
+    args = parser.parse_args()
+    if args.command == "train-dict" and not args.output:
+        parser.error("train-dict 需要指定 --output")
+        
+    try:
+        if args.command == "report":
+            print(json.dumps(await report(args.sample or 2000), ensure_ascii=False, indent=2))
+            return
+        if args.command == "train-dict":
+            count = await train_dictionary(args.output, args.sample or 20000, args.dict_size)
+            logger.info(f"train-dict: 使用 {count} 条译文训练，设置 CACHE_COMPRESSION=zstd 和 CACHE_ZSTD_DICT={args.output} 后生效")
+            return
+        if args.command == "flush-legacy":
+            count = 0
+            for match in LEGACY_KEY_MATCHES:
+                count += await flush_keys(match, is_legacy_key, args.yes, args.batch_size)
+        else:
+            count = await flush_keys(f"{CACHE_KEY_PREFIX}:*", is_stale_version_key, args.yes, args.batch_size)
+    finally:
+        await cache_service.close()
+        
+    if args.yes:
+        logger.info(f"{args.command}: 已删除 {count} 个缓存键")
+    else:
+        logger.info(f"{args.command}: 共 {count} 个缓存键待删除，添加 --yes 执行删除")
+
+if __name__ == "__main__":
+    asyncio.run(main())
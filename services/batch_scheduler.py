@@ -0,0 +1,185 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+from utils.env import env_flag
+from services.metrics_service import metrics_service, BATCH_SIZE_BUCKETS
+
+# 配置日志记录器
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# 创建控制台处理器（如果还没有的话）
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+# 批量分发函数：(批次键, 文本列表) -> 与输入顺序一致的 (翻译结果或错误信息, 是否成功, 实际使用的模型名称) 列表
+DispatchFunc = Callable[[Hashable, List[str]], Awaitable[List[Tuple[str, bool, Optional[str]]]]]
+
+class BatchScheduler:
+    """
+    跨请求微批调度器：在短时间窗口内收集相同批次键（模型、目标语言、翻译参数）的待翻译文本，
+    合并为打包的上游调用，并分别唤醒各调用方
+    """
+    
+    def __init__(self, dispatch: DispatchFunc):
+        """
+        初始化调度器
+        
+        Args:
+            dispatch: 批量分发函数，负责实际的打包翻译
+        """
+        self.enabled = env_flag("BATCH_SCHEDULER_ENABLED")
+        # 最后一条文本到达后继续等待的时间窗口
+        self.window = float(os.getenv("BATCH_WINDOW_MS", 10)) / 1000
+        # 批次中第一条文本的最长排队时间
+        self.max_wait = float(os.getenv("BATCH_MAX_WAIT_MS", 50)) / 1000
+        # 单个批次的最大文本数，达到后立即分发
+        self.max_batch = int(os.getenv("BATCH_MAX_SIZE", 32))
+        self._dispatch = dispatch
+        # 批次键 -> [(文本, future, 入队时间)]
+        self._queues: Dict[Hashable, List[Tuple[str, asyncio.Future, float]]] = {}
+        # 批次键 -> (定时器, 批次首条文本入队时间)
+        self._timers: Dict[Hashable, Tuple[asyncio.TimerHandle, float]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats = {
+            "batches": 0,
+            "items": 0,
+            "max_batch_size": 0,
+            "queue_delay_seconds": 0.0,
+            "max_queue_delay_seconds": 0.0,
+            "flush_full": 0,
+            "flush_timer": 0
+        }
+        self._size_buckets = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self._size_buckets["+Inf"] = 0
+    
+    async def submit(self, key: Hashable, text: str) -> Tuple[str, bool, Optional[str]]:
+        """
+        提交一条待翻译文本，等待所在批次分发完成
+        
+        Args:
+            key: 批次键，相同键的文本可以合并到同一次上游调用
+            text: 要翻译的文本
+            
+        Returns:
+            (翻译结果或错误信息, 是否翻译成功, 实际使用的模型名称)
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        now = time.monotonic()
+        queue = self._queues.setdefault(key, [])
+        queue.append((text, future, now))
+        
+        if len(queue) >= self.max_batch:
+            self._stats["flush_full"] += 1
+            self._flush(key)
+        else:
+            # 每次有新文本到达时顺延窗口，但不超过首条文本的最长排队时间
+            timer, first_enqueued = self._timers.pop(key, (None, now))
+            if timer is not None:
+                timer.cancel()
+            deadline = min(now + self.window, first_enqueued + self.max_wait)
+            handle = loop.call_at(loop.time() + max(0.0, deadline - now), self._flush_by_timer, key)
+            self._timers[key] = (handle, first_enqueued)
+            
+        return await future
+    
+    def _flush_by_timer(self, key: Hashable) -> None:
+        """
+        定时器到期时分发批次
+        
+        Args:
+            key: 批次键
+        """
+        self._stats["flush_timer"] += 1
+        self._flush(key)
+    
+    def _flush(self, key: Hashable) -> None:
+        """
+        取出批次键下的全部待翻译文本并启动分发任务
+        
+        Args:
+            key: 批次键
+        """
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer[0].cancel()
+        items = self._queues.pop(key, [])
+        # 调用方已取消（如客户端断开）的文本不再翻译
+        items = [item for item in items if not item[1].done()]
+        if not items:
+            return
+        task = asyncio.get_running_loop().create_task(self._run_batch(key, items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _run_batch(self, key: Hashable, items: List[Tuple[str, asyncio.Future, float]]) -> None:
+        """
+        执行一个批次的分发并把结果交给各调用方
+        
+        Args:
+            key: 批次键
+            items: 批次中的 (文本, future, 入队时间)
+        """
+        now = time.monotonic()
+        self._record_batch(len(items), [now - enqueued_at for _, _, enqueued_at in items])
+        try:
+            results = await self._dispatch(key, [text for text, _, _ in items])
+        except Exception as e:
+            logger.error(f"微批分发失败: {str(e)}")
+            results = [(f"翻译错误: {str(e)}", False, None)] * len(items)
+        for (_, future, _), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+    
+    def _record_batch(self, size: int, delays: List[float]) -> None:
+        """
+        记录批次大小和排队延迟（同时导出为Prometheus直方图）
+        
+        Args:
+            size: 批次中的文本数
+            delays: 各文本的排队延迟（秒）
+        """
+        self._stats["batches"] += 1
+        self._stats["items"] += size
+        self._stats["max_batch_size"] = max(self._stats["max_batch_size"], size)
+        self._stats["queue_delay_seconds"] += sum(delays)
+        self._stats["max_queue_delay_seconds"] = max(self._stats["max_queue_delay_seconds"], max(delays))
+        for bucket in BATCH_SIZE_BUCKETS:
+            if size <= bucket:
+                self._size_buckets[bucket] += 1
+                break
+        else:
+            self._size_buckets["+Inf"] += 1
+        metrics_service.observe_batch(size, delays)
+    
+    async def shutdown(self) -> None:
+        """
+        立即分发所有排队中的文本并等待进行中的批次完成，在应用关闭时调用
+        """
+        for key in list(self._queues):
+            self._flush(key)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取调度器统计信息
+        
+        Returns:
+            批次数、文本数、平均/最大批次大小、平均/最大排队延迟以及批次大小分布
+        """
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["enabled"] = self.enabled
+        stats["avg_batch_size"] = round(stats["items"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["avg_queue_delay_seconds"] = round(stats["queue_delay_seconds"] / stats["items"], 4) if stats["items"] else 0.0
+        stats["queue_delay_seconds"] = round(stats["queue_delay_seconds"], 4)
+        stats["max_queue_delay_seconds"] = round(stats["max_queue_delay_seconds"], 4)
+        stats["pending"] = sum(len(queue) for queue in self._queues.values())
+        stats["batch_size_buckets"] = {str(bucket): count for bucket, count in self._size_buckets.items()}
+        return stats
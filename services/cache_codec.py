@@ -0,0 +1,287 @@
+import os
+import time
+import zlib
+import struct
+import hashlib
+import logging
+from typing import Any, Dict, Optional, Tuple
+from utils.env import env_flag
+
+# 配置日志记录器
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# 创建控制台处理器（如果还没有的话）
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+# 缓存值封装格式（小端序，固定头9字节）:
+#   标记(u8=0) 版本(u8) 压缩方式(u8) 写入时间(u32，Unix秒) 模型标识(u16) [压缩字典ID(u32)，仅 zstd_dict] 数据
+# 模型标识为模型名称的2字节摘要（避免每个值重复存储模型名称），可通过 model_tag() 与已配置的模型对应。
+# 旧格式的缓存值是直接写入的UTF-8文本，译文不会以 \0 开头，因此首字节为0的值按封装格式解析，其余按旧格式读取
+ENVELOPE_MARKER = 0
+ENVELOPE_VERSION = 1
+ENVELOPE_HEADER = struct.Struct("<BBBIH")
+DICT_ID = struct.Struct("<I")
+
+# 压缩方式
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODEC_ZSTD_DICT = 3
+CODEC_NAMES = {CODEC_RAW: "raw", CODEC_ZLIB: "zlib", CODEC_ZSTD: "zstd", CODEC_ZSTD_DICT: "zstd_dict"}
+
+# 各压缩方式的默认压缩级别
+DEFAULT_LEVELS = {"zlib": 6, "zstd": 3}
+
+def model_tag(model: str) -> int:
+    """
+    计算模型名称的2字节标识，未知模型为0
+    
+    Args:
+        model: 模型名称
+        
+    Returns:
+        模型标识
+    """
+    if not model:
+        return 0
+    return int.from_bytes(hashlib.blake2b(model.encode("utf-8"), digest_size=2).digest(), "little")
+
+class CacheCodec:
+    """
+    缓存值编解码：按版本化的二进制封装写入Redis，超过大小阈值的值压缩存储（zlib，或安装 zstandard 后使用zstd，
+    可加载训练好的压缩字典以提高短文本的压缩率），读取时兼容旧格式的纯文本值，并统计节省的字节数和编解码耗时
+    """
+    
+    def __init__(self):
+        """
+        读取封装与压缩配置
+        """
+        # 是否以封装格式写入；关闭时写入纯文本（读取始终兼容两种格式），所有实例升级后再开启
+        self.envelope_enabled = env_flag("CACHE_ENVELOPE_ENABLED")
+        # 压缩方式：zlib、zstd 或 none
+        self.compression = os.getenv("CACHE_COMPRESSION", "zlib").strip().lower()
+        # UTF-8编码后不小于该字节数的值才尝试压缩，压缩后没有变小时按原文存储
+        self.min_bytes = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", 128))
+        dict_path = os.getenv("CACHE_ZSTD_DICT", "").strip()
+        
+        self._zstd = None
+        self._zstd_compressor = None
+        self._zstd_decompressors: Dict[int, Any] = {}
+        self.dict_id = 0
+        try:
+            import zstandard
+            self._zstd = zstandard
+        except ImportError:
+            if self.compression == "zstd" or dict_path:
+                logger.warning("已配置zstd压缩但未安装zstandard，回退到zlib（可执行 pip install zstandard）")
+                self.compression = "zlib"
+        if self.compression not in ("zlib", "zstd", "none"):
+            logger.warning(f"不支持的缓存压缩方式 {self.compression}，回退到zlib")
+            self.compression = "zlib"
+        self.level = int(os.getenv("CACHE_COMPRESS_LEVEL", DEFAULT_LEVELS.get(self.compression, 0)))
+        
+        if self._zstd is not None:
+            dictionary = None
+            if dict_path:
+                try:
+                    with open(dict_path, "rb") as dict_file:
+                        dictionary = self._zstd.ZstdCompressionDict(dict_file.read())
+                    self.dict_id = dictionary.dict_id()
+                    logger.info(f"已加载zstd压缩字典 {dict_path}，字典ID: {self.dict_id}")
+                except (OSError, self._zstd.ZstdError) as e:
+                    logger.error(f"加载zstd压缩字典失败，不使用字典: {str(e)}")
+                    dictionary = None
+            # 译文通常很短，省去帧头中的魔数、字典ID和校验和（字典ID已记录在封装头中）
+            frame_format = self._zstd.FORMAT_ZSTD1_MAGICLESS
+            # 不带字典压缩的值也必须能读取
+            self._zstd_decompressors[0] = self._zstd.ZstdDecompressor(format=frame_format)
+            if dictionary is not None:
+                self._zstd_decompressors[self.dict_id] = self._zstd.ZstdDecompressor(dict_data=dictionary, format=frame_format)
+            if self.compression == "zstd":
+                params = self._zstd.ZstdCompressionParameters.from_level(
+                    self.level, format=frame_format, write_dict_id=False, write_checksum=False
+                )
+                self._zstd_compressor = self._zstd.ZstdCompressor(compression_params=params, dict_data=dictionary)
+                
+        self._stats = {
+            "encoded": 0,
+            "compressed": 0,
+            "raw_bytes": 0,
+            "stored_bytes": 0,
+            "encode_seconds": 0.0,
+            "decoded": 0,
+            "legacy_reads": 0,
+            "decode_errors": 0,
+            "decode_seconds": 0.0
+        }
+    
+    def _compress(self, data: bytes) -> Tuple[int, int, bytes]:
+        """
+        按配置压缩数据
+        
+        Args:
+            data: UTF-8编码的值
+            
+        Returns:
+            (压缩方式, 压缩字典ID, 数据)，未压缩或压缩后没有变小时为原数据
+        """
+        if self.compression == "none" or len(data) < self.min_bytes:
+            return CODEC_RAW, 0, data
+        if self.compression == "zstd":
+            compressed = self._zstd_compressor.compress(data)
+            codec, dict_id = (CODEC_ZSTD_DICT if self.dict_id else CODEC_ZSTD), self.dict_id
+        else:
+            compressed = zlib.compress(data, self.level)
+            codec, dict_id = CODEC_ZLIB, 0
+        if len(compressed) >= len(data):
+            return CODEC_RAW, 0, data
+        return codec, dict_id, compressed
+    
+    def _envelope(self, data: bytes, model: str) -> Tuple[int, bytes]:
+        """
+        按当前压缩配置把数据封装为二进制格式
+        
+        Args:
+            data: UTF-8编码的值
+            model: 模型名称
+            
+        Returns:
+            (压缩方式, 封装后的字节串)
+        """
+        codec, dict_id, payload = self._compress(data)
+        encoded = ENVELOPE_HEADER.pack(ENVELOPE_MARKER, ENVELOPE_VERSION, codec, int(time.time()), model_tag(model))
+        if codec == CODEC_ZSTD_DICT:
+            encoded += DICT_ID.pack(dict_id)
+        return codec, encoded + payload
+    
+    def estimate(self, value: str) -> int:
+        """
+        估算按当前压缩配置以封装格式写入时的字节数（不论是否开启封装写入，不计入统计），用于评估开启封装或调整压缩配置的收益
+        
+        Args:
+            value: 缓存值
+            
+        Returns:
+            封装后的字节数
+        """
+        return len(self._envelope(value.encode("utf-8"), "")[1])
+    
+    def encode(self, value: str, model: str = "") -> bytes:
+        """
+        把缓存值编码为写入Redis的字节串
+        
+        Args:
+            value: 缓存值（译文或序列化后的OCR结果）
+            model: 模型名称（以模型标识写入封装头）
+            
+        Returns:
+            封装后的字节串；未开启封装时为UTF-8文本
+        """
+        start_time = time.perf_counter()
+        data = value.encode("utf-8")
+        if self.envelope_enabled:
+            codec, encoded = self._envelope(data, model)
+            if codec != CODEC_RAW:
+                self._stats["compressed"] += 1
+        else:
+            encoded = data
+        self._stats["encoded"] += 1
+        self._stats["raw_bytes"] += len(data)
+        self._stats["stored_bytes"] += len(encoded)
+        self._stats["encode_seconds"] += time.perf_counter() - start_time
+        return encoded
+    
+    def inspect(self, raw: bytes) -> Dict[str, Any]:
+        """
+        解析Redis中的缓存值
+        
+        Args:
+            raw: Redis返回的字节串
+            
+        Returns:
+            format（legacy、raw、zlib、zstd、zstd_dict）、text、created_at、model_tag（旧格式的后两项为None）
+            
+        Raises:
+            ValueError: 版本、压缩方式或压缩字典不受支持，或数据已损坏
+        """
+        if raw[0] != ENVELOPE_MARKER:
+            return {"format": "legacy", "text": raw.decode("utf-8"), "created_at": None, "model_tag": None}
+        try:
+            _, version, codec, created_at, tag = ENVELOPE_HEADER.unpack_from(raw, 0)
+            offset = ENVELOPE_HEADER.size
+            dict_id = 0
+            if codec == CODEC_ZSTD_DICT:
+                dict_id = DICT_ID.unpack_from(raw, offset)[0]
+                offset += DICT_ID.size
+        except struct.error as e:
+            raise ValueError("缓存值封装头不完整") from e
+        if version != ENVELOPE_VERSION:
+            raise ValueError(f"不支持的缓存值封装版本: {version}")
+        payload = raw[offset:]
+        if codec == CODEC_RAW:
+            data = payload
+        elif codec == CODEC_ZLIB:
+            try:
+                data = zlib.decompress(payload)
+            except zlib.error as e:
+                raise ValueError("zlib数据已损坏") from e
+        elif codec in (CODEC_ZSTD, CODEC_ZSTD_DICT):
+            decompressor = self._zstd_decompressors.get(dict_id)
+            if decompressor is None:
+                raise ValueError(f"缺少zstd解压缩所需的压缩字典（ID: {dict_id}）或未安装zstandard")
+            try:
+                data = decompressor.decompress(payload)
+            except self._zstd.ZstdError as e:
+                raise ValueError("zstd数据已损坏") from e
+        else:
+            raise ValueError(f"不支持的压缩方式: {codec}")
+        return {"format": CODEC_NAMES[codec], "text": data.decode("utf-8"), "created_at": created_at, "model_tag": tag}
+    
+    def decode(self, raw: Optional[bytes]) -> Optional[str]:
+        """
+        解码Redis中的缓存值，兼容旧格式的纯文本值
+        
+        Args:
+            raw: Redis返回的字节串
+            
+        Returns:
+            缓存值；不存在或无法解码时返回None（按未命中处理）
+        """
+        if not raw:
+            return None
+        start_time = time.perf_counter()
+        try:
+            item = self.inspect(raw)
+        except (ValueError, UnicodeDecodeError) as e:
+            self._stats["decode_errors"] += 1
+            logger.warning(f"缓存值无法解码，按未命中处理: {str(e)}")
+            return None
+        finally:
+            self._stats["decode_seconds"] += time.perf_counter() - start_time
+        self._stats["decoded"] += 1
+        if item["format"] == "legacy":
+            self._stats["legacy_reads"] += 1
+        return item["text"]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取编解码统计信息
+        
+        Returns:
+            写入与读取次数、写入前后的字节数与节省比例、平均编解码耗时（微秒）以及当前配置
+        """
+        stats: Dict[str, Any] = {key: value for key, value in self._stats.items() if not key.endswith("_seconds")}
+        stats["saved_bytes"] = self._stats["raw_bytes"] - self._stats["stored_bytes"]
+        stats["saved_ratio"] = round(stats["saved_bytes"] / self._stats["raw_bytes"], 4) if self._stats["raw_bytes"] else 0.0
+        stats["avg_encode_us"] = round(self._stats["encode_seconds"] / self._stats["encoded"] * 1e6, 2) if self._stats["encoded"] else 0.0
+        decodes = self._stats["decoded"] + self._stats["decode_errors"]
+        stats["avg_decode_us"] = round(self._stats["decode_seconds"] / decodes * 1e6, 2) if decodes else 0.0
+        stats["envelope"] = self.envelope_enabled
+        stats["compression"] = self.compression
+        stats["zstd_dict_id"] = self.dict_id
+        return stats
@@ -1,10 +1,14 @@
-import redis
+import redis.asyncio as redis
 import os
+import time
 import json
-import base64
+import hashlib
 import re
 import logging
-from typing import List, Dict, Optional, Union
+from typing import List, Dict, Optional, Tuple, Union
+from utils.lru_cache import LRUCache
+from services.metrics_service import metrics_service
+from services.cache_codec import CacheCodec
 
 # 配置日志记录器
 logger = logging.getLogger(__name__)
@@ -17,37 +21,87 @@ if not logger.handlers:
     handler.setFormatter(formatter)
     logger.addHandler(handler)
 
+# 缓存键前缀与结构版本，键的生成规则变化时需递增版本号，
+# 旧版本的键可通过 python -m scripts.cache_admin flush-version 清理
+CACHE_KEY_PREFIX = "wistrans"
+CACHE_KEY_VERSION = "v1"
+
+# 释放跨进程短锁：只删除值仍为本次持有者令牌的锁，避免锁过期后删除其他进程重新获取的锁
+RELEASE_LOCKS_SCRIPT = """
+local released = 0
+for _, key in ipairs(KEYS) do
+    if redis.call("GET", key) == ARGV[1] then
+        released = released + redis.call("DEL", key)
+    end
+end
+return released
+"""
+
 class CacheService:
     """
-    Redis缓存服务类，用于处理翻译结果的缓存
+    Redis缓存服务类，用于处理翻译结果的缓存（基于asyncio的Redis客户端，不阻塞事件循环）
     """
     
     def __init__(self):
         """
-        初始化Redis连接
+        初始化Redis连接（连接在首次使用时建立）
         """
         redis_host = os.getenv("REDIS_HOST", "localhost")
         redis_port = int(os.getenv("REDIS_PORT", 6379))
         redis_db = int(os.getenv("REDIS_DB", 0))
         
+        # Redis短暂不可用时快速失败，由L1缓存继续提供命中结果
+        redis_timeout = float(os.getenv("REDIS_SOCKET_TIMEOUT", 2))
+        # 连接Redis失败后的退避秒数：期间跳过Redis、只使用L1缓存，避免每个请求都等待连接超时，0 表示不退避
+        self.redis_error_backoff = float(os.getenv("REDIS_ERROR_BACKOFF", 5))
+        self._redis_retry_at = 0.0
+        
+        # 缓存值以二进制封装（可能压缩）存储，因此客户端不自动解码，返回值为 bytes，需要文本时由调用方显式解码
         self.redis_client = redis.Redis(
             host=redis_host,
             port=redis_port,
             db=redis_db,
-            decode_responses=True
+            decode_responses=False,
+            socket_timeout=redis_timeout,
+            socket_connect_timeout=redis_timeout
         )
+        self.codec = CacheCodec()
+        self._release_locks_script = self.redis_client.register_script(RELEASE_LOCKS_SCRIPT)
         
         # 句子级缓存TTL（30分钟）
         self.sentence_ttl = 30 * 60
         # 单词级缓存TTL（60分钟）
         self.word_ttl = 60 * 60
         
+        # OCR结果缓存TTL（默认24小时），为0时不缓存OCR结果
+        self.ocr_ttl = int(os.getenv("OCR_CACHE_TTL", 24 * 60 * 60))
+        # 单条OCR结果序列化后的最大字节数，超过时不缓存（避免大图的结果占满Redis）
+        self.ocr_max_bytes = int(os.getenv("OCR_CACHE_MAX_BYTES", 256 * 1024))
+        
+        # 进程内L1缓存，TTL不超过Redis中最短的TTL
+        l1_ttl = min(float(os.getenv("L1_CACHE_TTL", 5 * 60)), self.sentence_ttl, self.word_ttl)
+        self.l1_cache = LRUCache(
+            max_entries=int(os.getenv("L1_CACHE_MAX_ENTRIES", 10000)),
+            max_bytes=int(os.getenv("L1_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+            ttl=l1_ttl
+        )
+        # OCR结果单条可达数百KB，使用独立的L1缓存，不挤占翻译结果的L1容量；字节上限为0时OCR结果不进入L1
+        self.ocr_l1_cache = LRUCache(
+            max_entries=int(os.getenv("OCR_L1_CACHE_MAX_ENTRIES", 256)),
+            max_bytes=int(os.getenv("OCR_L1_CACHE_MAX_BYTES", 8 * 1024 * 1024)),
+            ttl=min(float(os.getenv("L1_CACHE_TTL", 5 * 60)), self.ocr_ttl)
+        )
+        # Redis（L2）统计，skipped 为连接失败后退避期间跳过Redis的次数
+        self.redis_stats = {"hits": 0, "misses": 0, "errors": 0, "skipped": 0}
+        # OCR结果缓存统计
+        self.ocr_stats = {"hits": 0, "misses": 0, "skipped_too_large": 0}
+        
         logger.info(f"Redis缓存服务初始化完成，连接地址: {redis_host}:{redis_port}, 数据库: {redis_db}")
     
     def _generate_cache_key(self, key_type: str, text: str, target_language: str, 
                            model_name: str, extra_args: Optional[dict] = None) -> str:
         """
-        生成缓存键
+        生成缓存键，格式为 wistrans:<版本>:<类型>:<BLAKE2摘要>，读写共用
         
         Args:
             key_type: 键类型 ('sentence', 'word')
@@ -68,20 +122,137 @@ class CacheService:
                 cleaned_text = text
             text = cleaned_text
         
-        # 构造键数据
-        key_data = f"{key_type}:{text}:{target_language}:{model_name}"
-        if extra_args:
-            extra_str = json.dumps(extra_args, sort_keys=True)
-            key_data += f":{extra_str}"
+        # 规范化编码：字段顺序固定、extra_args 按键排序，None 与空参数视为相同
+        canonical = json.dumps(
+            [key_type, text, target_language, model_name, extra_args or {}],
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str
+        )
+        # 定长摘要：不同语言、模型和参数组合得到不同的键
+        digest = hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+        
+        return f"{CACHE_KEY_PREFIX}:{CACHE_KEY_VERSION}:{key_type}:{digest}"
+    
+    def _l1_for(self, key_type: str) -> LRUCache:
+        """
+        获取某类缓存使用的L1缓存
+        
+        Args:
+            key_type: 键类型 ('sentence', 'word', 'ocr')
             
-        # 生成键名：可读部分 + 编码部分
-        readable_part = text[:30].replace(' ', '_')
-        encoded_part = base64.b64encode(key_data.encode()).decode()[:20]
-        final_key = f"{readable_part}_{encoded_part}"
+        Returns:
+            OCR结果使用独立的L1缓存，翻译结果共用同一个L1缓存
+        """
+        return self.ocr_l1_cache if key_type == "ocr" else self.l1_cache
+    
+    def _redis_backing_off(self) -> bool:
+        """
+        是否处于连接失败后的退避期（退避期间跳过Redis）
         
-        return final_key
+        Returns:
+            处于退避期时返回True
+        """
+        if time.monotonic() < self._redis_retry_at:
+            self.redis_stats["skipped"] += 1
+            return True
+        return False
     
-    def get_sentence_cache(self, text: str, target_language: str, model_name: str, 
+    def _record_redis_error(self, error: redis.RedisError) -> None:
+        """
+        记录Redis错误，连接失败或超时时开始退避
+        
+        Args:
+            error: Redis异常
+        """
+        self.redis_stats["errors"] += 1
+        if self.redis_error_backoff > 0 and isinstance(error, (redis.ConnectionError, redis.TimeoutError)):
+            self._redis_retry_at = time.monotonic() + self.redis_error_backoff
+            logger.warning(f"Redis连接失败，{self.redis_error_backoff:g} 秒内跳过Redis，仅使用L1缓存")
+    
+    async def _get_many(self, key_type: str, cache_keys: List[str], ttl: int) -> List[Optional[str]]:
+        """
+        分层批量读取缓存：先查L1，未命中的键再用一次MGET查询Redis，并回填L1
+        
+        Args:
+            key_type: 键类型 ('sentence', 'word', 'ocr')，用于指标标签
+            cache_keys: 缓存键列表
+            ttl: 该类缓存在Redis中的TTL（回填L1时作为上限）
+            
+        Returns:
+            与缓存键顺序一致的结果列表，未命中的位置为None
+        """
+        start_time = time.perf_counter()
+        l1_cache = self._l1_for(key_type)
+        results: List[Optional[str]] = [l1_cache.get(cache_key) for cache_key in cache_keys]
+        missed_keys = [cache_key for cache_key, result in zip(cache_keys, results) if result is None]
+        l1_hits = len(cache_keys) - len(missed_keys)
+        if not missed_keys:
+            metrics_service.observe_cache_lookup(key_type, time.perf_counter() - start_time, l1_hits, 0, 0, 0)
+            return results
+        if self._redis_backing_off():
+            metrics_service.observe_cache_lookup(key_type, time.perf_counter() - start_time, l1_hits, 0, 0, len(missed_keys))
+            return results
+        
+        try:
+            redis_results = await self.redis_client.mget(missed_keys)
+        except redis.RedisError as e:
+            # Redis不可用时按未命中处理，L1命中的结果照常返回
+            self._record_redis_error(e)
+            logger.warning(f"Redis查询失败，仅使用L1缓存结果: {str(e)}")
+            metrics_service.observe_cache_lookup(key_type, time.perf_counter() - start_time, l1_hits, 0, 0, len(missed_keys))
+            return results
+        
+        redis_hits = 0
+        redis_values = dict(zip(missed_keys, redis_results))
+        for index, cache_key in enumerate(cache_keys):
+            if results[index] is not None:
+                continue
+            value = self.codec.decode(redis_values.get(cache_key))
+            if value:
+                self.redis_stats["hits"] += 1
+                redis_hits += 1
+                l1_cache.set(cache_key, value, ttl)
+                results[index] = value
+            else:
+                self.redis_stats["misses"] += 1
+        metrics_service.observe_cache_lookup(key_type, time.perf_counter() - start_time, l1_hits, redis_hits,
+                                             len(missed_keys) - redis_hits, 0)
+        return results
+    
+    async def _set_many(self, key_type: str, entries: Dict[str, str], ttl: int, models: Optional[Dict[str, str]] = None) -> bool:
+        """
+        批量写入缓存：写入L1，并把编码后的值使用一次流水线写入Redis（SETEX）
+        
+        Args:
+            key_type: 键类型 ('sentence', 'word', 'ocr')，决定写入哪个L1缓存
+            entries: 缓存键 -> 缓存值
+            ttl: 过期时间（秒）
+            models: 缓存键 -> 模型名称，写入封装元数据
+            
+        Returns:
+            是否全部写入Redis成功
+        """
+        if not entries:
+            return True
+        l1_cache = self._l1_for(key_type)
+        for cache_key, value in entries.items():
+            l1_cache.set(cache_key, value, ttl)
+        if self._redis_backing_off():
+            return False
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for cache_key, value in entries.items():
+                    pipe.setex(cache_key, ttl, self.codec.encode(value, (models or {}).get(cache_key, "")))
+                results = await pipe.execute()
+        except redis.RedisError as e:
+            self._record_redis_error(e)
+            logger.warning(f"Redis写入失败，结果仅保存在L1缓存: {str(e)}")
+            return False
+        return all(results)
+    
+    async def get_sentence_cache(self, text: str, target_language: str, model_name: str, 
                           extra_args: Optional[dict] = None) -> Optional[str]:
         """
         获取句子级缓存
@@ -99,7 +270,7 @@ class CacheService:
 
         cache_key = self._generate_cache_key("sentence", text, target_language, model_name, extra_args)
         
-        result = self.redis_client.get(cache_key)
+        result = (await self._get_many("sentence", [cache_key], self.sentence_ttl))[0]
         
         if result:
             # logger.info(f"已在缓存中找到句子翻译结果: {text}")
@@ -113,7 +284,7 @@ class CacheService:
             
         return result
     
-    def set_sentence_cache(self, text: str, target_language: str, model_name: str, 
+    async def set_sentence_cache(self, text: str, target_language: str, model_name: str, 
                           translated_text: str, extra_args: Optional[dict] = None) -> bool:
         """
         设置句子级缓存
@@ -129,7 +300,7 @@ class CacheService:
             是否设置成功
         """
         cache_key = self._generate_cache_key("sentence", text, target_language, model_name, extra_args)
-        result = self.redis_client.setex(cache_key, self.sentence_ttl, translated_text)
+        result = await self._set_many("sentence", {cache_key: translated_text}, self.sentence_ttl, {cache_key: model_name})
         
         if result:
             logger.debug(f"句子级缓存设置成功: {cache_key}")
@@ -138,7 +309,7 @@ class CacheService:
             
         return result
     
-    def get_word_cache(self, word: str, target_language: str, model_name: str, 
+    async def get_word_cache(self, word: str, target_language: str, model_name: str, 
                       extra_args: Optional[dict] = None) -> Optional[str]:
         """
         获取单词级缓存
@@ -152,29 +323,9 @@ class CacheService:
         Returns:
             缓存的翻译结果，如果没有则返回None
         """
-        # 先检查缓存，避免不必要的缓存键生成
-        key_type = "word"
-        # 清理文本，移除非字母数字字符（保留中文、英文字母和数字）
-        cleaned_text = re.sub(r'[^\w\u4e00-\u9fff]', '', word, flags=re.UNICODE)
-        if not cleaned_text:
-            # 如果清理后为空，使用原始文本
-            logger.warning(f"单词清理后为空，使用原始文本生成缓存键: {word}")
-            cleaned_text = word
-        cache_text = cleaned_text
-        
-        # 构造初步的键数据用于检查缓存
-        key_data = f"{key_type}:{cache_text}:{target_language}:{model_name}"
-        if extra_args:
-            extra_str = json.dumps(extra_args, sort_keys=True)
-            key_data += f":{extra_str}"
-            
-        # 生成可读部分
-        readable_part = cache_text[:30].replace(' ', '_')
-        # 先使用部分数据生成初步键
-        encoded_part = base64.b64encode(key_data[:50].encode()).decode()[:10]
-        cache_key = f"{readable_part}_{encoded_part}"
-        
-        result = self.redis_client.get(cache_key)
+        cache_key = self._generate_cache_key("word", word, target_language, model_name, extra_args)
+        
+        result = (await self._get_many("word", [cache_key], self.word_ttl))[0]
         
         if result:
             # logger.info(f"已在缓存中找到单词翻译结果: {word}")
@@ -188,7 +339,7 @@ class CacheService:
             
         return result
     
-    def set_word_cache(self, word: str, target_language: str, model_name: str, 
+    async def set_word_cache(self, word: str, target_language: str, model_name: str, 
                       translated_word: str, extra_args: Optional[dict] = None) -> bool:
         """
         设置单词级缓存
@@ -204,7 +355,7 @@ class CacheService:
             是否设置成功
         """
         cache_key = self._generate_cache_key("word", word, target_language, model_name, extra_args)
-        result = self.redis_client.setex(cache_key, self.word_ttl, translated_word)
+        result = await self._set_many("word", {cache_key: translated_word}, self.word_ttl, {cache_key: model_name})
         
         if result:
             logger.debug(f"单词级缓存设置成功: {cache_key}")
@@ -213,5 +364,300 @@ class CacheService:
             
         return result
 
+    async def get_sentence_cache_many(self, items: List[Tuple[str, str]], target_language: str,
+                                      extra_args: Optional[dict] = None) -> List[Optional[str]]:
+        """
+        批量获取句子级缓存（一次MGET往返）
+        
+        Args:
+            items: (句子, 模型名称) 列表
+            target_language: 目标语言
+            extra_args: 额外参数
+            
+        Returns:
+            与输入顺序一致的缓存结果列表，未命中的位置为None
+        """
+        cache_keys = [
+            self._generate_cache_key("sentence", text, target_language, model_name, extra_args)
+            for text, model_name in items
+        ]
+        results = await self._get_many("sentence", cache_keys, self.sentence_ttl)
+        logger.info(f"句子级缓存批量查询完成: 命中 {sum(1 for r in results if r)}/{len(results)}")
+        return results
+    
+    async def set_sentence_cache_many(self, items: List[Tuple[str, str, str]], target_language: str,
+                                      extra_args: Optional[dict] = None) -> bool:
+        """
+        批量设置句子级缓存（一次流水线往返）
+        
+        Args:
+            items: (原始句子, 模型名称, 翻译结果) 列表
+            target_language: 目标语言
+            extra_args: 额外参数
+            
+        Returns:
+            是否全部设置成功
+        """
+        entries = {}
+        models = {}
+        for text, model_name, translated_text in items:
+            cache_key = self._generate_cache_key("sentence", text, target_language, model_name, extra_args)
+            entries[cache_key] = translated_text
+            models[cache_key] = model_name
+        result = await self._set_many("sentence", entries, self.sentence_ttl, models)
+        
+        if result:
+            logger.debug(f"句子级缓存批量设置成功: {len(entries)} 条")
+        else:
+            logger.error(f"句子级缓存批量设置失败: {len(entries)} 条")
+            
+        return result
+    
+    async def get_word_cache_many(self, words: List[str], target_language: str, model_name: str,
+                                  extra_args: Optional[dict] = None) -> List[Optional[str]]:
+        """
+        批量获取单词级缓存（一次MGET往返）
+        
+        Args:
+            words: 单词列表
+            target_language: 目标语言
+            model_name: 模型名称
+            extra_args: 额外参数
+            
+        Returns:
+            与输入顺序一致的缓存结果列表，未命中的位置为None
+        """
+        cache_keys = [
+            self._generate_cache_key("word", word, target_language, model_name, extra_args)
+            for word in words
+        ]
+        results = await self._get_many("word", cache_keys, self.word_ttl)
+        logger.info(f"单词级缓存批量查询完成: 命中 {sum(1 for r in results if r)}/{len(results)}")
+        return results
+    
+    async def set_word_cache_many(self, items: List[Tuple[str, str]], target_language: str, model_name: str,
+                                  extra_args: Optional[dict] = None) -> bool:
+        """
+        批量设置单词级缓存（一次流水线往返）
+        
+        Args:
+            items: (原始单词, 翻译结果) 列表
+            target_language: 目标语言
+            model_name: 模型名称
+            extra_args: 额外参数
+            
+        Returns:
+            是否全部设置成功
+        """
+        entries = {
+            self._generate_cache_key("word", word, target_language, model_name, extra_args): translated_word
+            for word, translated_word in items
+        }
+        result = await self._set_many("word", entries, self.word_ttl, dict.fromkeys(entries, model_name))
+        
+        if result:
+            logger.debug(f"单词级缓存批量设置成功: {len(entries)} 条")
+        else:
+            logger.error(f"单词级缓存批量设置失败: {len(entries)} 条")
+            
+        return result
+    
+    def _generate_ocr_cache_key(self, image_digest: str) -> str:
+        """
+        生成OCR结果缓存键，格式为 wistrans:<版本>:ocr:<像素摘要>
+        
+        Args:
+            image_digest: 解码后像素数据的摘要
+            
+        Returns:
+            生成的缓存键
+        """
+        return f"{CACHE_KEY_PREFIX}:{CACHE_KEY_VERSION}:ocr:{image_digest}"
+    
+    async def get_ocr_cache(self, image_digest: str) -> Optional[dict]:
+        """
+        获取OCR结果缓存
+        
+        Args:
+            image_digest: 解码后像素数据的摘要
+            
+        Returns:
+            缓存的OCR结果（detected_text、full_text），如果没有则返回None
+        """
+        return (await self.get_ocr_cache_many([image_digest]))[0]
+    
+    async def set_ocr_cache(self, image_digest: str, ocr_result: dict) -> bool:
+        """
+        设置OCR结果缓存，序列化后超过大小上限的结果不缓存
+        
+        Args:
+            image_digest: 解码后像素数据的摘要
+            ocr_result: OCR结果（detected_text、full_text）
+            
+        Returns:
+            是否设置成功
+        """
+        return await self.set_ocr_cache_many([(image_digest, ocr_result)])
+    
+    async def get_ocr_cache_many(self, image_digests: List[str]) -> List[Optional[dict]]:
+        """
+        批量获取OCR结果缓存（一次MGET往返）
+        
+        Args:
+            image_digests: 像素摘要列表
+            
+        Returns:
+            与输入顺序一致的缓存结果列表，未命中的位置为None
+        """
+        if self.ocr_ttl <= 0:
+            return [None] * len(image_digests)
+        cache_keys = [self._generate_ocr_cache_key(image_digest) for image_digest in image_digests]
+        values = await self._get_many("ocr", cache_keys, self.ocr_ttl)
+        results: List[Optional[dict]] = []
+        for value in values:
+            if value:
+                self.ocr_stats["hits"] += 1
+                results.append(json.loads(value))
+            else:
+                self.ocr_stats["misses"] += 1
+                results.append(None)
+        logger.info(f"OCR结果缓存查询完成: 命中 {sum(1 for r in results if r is not None)}/{len(results)}")
+        return results
+    
+    async def set_ocr_cache_many(self, items: List[Tuple[str, dict]]) -> bool:
+        """
+        批量设置OCR结果缓存（一次流水线往返），序列化后超过大小上限的结果不缓存
+        
+        Args:
+            items: (像素摘要, OCR结果) 列表
+            
+        Returns:
+            是否全部设置成功
+        """
+        if self.ocr_ttl <= 0:
+            return False
+        entries = {}
+        for image_digest, ocr_result in items:
+            value = json.dumps(ocr_result, ensure_ascii=False, separators=(",", ":"))
+            size = len(value.encode("utf-8"))
+            if size > self.ocr_max_bytes:
+                self.ocr_stats["skipped_too_large"] += 1
+                logger.info(f"OCR结果超过缓存大小上限，不缓存: {size} 字节")
+                continue
+            entries[self._generate_ocr_cache_key(image_digest)] = value
+        if not entries:
+            return False
+        result = await self._set_many("ocr", entries, self.ocr_ttl)
+        
+        if not result:
+            logger.error(f"OCR结果缓存设置失败: {len(entries)} 条")
+            
+        return result
+    
+    async def poll_locked(self, cache_keys: List[str]) -> List[Tuple[Optional[str], bool]]:
+        """
+        轮询其他进程正在翻译的缓存键：一次流水线往返同时读取缓存值（MGET）和对应的锁是否仍存在（EXISTS）。
+        只读Redis，不计入缓存命中/未命中统计和指标
+        
+        Args:
+            cache_keys: 缓存键列表
+            
+        Returns:
+            与缓存键顺序一致的 (缓存值或None, 锁是否仍存在) 列表；Redis不可用时视为全部未写入且锁已释放
+        """
+        if not cache_keys:
+            return []
+        if self._redis_backing_off():
+            return [(None, False)] * len(cache_keys)
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.mget(cache_keys)
+                for cache_key in cache_keys:
+                    pipe.exists(f"{cache_key}:lock")
+                raw_values, *locks = await pipe.execute()
+        except redis.RedisError as e:
+            self._record_redis_error(e)
+            logger.warning(f"Redis轮询失败，停止等待其他进程: {str(e)}")
+            return [(None, False)] * len(cache_keys)
+        return [(self.codec.decode(raw), bool(locked)) for raw, locked in zip(raw_values, locks)]
+    
+    async def acquire_locks(self, cache_keys: List[str], ttl_ms: int, token: str) -> List[bool]:
+        """
+        为缓存键批量获取跨进程短锁（SET NX PX，一次流水线往返），锁的值为持有者令牌
+        
+        Args:
+            cache_keys: 缓存键列表
+            ttl_ms: 锁的过期时间（毫秒）
+            token: 持有者令牌（每次获取随机生成），释放时用于确认锁仍归自己所有
+            
+        Returns:
+            与缓存键顺序一致的是否获取成功列表；Redis不可用时视为全部获取成功
+        """
+        if not cache_keys:
+            return []
+        if self._redis_backing_off():
+            return [True] * len(cache_keys)
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for cache_key in cache_keys:
+                    pipe.set(f"{cache_key}:lock", token, nx=True, px=ttl_ms)
+                results = await pipe.execute()
+        except redis.RedisError as e:
+            self._record_redis_error(e)
+            logger.warning(f"Redis锁获取失败，按本进程独立翻译处理: {str(e)}")
+            return [True] * len(cache_keys)
+        return [bool(result) for result in results]
+    
+    async def release_locks(self, cache_keys: List[str], token: str) -> None:
+        """
+        释放缓存键对应的跨进程短锁（Lua脚本比较令牌后删除），已过期并被其他进程重新获取的锁不受影响
+        
+        Args:
+            cache_keys: 缓存键列表
+            token: 获取锁时使用的持有者令牌
+        """
+        if not cache_keys or self._redis_backing_off():
+            return
+        try:
+            await self._release_locks_script(keys=[f"{cache_key}:lock" for cache_key in cache_keys], args=[token])
+        except redis.RedisError as e:
+            self._record_redis_error(e)
+            logger.warning(f"Redis锁释放失败，将等待其自动过期: {str(e)}")
+    
+    async def ping(self) -> bool:
+        """
+        检查Redis是否可用
+        
+        Returns:
+            Redis是否可以正常响应
+        """
+        try:
+            return bool(await self.redis_client.ping())
+        except redis.RedisError as e:
+            logger.warning(f"Redis连接检查失败: {str(e)}")
+            return False
+    
+    def get_stats(self) -> Dict[str, dict]:
+        """
+        获取各级缓存的统计信息
+        
+        Returns:
+            l1（进程内缓存）和 redis 两级的命中、未命中、淘汰/错误次数，OCR结果的L1缓存与命中情况，以及缓存值编解码统计
+        """
+        return {
+            "l1": self.l1_cache.get_stats(),
+            "ocr_l1": self.ocr_l1_cache.get_stats(),
+            "redis": dict(self.redis_stats),
+            "ocr": dict(self.ocr_stats),
+            "codec": self.codec.get_stats()
+        }
+    
+    async def close(self) -> None:
+        """
+        关闭Redis连接池，在应用关闭时调用
+        """
+        await self.redis_client.aclose()
+        logger.info("Redis缓存服务连接已关闭")
+
 # 创建全局缓存服务实例
 cache_service = CacheService()
\ No newline at end of file
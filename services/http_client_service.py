@@ -0,0 +1,214 @@
+import os
+import time
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Iterable, Optional
+import httpx
+from utils.env import env_flag
+
+# 配置日志记录器
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# 创建控制台处理器（如果还没有的话）
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+class HttpClientService:
+    """
+    上游HTTP客户端服务类，为每个模型提供商维护一个长连接复用的 httpx.AsyncClient
+    """
+    
+    def __init__(self):
+        """
+        读取连接池与超时配置
+        """
+        self.max_connections = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", 100))
+        self.max_keepalive_connections = int(os.getenv("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", 20))
+        self.keepalive_expiry = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", 30))
+        self.timeout = float(os.getenv("UPSTREAM_TIMEOUT", 30))
+        self.connect_timeout = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", 10))
+        self.pool_timeout = float(os.getenv("UPSTREAM_POOL_TIMEOUT", 10))
+        self.http2 = env_flag("UPSTREAM_HTTP2")
+        
+        if self.http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("已开启UPSTREAM_HTTP2但未安装h2，回退到HTTP/1.1（可执行 pip install httpx[http2]）")
+                self.http2 = False
+                
+        # 提供商名称 -> 客户端
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        # 提供商名称 -> 连接池统计
+        self._stats: Dict[str, dict] = {}
+        # 是否已完成启动（客户端已预创建）
+        self.started = False
+    
+    def _create_client(self, provider: str) -> httpx.AsyncClient:
+        """
+        创建提供商专用的客户端
+        
+        Args:
+            provider: 提供商名称
+            
+        Returns:
+            配置好连接池与超时的 httpx.AsyncClient
+        """
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+        timeout = httpx.Timeout(self.timeout, connect=self.connect_timeout, pool=self.pool_timeout)
+        client = httpx.AsyncClient(limits=limits, timeout=timeout, http2=self.http2)
+        self._stats[provider] = {
+            "requests": 0,
+            "in_flight": 0,
+            "peak_in_flight": 0,
+            "saturated": 0,
+            "pool_timeouts": 0,
+            "errors": 0,
+            "total_seconds": 0.0
+        }
+        logger.info(f"已创建上游HTTP客户端: {provider} (最大连接数: {self.max_connections}, HTTP/2: {self.http2})")
+        return client
+    
+    async def startup(self, providers: Iterable[str] = ()) -> None:
+        """
+        预先创建各提供商的客户端，在应用启动时调用
+        
+        Args:
+            providers: 需要预创建客户端的提供商名称
+        """
+        for provider in providers:
+            self.get_client(provider)
+        self.started = True
+    
+    async def shutdown(self) -> None:
+        """
+        关闭所有客户端并释放连接，在应用关闭时调用
+        """
+        self.started = False
+        for provider, client in list(self._clients.items()):
+            await client.aclose()
+            logger.info(f"已关闭上游HTTP客户端: {provider}")
+        self._clients.clear()
+    
+    def get_client(self, provider: str) -> httpx.AsyncClient:
+        """
+        获取提供商对应的共享客户端，不存在或已关闭时重新创建
+        
+        Args:
+            provider: 提供商名称
+            
+        Returns:
+            共享的 httpx.AsyncClient
+        """
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            client = self._create_client(provider)
+            self._clients[provider] = client
+        return client
+    
+    async def post(self, provider: str, url: str, headers: Optional[dict] = None,
+                   json: Optional[dict] = None) -> httpx.Response:
+        """
+        通过提供商的共享客户端发送POST请求，并记录连接池使用情况
+        
+        Args:
+            provider: 提供商名称
+            url: 请求地址
+            headers: 请求头
+            json: JSON请求体
+            
+        Returns:
+            上游响应
+        """
+        client = self.get_client(provider)
+        stats = self._stats[provider]
+        
+        # 并发请求数达到连接上限时，新请求需要排队等待空闲连接
+        if stats["in_flight"] >= self.max_connections:
+            stats["saturated"] += 1
+            logger.warning(f"上游连接池已饱和: {provider} (进行中请求: {stats['in_flight']})")
+            
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+        start_time = time.perf_counter()
+        try:
+            return await client.post(url, headers=headers, json=json)
+        except httpx.PoolTimeout:
+            stats["pool_timeouts"] += 1
+            stats["errors"] += 1
+            raise
+        except httpx.HTTPError:
+            stats["errors"] += 1
+            raise
+        finally:
+            stats["in_flight"] -= 1
+            stats["total_seconds"] += time.perf_counter() - start_time
+    
+    @asynccontextmanager
+    async def stream(self, provider: str, url: str, headers: Optional[dict] = None,
+                     json: Optional[dict] = None) -> AsyncIterator[httpx.Response]:
+        """
+        通过提供商的共享客户端发送流式POST请求，响应体读取完毕或提前退出时释放连接
+        
+        Args:
+            provider: 提供商名称
+            url: 请求地址
+            headers: 请求头
+            json: JSON请求体
+            
+        Returns:
+            可逐行读取响应体的上游响应（异步上下文管理器）
+        """
+        client = self.get_client(provider)
+        stats = self._stats[provider]
+        
+        if stats["in_flight"] >= self.max_connections:
+            stats["saturated"] += 1
+            logger.warning(f"上游连接池已饱和: {provider} (进行中请求: {stats['in_flight']})")
+            
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+        start_time = time.perf_counter()
+        try:
+            async with client.stream("POST", url, headers=headers, json=json) as response:
+                yield response
+        except httpx.PoolTimeout:
+            stats["pool_timeouts"] += 1
+            stats["errors"] += 1
+            raise
+        except httpx.HTTPError:
+            stats["errors"] += 1
+            raise
+        finally:
+            stats["in_flight"] -= 1
+            stats["total_seconds"] += time.perf_counter() - start_time
+    
+    def get_stats(self) -> Dict[str, dict]:
+        """
+        获取各提供商连接池的统计信息
+        
+        Returns:
+            提供商名称 -> 统计信息（请求数、进行中请求、峰值、饱和次数、连接池超时次数等）
+        """
+        stats = {}
+        for provider, provider_stats in self._stats.items():
+            item = dict(provider_stats)
+            item["max_connections"] = self.max_connections
+            item["utilization"] = round(item["in_flight"] / self.max_connections, 4) if self.max_connections else 0.0
+            item["avg_seconds"] = round(item["total_seconds"] / item["requests"], 4) if item["requests"] else 0.0
+            item["total_seconds"] = round(item["total_seconds"], 4)
+            stats[provider] = item
+        return stats
+
+# 创建全局上游HTTP客户端服务实例
+http_client_service = HttpClientService()
@@ -0,0 +1,279 @@
+import time
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, MutableMapping, Optional, Tuple, Union
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, GCCollector, PlatformCollector, ProcessCollector,
+    generate_latest, CONTENT_TYPE_LATEST
+)
+
+# 配置日志记录器
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# 创建控制台处理器（如果还没有的话）
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+# 指标名称前缀
+METRICS_NAMESPACE = "wistrans"
+
+# 允许作为标签值的HTTP方法，其他方法统一记为 other
+HTTP_METHODS = ("GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS")
+
+# 各类耗时的直方图分桶（秒）
+REQUEST_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+CACHE_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+OCR_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BATCH_DELAY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+# 每个请求的片段数分桶
+SEGMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+# 微批调度每个批次的文本数分桶
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+ASGIApp = Callable[[MutableMapping[str, Any], Callable[[], Awaitable[dict]], Callable[[dict], Awaitable[None]]], Awaitable[None]]
+
+class MetricsService:
+    """
+    Prometheus指标服务：汇总接口、上游模型、缓存和OCR各环节的耗时与计数。
+    所有标签取值都来自有限集合（路由模板、提供商、已配置的模型、状态码等），
+    请求路径、文本内容等无界取值不会作为标签
+    """
+    
+    def __init__(self):
+        """
+        创建独立的指标注册表并注册各项指标
+        """
+        self.registry = CollectorRegistry()
+        # 进程级指标：CPU、内存、文件描述符、GC等
+        ProcessCollector(registry=self.registry)
+        PlatformCollector(registry=self.registry)
+        GCCollector(registry=self.registry)
+        
+        self.http_request_seconds = Histogram(
+            "http_request_duration_seconds", "接口端到端耗时（流式接口包含整个响应流）",
+            ["route", "method", "status"], namespace=METRICS_NAMESPACE,
+            buckets=REQUEST_BUCKETS, registry=self.registry
+        )
+        self.upstream_request_seconds = Histogram(
+            "upstream_request_duration_seconds", "单次上游模型调用耗时（每次重试单独计入）",
+            ["provider", "model"], namespace=METRICS_NAMESPACE,
+            buckets=REQUEST_BUCKETS, registry=self.registry
+        )
+        self.upstream_errors = Counter(
+            "upstream_errors", "上游模型调用失败次数，status 为HTTP状态码、transport（网络错误）或 circuit_open（熔断期间快速失败）",
+            ["provider", "status"], namespace=METRICS_NAMESPACE, registry=self.registry
+        )
+        self.upstream_tokens = Counter(
+            "upstream_tokens", "上游返回的 usage 中统计的token数",
+            ["provider", "model", "type"], namespace=METRICS_NAMESPACE, registry=self.registry
+        )
+        self.cache_lookup_seconds = Histogram(
+            "cache_lookup_duration_seconds", "一次分层缓存查询（L1 + Redis MGET）的耗时",
+            ["kind"], namespace=METRICS_NAMESPACE, buckets=CACHE_BUCKETS, registry=self.registry
+        )
+        self.cache_requests = Counter(
+            "cache_requests", "各级缓存的查询结果（每个缓存键计一次）",
+            ["kind", "level", "result"], namespace=METRICS_NAMESPACE, registry=self.registry
+        )
+        self.memory_lookups = Counter(
+            "translation_memory_lookups", "翻译记忆查询结果：reuse（直接复用，避免一次模型调用）、fewshot（提供少样本示例）、miss",
+            ["result"], namespace=METRICS_NAMESPACE, registry=self.registry
+        )
+        self.ocr_seconds = Histogram(
+            "ocr_duration_seconds", "OCR各阶段在工作池中的执行耗时（不含排队）",
+            ["stage"], namespace=METRICS_NAMESPACE, buckets=OCR_BUCKETS, registry=self.registry
+        )
+        self.segments_per_request = Histogram(
+            "segments_per_request", "每个翻译请求包含的片段（单词、文本行）数",
+            ["route"], namespace=METRICS_NAMESPACE, buckets=SEGMENT_BUCKETS, registry=self.registry
+        )
+        self.batch_size = Histogram(
+            "batch_size", "跨请求微批调度每个批次合并的文本数",
+            namespace=METRICS_NAMESPACE, buckets=BATCH_SIZE_BUCKETS, registry=self.registry
+        )
+        self.batch_queue_delay_seconds = Histogram(
+            "batch_queue_delay_seconds", "文本在微批调度器中等待分发的时间（每条文本计一次）",
+            namespace=METRICS_NAMESPACE, buckets=BATCH_DELAY_BUCKETS, registry=self.registry
+        )
+    
+    def observe_request(self, route: str, method: str, status_code: int, seconds: float) -> None:
+        """
+        记录一次接口请求
+        
+        Args:
+            route: 路由模板（未匹配任何路由时为 unmatched）
+            method: HTTP方法
+            status_code: 响应状态码
+            seconds: 端到端耗时
+        """
+        method = method if method in HTTP_METHODS else "other"
+        self.http_request_seconds.labels(route, method, f"{status_code // 100}xx").observe(seconds)
+    
+    def observe_upstream(self, provider: str, model: str, status: Union[int, str], seconds: float) -> None:
+        """
+        记录一次上游模型调用
+        
+        Args:
+            provider: 提供商名称
+            model: 模型名称（调用方需保证来自已配置的模型）
+            status: HTTP状态码，网络错误时为 transport
+            seconds: 调用耗时
+        """
+        self.upstream_request_seconds.labels(provider, model).observe(seconds)
+        if not (isinstance(status, int) and status < 400):
+            self.upstream_errors.labels(provider, str(status)).inc()
+    
+    def count_upstream_error(self, provider: str, status: str) -> None:
+        """
+        记录一次未发出请求的上游失败（如熔断期间快速失败）
+        
+        Args:
+            provider: 提供商名称
+            status: 失败类型
+        """
+        self.upstream_errors.labels(provider, status).inc()
+    
+    def record_token_usage(self, provider: str, model: str, usage: Optional[dict]) -> None:
+        """
+        累计上游返回的token用量
+        
+        Args:
+            provider: 提供商名称
+            model: 模型名称
+            usage: 上游响应中的 usage 字段（OpenAI兼容格式），没有时忽略
+        """
+        if not isinstance(usage, dict):
+            return
+        for token_type in ("prompt_tokens", "completion_tokens"):
+            count = usage.get(token_type)
+            if isinstance(count, int) and count > 0:
+                self.upstream_tokens.labels(provider, model, token_type[:-len("_tokens")]).inc(count)
+    
+    def observe_cache_lookup(self, kind: str, seconds: float, l1_hits: int, redis_hits: int,
+                             redis_misses: int, redis_errors: int) -> None:
+        """
+        记录一次分层缓存查询
+        
+        Args:
+            kind: 缓存类型（sentence、word、ocr）
+            seconds: 查询耗时
+            l1_hits: L1命中的键数
+            redis_hits: Redis命中的键数
+            redis_misses: Redis未命中的键数
+            redis_errors: Redis查询失败而未能查询的键数
+        """
+        self.cache_lookup_seconds.labels(kind).observe(seconds)
+        counts = {
+            ("l1", "hit"): l1_hits,
+            ("l1", "miss"): redis_hits + redis_misses + redis_errors,
+            ("redis", "hit"): redis_hits,
+            ("redis", "miss"): redis_misses,
+            ("redis", "error"): redis_errors
+        }
+        for (level, result), count in counts.items():
+            if count:
+                self.cache_requests.labels(kind, level, result).inc(count)
+    
+    def count_dictionary_lookup(self, hits: int, misses: int) -> None:
+        """
+        记录一次本地单词词典的批量查询
+        
+        Args:
+            hits: 命中的单词数
+            misses: 未命中的单词数
+        """
+        if hits:
+            self.cache_requests.labels("word", "dictionary", "hit").inc(hits)
+        if misses:
+            self.cache_requests.labels("word", "dictionary", "miss").inc(misses)
+    
+    def count_memory_lookup(self, result: str) -> None:
+        """
+        记录一次翻译记忆查询
+        
+        Args:
+            result: 查询结果（reuse、fewshot、miss）
+        """
+        self.memory_lookups.labels(result).inc()
+    
+    def observe_ocr(self, stage: str, seconds: float) -> None:
+        """
+        记录一次OCR任务的执行耗时
+        
+        Args:
+            stage: 阶段（decode：解码与摘要，inference：检测与识别）
+            seconds: 执行耗时
+        """
+        self.ocr_seconds.labels(stage).observe(seconds)
+    
+    def observe_segments(self, route: str, count: int) -> None:
+        """
+        记录一个翻译请求的片段数
+        
+        Args:
+            route: 路由
+            count: 片段数
+        """
+        self.segments_per_request.labels(route).observe(count)
+    
+    def observe_batch(self, size: int, delays: List[float]) -> None:
+        """
+        记录微批调度器分发的一个批次
+        
+        Args:
+            size: 批次中的文本数
+            delays: 各文本的排队延迟（秒）
+        """
+        self.batch_size.observe(size)
+        for delay in delays:
+            self.batch_queue_delay_seconds.observe(delay)
+    
+    def render(self) -> Tuple[bytes, str]:
+        """
+        以Prometheus文本格式导出所有指标
+        
+        Returns:
+            (指标内容, Content-Type)
+        """
+        return generate_latest(self.registry), CONTENT_TYPE_LATEST
+
+class MetricsMiddleware:
+    """
+    记录每个HTTP请求端到端耗时的ASGI中间件；在响应体发送完毕后计时，
+    因此流式接口的耗时覆盖整个响应流。路由标签使用匹配到的路由模板而不是原始路径
+    """
+    
+    def __init__(self, app: ASGIApp):
+        """
+        Args:
+            app: 下游ASGI应用
+        """
+        self.app = app
+    
+    async def __call__(self, scope: MutableMapping[str, Any], receive: Callable[[], Awaitable[dict]],
+                       send: Callable[[dict], Awaitable[None]]) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+            
+        start_time = time.perf_counter()
+        status_code = 500
+        
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+            
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # 路由匹配后框架会把命中的路由写入 scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            metrics_service.observe_request(route, scope["method"], status_code, time.perf_counter() - start_time)
+
+# 创建全局指标服务实例
+metrics_service = MetricsService()
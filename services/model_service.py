@@ -1,12 +1,26 @@
 import os
+import time
+import secrets
+import asyncio
 import httpx
-from typing import List
-from utils.schemas import Segment
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from utils.schemas import Segment, WordItem
 import json
 from dotenv import load_dotenv
 import re
 from langchain.prompts import PromptTemplate
 from services.cache_service import cache_service
+from services.http_client_service import http_client_service
+from services.batch_scheduler import BatchScheduler
+from services.singleflight import SingleFlight
+from services.provider_router import ProviderRouter
+from services.upstream_limiter import upstream_limiter, classify_response, parse_retry_after
+from services.metrics_service import metrics_service
+from services.translation_memory import translation_memory
+from services.word_dictionary import word_dictionary
+from utils.tag_stream import TagStreamExtractor
+from utils.text_segmenter import normalize_text, split_sentences, join_sentences
+from utils.env import env_flag
 import logging
 
 # 配置日志记录器
@@ -23,26 +37,176 @@ if not logger.handlers:
 # 加载环境变量
 load_dotenv()
 
+# 默认的单模型最大并发上游请求数，可被各模型的 max_concurrency_env 覆盖
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("MODEL_MAX_CONCURRENCY", 8))
+
+# 打包模式下单次请求的默认字符预算和片段数上限，可通过 extra_args 的 pack_max_chars / pack_max_segments 覆盖
+PACK_MAX_CHARS = int(os.getenv("PACK_MAX_CHARS", 2000))
+PACK_MAX_SEGMENTS = int(os.getenv("PACK_MAX_SEGMENTS", 40))
+
+# 批量翻译片段前的预处理：规范化空白、Unicode（NFC）和HTML实体，使仅格式不同的片段共用缓存；
+# 开启按句拆分后，长度不低于 SENTENCE_SPLIT_MIN_CHARS 的片段拆成句子逐句缓存和翻译，再按原顺序拼接
+TEXT_NORMALIZE_ENABLED = env_flag("TEXT_NORMALIZE_ENABLED", "true")
+# 规范化时是否把换行也合并为空格（会改变原文的分行排版，默认保留换行）
+TEXT_NORMALIZE_NEWLINES = env_flag("TEXT_NORMALIZE_NEWLINES")
+SENTENCE_SPLIT_ENABLED = env_flag("SENTENCE_SPLIT_ENABLED")
+SENTENCE_SPLIT_MIN_CHARS = int(os.getenv("SENTENCE_SPLIT_MIN_CHARS", 120))
+
+# extra_args 中只控制处理方式、不影响译文的参数，不参与提示词和缓存键
+CONTROL_ARG_KEYS = ("pack", "pack_max_chars", "pack_max_segments", "route")
+
 # 模型配置
 MODEL_CONFIGS = {
     "deepseek-chat": {
+        "provider": "deepseek",
         "url": "https://api.deepseek.com/chat/completions",
-        "api_key_env": "DEEPSEEK_API_KEY"
+        "api_key_env": "DEEPSEEK_API_KEY",
+        "max_concurrency_env": "DEEPSEEK_MAX_CONCURRENCY"
     },
     "qwen-turbo-latest": {
+        "provider": "qwen",
         "url": "https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions",
-        "api_key_env": "QWEN_API_KEY"
+        "api_key_env": "QWEN_API_KEY",
+        "max_concurrency_env": "QWEN_MAX_CONCURRENCY"
     },
     "gpt-4o": {
+        "provider": "openai",
         "url": "https://api.openai.com/v1/chat/completions",
-        "api_key_env": "OPENAI_API_KEY"
+        "api_key_env": "OPENAI_API_KEY",
+        "max_concurrency_env": "OPENAI_MAX_CONCURRENCY"
     },
     "kimi-k2-0711-preview": {
+        "provider": "kimi",
         "url": "https://api.moonshot.cn/v1/chat/completions",
-        "api_key_env": "KIMI_API_KEY"
+        "api_key_env": "KIMI_API_KEY",
+        "max_concurrency_env": "KIMI_MAX_CONCURRENCY"
     }
 }
 
+# 模型配置必须包含的字段
+MODEL_CONFIG_KEYS = ("provider", "url", "api_key_env", "max_concurrency_env")
+
+def _apply_model_config_overrides(configs: Dict[str, dict]) -> None:
+    """
+    按环境变量 MODEL_CONFIGS_OVERRIDE 覆盖或新增模型配置，用于把上游指向代理或本地模拟服务。
+    取值为JSON对象：模型名称 -> 要覆盖的配置项，模型名称为 "*" 时作用于所有模型，新增的模型需提供全部字段
+    
+    Args:
+        configs: 模型配置（原地修改）
+    
+    Raises:
+        ValueError: 覆盖配置不合法
+    """
+    raw = os.getenv("MODEL_CONFIGS_OVERRIDE", "").strip()
+    if not raw:
+        return
+    try:
+        overrides = json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"MODEL_CONFIGS_OVERRIDE 不是合法的JSON: {str(e)}")
+    if not isinstance(overrides, dict) or not all(isinstance(override, dict) for override in overrides.values()):
+        raise ValueError("MODEL_CONFIGS_OVERRIDE 必须是 模型名称 -> 配置项 的JSON对象")
+    
+    for config in configs.values():
+        config.update(overrides.get("*", {}))
+    for model_name, override in overrides.items():
+        if model_name == "*":
+            continue
+        if model_name not in configs:
+            missing = [key for key in MODEL_CONFIG_KEYS if key not in override]
+            if missing:
+                raise ValueError(f"MODEL_CONFIGS_OVERRIDE 新增的模型 {model_name} 缺少配置项: {', '.join(missing)}")
+            configs[model_name] = {}
+        configs[model_name].update(override)
+    logger.info(f"已应用模型配置覆盖: {', '.join(overrides)}")
+
+_apply_model_config_overrides(MODEL_CONFIGS)
+
+def _get_max_concurrency(model_name: str) -> int:
+    """
+    获取模型的最大并发上游请求数，作为其提供商自适应并发窗口的上限
+    
+    Args:
+        model_name: 模型名称（未知模型与 deepseek-chat 共用同一配置）
+        
+    Returns:
+        最大并发数
+    """
+    config = MODEL_CONFIGS.get(model_name, MODEL_CONFIGS["deepseek-chat"])
+    return max(1, int(os.getenv(config["max_concurrency_env"], DEFAULT_MAX_CONCURRENCY)))
+
+def _metric_model(model_name: str) -> str:
+    """
+    获取模型在指标中的标签值，未配置的模型名称统一记为 other，避免标签取值无界
+    
+    Args:
+        model_name: 请求中的模型名称
+    
+    Returns:
+        标签值
+    """
+    return model_name if model_name in MODEL_CONFIGS else "other"
+
+async def _post_to_model(model_name: str, config: dict, headers: dict, payload: dict) -> dict:
+    """
+    通过提供商的共享客户端调用指定模型的 chat/completions 接口
+    
+    Args:
+        model_name: 模型名称（用于并发限制）
+        config: 模型配置
+        headers: 请求头
+        payload: 请求体
+    
+    Returns:
+        上游返回的JSON结果
+    """
+    async def send() -> httpx.Response:
+        # 每次尝试（包括重试）单独记录耗时和状态码；被取消的调用（如对冲落败）不计入
+        start_time = time.perf_counter()
+        try:
+            response = await http_client_service.post(config["provider"], config["url"], headers=headers, json=payload)
+        except httpx.TransportError:
+            metrics_service.observe_upstream(config["provider"], _metric_model(model_name), "transport", time.perf_counter() - start_time)
+            raise
+        metrics_service.observe_upstream(config["provider"], _metric_model(model_name), response.status_code, time.perf_counter() - start_time)
+        return response
+    
+    # 受提供商自适应并发窗口约束，限流和暂时性错误按退避策略重试，熔断期间快速失败
+    response = await upstream_limiter.request(config["provider"], _get_max_concurrency(model_name), send)
+    result = response.json()
+    metrics_service.record_token_usage(config["provider"], _metric_model(model_name), result.get("usage"))
+    return result
+
+# 延迟感知路由：ROUTER_ENABLED 开启、请求通过 extra_args 的 route 允许改投、且请求的模型在 ROUTER_MODELS 内时生效
+provider_router = ProviderRouter(
+    name for name, config in MODEL_CONFIGS.items() if os.getenv(config["api_key_env"])
+)
+
+async def _post_chat_completion(model_name: str, config: dict, headers: dict, payload: dict,
+                                route: bool = False) -> Tuple[dict, str]:
+    """
+    调用 chat/completions 接口；请求允许改投时由 provider_router 选择最快的健康模型，并按需发出对冲请求
+    
+    Args:
+        model_name: 请求的模型名称
+        config: 请求的模型配置
+        headers: 请求头
+        payload: 请求体
+        route: 是否允许改投到其他模型
+    
+    Returns:
+        (上游返回的JSON结果, 实际使用的模型名称)
+    """
+    async def call(candidate: str) -> dict:
+        if candidate == model_name:
+            return await _post_to_model(model_name, config, headers, payload)
+        # 提示词与模型无关，改投时只需替换密钥和模型名称
+        candidate_config = MODEL_CONFIGS[candidate]
+        candidate_headers = dict(headers, Authorization=f"Bearer {os.getenv(candidate_config['api_key_env'])}")
+        return await _post_to_model(candidate, candidate_config, candidate_headers, dict(payload, model=candidate))
+    
+    return await provider_router.call(model_name, call, route)
+
 # 定义身份角色描述
 IDENTITY_DESCRIPTIONS = {
     "通用专家": "你是一个通用领域的翻译专家，擅长各种类型的文本翻译。",
@@ -82,9 +246,159 @@ word_translation_prompt = PromptTemplate.from_template("""{identity_description}
 
 {extra_instructions}""")
 
+# 定义多片段打包翻译提示词模板
+packed_translation_prompt = PromptTemplate.from_template("""{identity_description}
+
+请将以下每个<seg>标签内的文本分别翻译为{target_language}。
+
+原始文本：
+{segments}
+
+请严格按照以下格式输出，每个输入片段对应一个输出片段并保留其id，不要合并或拆分片段，不要添加任何额外说明：
+<seg id="片段id">[在此处输出该片段的翻译结果]</seg>
+
+{extra_instructions}""")
+
+# 定义多单词打包翻译提示词模板
+packed_word_translation_prompt = PromptTemplate.from_template("""{identity_description}
+
+请将以下每个<seg>标签内的单词分别翻译为{target_language}。
+
+原始单词：
+{segments}
+
+请严格按照以下格式输出，每个输入单词对应一个输出片段并保留其id，不要添加任何额外说明：
+<seg id="单词id">[在此处输出该单词的翻译结果]</seg>
+
+{extra_instructions}""")
+
+def _normalize_input(text: str) -> str:
+    """
+    规范化待翻译文本（TEXT_NORMALIZE_ENABLED 关闭时原样返回），各翻译入口共用，使同一文本得到相同的缓存键
+    
+    Args:
+        text: 原始文本
+    
+    Returns:
+        用于生成缓存键和请求模型的文本
+    """
+    return normalize_text(text, TEXT_NORMALIZE_NEWLINES) if TEXT_NORMALIZE_ENABLED else text
+
+def _split_extra_args(extra_args: Optional[dict]) -> Tuple[Optional[dict], dict]:
+    """
+    将 extra_args 拆分为影响译文的翻译参数和控制处理方式的参数
+    
+    Args:
+        extra_args: 请求中的额外参数
+    
+    Returns:
+        (翻译参数, 控制参数)，翻译参数为空时返回None
+    """
+    if not extra_args:
+        return extra_args, {}
+    translation_args = {key: value for key, value in extra_args.items() if key not in CONTROL_ARG_KEYS}
+    options = {key: value for key, value in extra_args.items() if key in CONTROL_ARG_KEYS}
+    return translation_args or None, options
+
+def _build_sentence_request(text: str, target_language: str, model_name: str = "deepseek-chat", extra_args: dict = None,
+                            examples: Optional[List[Tuple[str, str]]] = None) -> Tuple[dict, dict, dict]:
+    """
+    构造文本翻译的上游请求
+    
+    Args:
+        text: 要翻译的文本
+        target_language: 目标语言
+        model_name: 使用的模型名称
+        extra_args: 额外的翻译要求
+        examples: 翻译记忆中相似句子的 (原文, 译文)，作为少样本示例
+    
+    Returns:
+        (模型配置, 请求头, 请求体)
+    """
+    # 获取模型配置
+    config = MODEL_CONFIGS.get(model_name, MODEL_CONFIGS["deepseek-chat"])
+    
+    # 获取API密钥
+    api_key = os.getenv(config["api_key_env"])
+    if not api_key:
+        raise ValueError(f"API密钥未配置: {config['api_key_env']}")
+    
+    # 获取身份角色描述
+    identity = extra_args.get("identity") if extra_args else None
+    identity_description = IDENTITY_DESCRIPTIONS.get(identity, "你是一个专业的翻译AI")
+    
+    # 构造额外说明
+    extra_instructions = ""
+    if extra_args and "style" in extra_args:
+        extra_instructions = f"翻译风格要求: {extra_args['style']}"
+    if examples:
+        references = "\n".join(f"原文：{source}\n译文：{translation}" for source, translation in examples)
+        extra_instructions = "\n\n".join(filter(None, [
+            extra_instructions,
+            f"以下是相似句子的已有译文，请保持术语和表达方式一致：\n{references}"
+        ]))
+    
+    # 使用PromptTemplate生成提示词
+    prompt = translation_prompt.format(
+        identity_description=identity_description,
+        target_language=target_language,
+        text=text,
+        extra_instructions=extra_instructions
+    )
+    
+    # 构造请求头
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    
+    # 构造请求体
+    payload = {
+        "model": model_name,
+        "messages": [
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.7
+    }
+    
+    return config, headers, payload
+
+async def _request_sentence_translation(text: str, target_language: str, model_name: str = "deepseek-chat", extra_args: dict = None,
+                                       examples: Optional[List[Tuple[str, str]]] = None, route: bool = False) -> Tuple[str, str]:
+    """
+    调用大模型API翻译文本（不读写缓存）
+    
+    Args:
+        text: 要翻译的文本
+        target_language: 目标语言
+        model_name: 使用的模型名称
+        extra_args: 额外的翻译要求
+        examples: 作为少样本示例的 (原文, 译文)
+        route: 是否允许改投到其他模型
+    
+    Returns:
+        (翻译后的文本, 实际使用的模型名称)
+    """
+    config, headers, payload = _build_sentence_request(text, target_language, model_name, extra_args, examples)
+    
+    # 发送请求
+    result, used_model = await _post_chat_completion(model_name, config, headers, payload, route)
+    translated_text = result["choices"][0]["message"]["content"]
+    
+    # 使用正则表达式提取标签内的内容
+    match = re.search(r"<translated_text>(.*?)</translated_text>", translated_text, re.DOTALL)
+    if match:
+        # 提取标签内的内容并去除首尾空白
+        translated_text = match.group(1).strip()
+    else:
+        # 如果没有找到标签，返回原始响应（向后兼容）
+        translated_text = translated_text
+    
+    return translated_text, used_model
+
 async def translate_sentence(text: str, target_language: str, model_name: str = "deepseek-chat", extra_args: dict = None) -> str:
     """
-    调用大模型API进行文本翻译
+    调用大模型API进行文本翻译，优先读取句子级缓存
     
     Args:
         text: 要翻译的文本
@@ -95,8 +409,11 @@ async def translate_sentence(text: str, target_language: str, model_name: str =
     Returns:
         翻译后的文本
     """
+    extra_args, _ = _split_extra_args(extra_args)
+    text = _normalize_input(text)
+    
     # 首先检查句子级缓存
-    cached_result = cache_service.get_sentence_cache(text, target_language, model_name, extra_args)
+    cached_result = await cache_service.get_sentence_cache(text, target_language, model_name, extra_args)
     if cached_result:
         logger.info(f"已在缓存中找到句子翻译结果: {text}")
         full_cache_key = cache_service._generate_cache_key("sentence", text, target_language, model_name, extra_args)
@@ -107,6 +424,107 @@ async def translate_sentence(text: str, target_language: str, model_name: str =
         cache_key = cache_service._generate_cache_key("sentence", text, target_language, model_name, extra_args)
         logger.debug(f"生成缓存键: {cache_key} (类型: sentence)")
     
+    translated_text, _ = await _request_sentence_translation(text, target_language, model_name, extra_args)
+    
+    # 将翻译结果存入句子级缓存
+    await cache_service.set_sentence_cache(text, target_language, model_name, translated_text, extra_args)
+    # 日志已在cache_service中打印
+    
+    return translated_text
+
+async def stream_sentence_translation(text: str, target_language: str, model_name: str = "deepseek-chat", extra_args: dict = None) -> AsyncIterator[str]:
+    """
+    流式翻译文本：使用上游的 stream 模式，检测到 <translated_text> 开始标签后逐块输出译文，
+    完成后将完整译文写入句子级缓存（标签未闭合时不写入）；命中缓存时直接一次性输出
+    
+    Args:
+        text: 要翻译的文本
+        target_language: 目标语言
+        model_name: 使用的模型名称
+        extra_args: 额外的翻译要求
+    
+    Returns:
+        异步生成的译文片段
+    """
+    extra_args, _ = _split_extra_args(extra_args)
+    text = _normalize_input(text)
+    
+    # 首先检查句子级缓存
+    cached_result = await cache_service.get_sentence_cache(text, target_language, model_name, extra_args)
+    if cached_result:
+        logger.info(f"已在缓存中找到句子翻译结果: {text}")
+        yield cached_result
+        return
+    logger.info(f"未在缓存中找到句子翻译结果，将流式调用模型API: {text}")
+    
+    config, headers, payload = _build_sentence_request(text, target_language, model_name, extra_args)
+    payload["stream"] = True
+    extractor = TagStreamExtractor("translated_text")
+    
+    # 受提供商自适应并发窗口约束（已输出部分译文后无法重试，因此流式请求不重试），生成器提前关闭时连接随之释放
+    limiter = upstream_limiter.get_limiter(config["provider"], _get_max_concurrency(model_name))
+    await limiter.acquire()
+    outcome, retry_after = "cancelled", None
+    status = "transport"
+    start_time = time.perf_counter()
+    try:
+        async with http_client_service.stream(config["provider"], config["url"], headers=headers, json=payload) as response:
+            status = response.status_code
+            outcome = classify_response(response)
+            if outcome != "success":
+                retry_after = parse_retry_after(response)
+            if response.is_error:
+                await response.aread()
+            response.raise_for_status()
+            # 解析OpenAI兼容的SSE输出：每行 "data: {...}"，以 "data: [DONE]" 结束
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                # 部分提供商在最后一个数据块中附带本次调用的 usage
+                metrics_service.record_token_usage(config["provider"], _metric_model(model_name), chunk.get("usage"))
+                choices = chunk.get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content") or ""
+                output = extractor.feed(delta)
+                if output:
+                    yield output
+    except httpx.TransportError:
+        outcome = "error"
+        raise
+    finally:
+        # 流式调用的耗时覆盖整个响应流；收到响应头之前被取消的调用不计入
+        if outcome != "cancelled" or status != "transport":
+            metrics_service.observe_upstream(config["provider"], _metric_model(model_name), status, time.perf_counter() - start_time)
+        await limiter.release(outcome, retry_after)
+    
+    output = extractor.finish()
+    if output:
+        yield output
+    
+    # 将完整译文存入句子级缓存；标签未闭合时结果与非流式解析不一致，不写入共享缓存
+    if not extractor.complete:
+        logger.warning(f"流式输出中的 <translated_text> 标签未闭合，跳过写入缓存: {text}")
+        return
+    await cache_service.set_sentence_cache(text, target_language, model_name, extractor.text, extra_args)
+
+async def _request_word_translation(word: str, target_language: str, model_name: str = "deepseek-chat", extra_args: dict = None,
+                                   route: bool = False) -> Tuple[str, str]:
+    """
+    调用大模型API翻译单词（不读写缓存）
+    
+    Args:
+        word: 要翻译的单词
+        target_language: 目标语言
+        model_name: 使用的模型名称
+        extra_args: 额外的翻译要求
+        route: 是否允许改投到其他模型
+    
+    Returns:
+        (翻译后的单词, 实际使用的模型名称)
+    """
     # 获取模型配置
     config = MODEL_CONFIGS.get(model_name, MODEL_CONFIGS["deepseek-chat"])
     
@@ -125,10 +543,10 @@ async def translate_sentence(text: str, target_language: str, model_name: str =
         extra_instructions = f"翻译风格要求: {extra_args['style']}"
     
     # 使用PromptTemplate生成提示词
-    prompt = translation_prompt.format(
+    prompt = word_translation_prompt.format(
         identity_description=identity_description,
         target_language=target_language,
-        text=text,
+        word=word,
         extra_instructions=extra_instructions
     )
     
@@ -144,35 +562,27 @@ async def translate_sentence(text: str, target_language: str, model_name: str =
         "messages": [
             {"role": "user", "content": prompt}
         ],
-        "temperature": 0.7
+        "temperature": 0.3  # 单词翻译使用较低的温度值以获得更一致的结果
     }
     
     # 发送请求
-    async with httpx.AsyncClient() as client:
-        response = await client.post(config["url"], headers=headers, json=payload, timeout=30.0)
-        response.raise_for_status()
-        
-        result = response.json()
-        translated_text = result["choices"][0]["message"]["content"]
-        
-        # 使用正则表达式提取标签内的内容
-        match = re.search(r"<translated_text>(.*?)</translated_text>", translated_text, re.DOTALL)
-        if match:
-            # 提取标签内的内容并去除首尾空白
-            translated_text = match.group(1).strip()
-        else:
-            # 如果没有找到标签，返回原始响应（向后兼容）
-            translated_text = translated_text
-        
-        # 将翻译结果存入句子级缓存
-        cache_service.set_sentence_cache(text, target_language, model_name, translated_text, extra_args)
-        # 日志已在cache_service中打印
-        
-        return translated_text
+    result, used_model = await _post_chat_completion(model_name, config, headers, payload, route)
+    translated_word = result["choices"][0]["message"]["content"]
+    
+    # 使用正则表达式提取标签内的内容
+    match = re.search(r"<translated_word>(.*?)</translated_word>", translated_word, re.DOTALL)
+    if match:
+        # 提取标签内的内容并去除首尾空白
+        translated_word = match.group(1).strip()
+    else:
+        # 如果没有找到标签，返回原始响应（向后兼容）
+        translated_word = translated_word
+    
+    return translated_word, used_model
 
 async def translate_word(word: str, target_language: str, model_name: str = "deepseek-chat", extra_args: dict = None) -> str:
     """
-    调用大模型API进行单词翻译
+    调用大模型API进行单词翻译，优先读取单词级缓存
     
     Args:
         word: 要翻译的单词
@@ -183,8 +593,10 @@ async def translate_word(word: str, target_language: str, model_name: str = "dee
     Returns:
         翻译后的单词
     """
+    extra_args, _ = _split_extra_args(extra_args)
+    
     # 首先检查单词级缓存
-    cached_result = cache_service.get_word_cache(word, target_language, model_name, extra_args)
+    cached_result = await cache_service.get_word_cache(word, target_language, model_name, extra_args)
     if cached_result:
         logger.info(f"已在缓存中找到单词翻译结果: {word}")
         full_cache_key = cache_service._generate_cache_key("word", word, target_language, model_name, extra_args)
@@ -195,6 +607,30 @@ async def translate_word(word: str, target_language: str, model_name: str = "dee
         cache_key = cache_service._generate_cache_key("word", word, target_language, model_name, extra_args)
         logger.debug(f"生成缓存键: {cache_key} (类型: word)")
     
+    translated_word, _ = await _request_word_translation(word, target_language, model_name, extra_args)
+    
+    # 将翻译结果存入单词级缓存
+    await cache_service.set_word_cache(word, target_language, model_name, translated_word, extra_args)
+    # 日志已在cache_service中打印
+    
+    return translated_word
+
+async def _request_packed_translation(kind: str, texts: List[str], target_language: str, model_name: str,
+                                      extra_args: dict = None, route: bool = False) -> Tuple[Dict[int, str], str]:
+    """
+    在一次模型调用中翻译多个片段，片段以 <seg id="序号"> 标记，并按序号解析结果
+    
+    Args:
+        kind: 翻译类型（"sentence" 或 "word"）
+        texts: 要翻译的文本列表
+        target_language: 目标语言
+        model_name: 使用的模型名称
+        extra_args: 额外的翻译要求
+        route: 是否允许改投到其他模型
+    
+    Returns:
+        (序号 -> 翻译结果, 实际使用的模型名称)，缺失或格式错误的序号不会出现在结果中
+    """
     # 获取模型配置
     config = MODEL_CONFIGS.get(model_name, MODEL_CONFIGS["deepseek-chat"])
     
@@ -212,11 +648,12 @@ async def translate_word(word: str, target_language: str, model_name: str = "dee
     if extra_args and "style" in extra_args:
         extra_instructions = f"翻译风格要求: {extra_args['style']}"
     
-    # 使用PromptTemplate生成提示词
-    prompt = word_translation_prompt.format(
+    # 使用序号作为片段id，避免客户端id中的特殊字符破坏标签结构
+    prompt_template = packed_translation_prompt if kind == "sentence" else packed_word_translation_prompt
+    prompt = prompt_template.format(
         identity_description=identity_description,
         target_language=target_language,
-        word=word,
+        segments="\n".join(f'<seg id="{index}">{text}</seg>' for index, text in enumerate(texts)),
         extra_instructions=extra_instructions
     )
     
@@ -232,58 +669,685 @@ async def translate_word(word: str, target_language: str, model_name: str = "dee
         "messages": [
             {"role": "user", "content": prompt}
         ],
-        "temperature": 0.3  # 单词翻译使用较低的温度值以获得更一致的结果
+        "temperature": 0.7 if kind == "sentence" else 0.3
     }
     
     # 发送请求
-    async with httpx.AsyncClient() as client:
-        response = await client.post(config["url"], headers=headers, json=payload, timeout=30.0)
-        response.raise_for_status()
-        
-        result = response.json()
-        translated_word = result["choices"][0]["message"]["content"]
-        
-        # 使用正则表达式提取标签内的内容
-        match = re.search(r"<translated_word>(.*?)</translated_word>", translated_word, re.DOTALL)
-        if match:
-            # 提取标签内的内容并去除首尾空白
-            translated_word = match.group(1).strip()
+    result, used_model = await _post_chat_completion(model_name, config, headers, payload, route)
+    content = result["choices"][0]["message"]["content"]
+    
+    # 按序号解析各片段的翻译结果
+    translations = {}
+    for match in re.finditer(r'<seg id="(\d+)">(.*?)</seg>', content, re.DOTALL):
+        index = int(match.group(1))
+        translated = match.group(2).strip()
+        if 0 <= index < len(texts) and translated:
+            translations[index] = translated
+    
+    logger.info(f"打包翻译完成: 模型 {used_model}, 片段 {len(texts)} 个, 成功解析 {len(translations)} 个")
+    return translations, used_model
+
+def _pack_groups(indexes: List[int], texts: List[str], max_chars: int, max_segments: int) -> List[List[int]]:
+    """
+    按字符预算和片段数上限将片段分组
+    
+    Args:
+        indexes: 待分组的片段下标
+        texts: 所有片段的文本
+        max_chars: 每组的字符预算
+        max_segments: 每组的片段数上限
+    
+    Returns:
+        分组后的片段下标列表
+    """
+    groups = []
+    current = []
+    current_chars = 0
+    for index in indexes:
+        text_chars = len(texts[index])
+        if current and (current_chars + text_chars > max_chars or len(current) >= max_segments):
+            groups.append(current)
+            current = []
+            current_chars = 0
+        current.append(index)
+        current_chars += text_chars
+    if current:
+        groups.append(current)
+    return groups
+
+async def _translate_one(kind: str, text: str, target_language: str, model_name: str, extra_args: dict = None,
+                         examples: Optional[List[Tuple[str, str]]] = None, route: bool = False) -> Tuple[str, bool, str]:
+    """
+    调用模型翻译单个未命中缓存的文本，异常会被转换为该文本自身的错误结果
+    
+    Args:
+        kind: 翻译类型（"sentence" 或 "word"）
+        text: 要翻译的文本
+        target_language: 目标语言
+        model_name: 使用的模型名称
+        extra_args: 额外的翻译要求
+        examples: 作为少样本示例的 (原文, 译文)，仅用于句子
+        route: 是否允许改投到其他模型
+    
+    Returns:
+        (翻译结果或错误信息, 是否翻译成功, 实际使用的模型名称)
+    """
+    try:
+        if kind == "sentence":
+            translated, used_model = await _request_sentence_translation(text, target_language, model_name, extra_args, examples, route)
         else:
-            # 如果没有找到标签，返回原始响应（向后兼容）
-            translated_word = translated_word
-        
-        # 将翻译结果存入单词级缓存
-        cache_service.set_word_cache(word, target_language, model_name, translated_word, extra_args)
-        # 日志已在cache_service中打印
-        
-        return translated_word
+            translated, used_model = await _request_word_translation(text, target_language, model_name, extra_args, route)
+        return translated, True, used_model
+    except Exception as e:
+        return f"翻译错误: {str(e)}", False, model_name
+
+async def _translate_packed_group(kind: str, texts: List[str], target_language: str, model_name: str,
+                                  extra_args: dict = None, route: bool = False) -> List[Tuple[str, bool, str]]:
+    """
+    打包翻译一组文本，缺失或格式错误的片段逐个重试
+    
+    Args:
+        kind: 翻译类型（"sentence" 或 "word"）
+        texts: 同一模型下要翻译的文本
+        target_language: 目标语言
+        model_name: 使用的模型名称
+        extra_args: 额外的翻译要求
+        route: 是否允许改投到其他模型
+    
+    Returns:
+        与输入顺序一致的 (翻译结果或错误信息, 是否翻译成功, 实际使用的模型名称) 列表
+    """
+    translations = {}
+    used_model = model_name
+    if len(texts) > 1:
+        try:
+            translations, used_model = await _request_packed_translation(kind, texts, target_language, model_name, extra_args, route)
+        except Exception as e:
+            logger.warning(f"打包翻译失败，将逐个重试: {str(e)}")
+    
+    missing = [index for index in range(len(texts)) if index not in translations]
+    if missing and len(texts) > 1:
+        logger.info(f"打包翻译中 {len(missing)} 个片段缺失或格式错误，将逐个重试")
+    retried = await asyncio.gather(*[
+        _translate_one(kind, texts[index], target_language, model_name, extra_args, route=route)
+        for index in missing
+    ])
+    
+    results = [(translations.get(index), True, used_model) for index in range(len(texts))]
+    for index, item in zip(missing, retried):
+        results[index] = item
+    return results
+
+async def _dispatch_batch(key: tuple, texts: List[str]) -> List[Tuple[str, bool, str]]:
+    """
+    微批调度器的分发函数：按打包预算将跨请求收集的文本分组后打包翻译
+    
+    Args:
+        key: 批次键 (翻译类型, 模型名称, 目标语言, 翻译参数JSON, 是否允许改投)
+        texts: 收集到的待翻译文本
+    
+    Returns:
+        与输入顺序一致的 (翻译结果或错误信息, 是否翻译成功, 实际使用的模型名称) 列表
+    """
+    kind, model_name, target_language, extra_args_json, route = key
+    extra_args = json.loads(extra_args_json) or None
+    groups = _pack_groups(list(range(len(texts))), texts, PACK_MAX_CHARS, PACK_MAX_SEGMENTS)
+    group_results = await asyncio.gather(*[
+        _translate_packed_group(kind, [texts[index] for index in group], target_language, model_name, extra_args, route)
+        for group in groups
+    ])
+    results: List[Tuple[str, bool, str]] = [None] * len(texts)
+    for group, items in zip(groups, group_results):
+        for index, item in zip(group, items):
+            results[index] = item
+    return results
+
+# 跨请求微批调度器（BATCH_SCHEDULER_ENABLED 开启）
+batch_scheduler = BatchScheduler(_dispatch_batch)
+
+async def _dispatch_translation(kind: str, texts: List[str], model_names: List[str], target_language: str,
+                                extra_args: dict = None, options: dict = None,
+                                examples: Optional[List[List[Tuple[str, str]]]] = None) -> List[Tuple[str, bool, str]]:
+    """
+    并发翻译未命中缓存的文本，开启打包模式时按模型分组并合并为少量模型调用，
+    开启微批调度器时与其他并发请求的文本合并翻译
+    
+    Args:
+        kind: 翻译类型（"sentence" 或 "word"）
+        texts: 要翻译的文本列表
+        model_names: 每个文本使用的模型名称
+        target_language: 目标语言
+        extra_args: 额外的翻译要求（不含控制参数）
+        options: 控制参数，如 pack、pack_max_chars、pack_max_segments、route
+        examples: 每个文本的少样本示例（来自翻译记忆），只在逐个翻译时使用，打包和微批时忽略
+    
+    Returns:
+        与输入顺序一致的 (翻译结果或错误信息, 是否翻译成功, 实际使用的模型名称) 列表
+    """
+    options = options or {}
+    route = bool(options.get("route"))
+    if batch_scheduler.enabled:
+        # 交给跨请求微批调度器，与其他请求中相同模型、语言和参数的文本合并翻译
+        extra_args_json = json.dumps(extra_args or {}, ensure_ascii=False, sort_keys=True, default=str)
+        return list(await asyncio.gather(*[
+            batch_scheduler.submit((kind, model_name, target_language, extra_args_json, route), text)
+            for text, model_name in zip(texts, model_names)
+        ]))
+    
+    if not options.get("pack"):
+        # 逐个并发翻译，上游并发数受各模型的并发上限约束
+        examples = examples or [None] * len(texts)
+        return list(await asyncio.gather(*[
+            _translate_one(kind, text, target_language, model_name, extra_args, text_examples, route)
+            for text, model_name, text_examples in zip(texts, model_names, examples)
+        ]))
+    
+    max_chars = int(options.get("pack_max_chars") or PACK_MAX_CHARS)
+    max_segments = int(options.get("pack_max_segments") or PACK_MAX_SEGMENTS)
+    
+    # 按模型分组，含有分隔标签的文本单独翻译以免破坏打包格式
+    indexes_by_model: Dict[str, List[int]] = {}
+    for index, (text, model_name) in enumerate(zip(texts, model_names)):
+        key = model_name if "<seg" not in text and "</seg>" not in text else None
+        indexes_by_model.setdefault(key, []).append(index)
+    
+    groups = []
+    for model_name, indexes in indexes_by_model.items():
+        if model_name is None:
+            groups.extend([[index] for index in indexes])
+        else:
+            groups.extend(_pack_groups(indexes, texts, max_chars, max_segments))
+    logger.info(f"打包模式: {len(texts)} 个片段合并为 {len(groups)} 次模型调用")
+    
+    group_results = await asyncio.gather(*[
+        _translate_packed_group(kind, [texts[index] for index in group], target_language,
+                                model_names[group[0]], extra_args, route)
+        for group in groups
+    ])
+    
+    results: List[Tuple[str, bool, str]] = [None] * len(texts)
+    for group, items in zip(groups, group_results):
+        for index, item in zip(group, items):
+            results[index] = item
+    return results
+
+async def _translate_with_memory(kind: str, texts: List[str], model_names: List[str], target_language: str,
+                                 extra_args: dict = None, options: dict = None) -> List[Tuple[str, bool, str]]:
+    """
+    调用模型前先查询翻译记忆（仅句子，TM_ENABLED 开启时）：只有数字、URL、标点或空白不同的句子直接复用已有译文，
+    相似句子的已有译文作为少样本示例；模型新翻译成功的句子按实际使用的模型写回翻译记忆
+    
+    Args:
+        kind: 翻译类型（"sentence" 或 "word"）
+        texts: 要翻译的文本列表
+        model_names: 每个文本使用的模型名称
+        target_language: 目标语言
+        extra_args: 额外的翻译要求（不含控制参数）
+        options: 控制参数
+    
+    Returns:
+        与输入顺序一致的 (翻译结果或错误信息, 是否翻译成功, 实际使用的模型名称) 列表
+    """
+    if kind != "sentence" or not translation_memory.enabled:
+        return await _dispatch_translation(kind, texts, model_names, target_language, extra_args, options)
+    
+    matches = await translation_memory.lookup_many(texts, model_names, target_language, extra_args)
+    results: List[Tuple[str, bool, str]] = [None] * len(texts)
+    pending = []
+    for index, (reused, _) in enumerate(matches):
+        if reused is not None:
+            results[index] = (reused, True, model_names[index])
+        else:
+            pending.append(index)
+    
+    if pending:
+        translated = await _dispatch_translation(
+            kind, [texts[index] for index in pending], [model_names[index] for index in pending],
+            target_language, extra_args, options, [matches[index][1] for index in pending]
+        )
+        for index, item in zip(pending, translated):
+            results[index] = item
+        await translation_memory.add_many(
+            [(texts[index], used_model, text) for index, (text, ok, used_model) in zip(pending, translated) if ok],
+            target_language,
+            extra_args
+        )
+    return results
+
+# 相同缓存键的并发未命中只调用一次模型
+singleflight = SingleFlight()
+
+async def _wait_for_remote(kind: str, texts: List[str], model_names: List[str], cache_keys: List[str],
+                           target_language: str, extra_args: dict = None, options: dict = None) -> List[Tuple[str, bool, str]]:
+    """
+    等待其他worker进程（持有Redis锁）写入缓存；锁在结果写入前被释放（对方翻译失败）或超时仍未写入的文本自行翻译
+    
+    Args:
+        kind: 翻译类型（"sentence" 或 "word"）
+        texts: 要翻译的文本列表
+        model_names: 每个文本使用的模型名称
+        cache_keys: 每个文本的缓存键
+        target_language: 目标语言
+        extra_args: 额外的翻译要求
+        options: 控制参数
+    
+    Returns:
+        与输入顺序一致的 (翻译结果或错误信息, 是否翻译成功, 实际使用的模型名称) 列表
+    """
+    results: List[Tuple[str, bool, str]] = [None] * len(texts)
+    waiting = list(range(len(texts)))
+    released = []
+    deadline = asyncio.get_running_loop().time() + singleflight.lock_ttl_ms / 1000
+    while waiting and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(singleflight.poll_interval)
+        polled = await cache_service.poll_locked([cache_keys[index] for index in waiting])
+        for index, (value, locked) in zip(list(waiting), polled):
+            if value:
+                results[index] = (value, True, model_names[index])
+                waiting.remove(index)
+            elif not locked:
+                released.append(index)
+                waiting.remove(index)
+    hits = len(texts) - len(waiting) - len(released)
+    singleflight.record_remote(len(texts), hits, len(released))
+    
+    pending = sorted(released + waiting)
+    if pending:
+        logger.info(f"其他进程未写入结果（锁已释放 {len(released)} 个，等待超时 {len(waiting)} 个），将自行调用模型API")
+        translated = await _translate_with_memory(
+            kind, [texts[index] for index in pending], [model_names[index] for index in pending],
+            target_language, extra_args, options
+        )
+        for index, item in zip(pending, translated):
+            results[index] = item
+    return results
+
+async def _translate_claimed(kind: str, texts: List[str], model_names: List[str], cache_keys: List[str],
+                             target_language: str, extra_args: dict = None, options: dict = None) -> List[Tuple[str, bool, str]]:
+    """
+    翻译当前进程内作为 leader 的文本；开启Redis锁时，已被其他进程锁定的文本改为等待其结果
+    
+    Args:
+        kind: 翻译类型（"sentence" 或 "word"）
+        texts: 要翻译的文本列表
+        model_names: 每个文本使用的模型名称
+        cache_keys: 每个文本的缓存键
+        target_language: 目标语言
+        extra_args: 额外的翻译要求
+        options: 控制参数
+    
+    Returns:
+        与输入顺序一致的 (翻译结果或错误信息, 是否翻译成功, 实际使用的模型名称) 列表
+    """
+    if not singleflight.use_redis_lock:
+        return await _translate_with_memory(kind, texts, model_names, target_language, extra_args, options)
+    
+    # 每次获取使用新的令牌，锁过期后被其他进程重新获取时不会被本次误释放
+    lock_token = secrets.token_hex(16)
+    acquired = await cache_service.acquire_locks(cache_keys, singleflight.lock_ttl_ms, lock_token)
+    local = [index for index, ok in enumerate(acquired) if ok]
+    remote = [index for index, ok in enumerate(acquired) if not ok]
+    
+    def pick(values: list, indexes: List[int]) -> list:
+        return [values[index] for index in indexes]
+    
+    local_results, remote_results = await asyncio.gather(
+        _translate_with_memory(kind, pick(texts, local), pick(model_names, local), target_language, extra_args, options),
+        _wait_for_remote(kind, pick(texts, remote), pick(model_names, remote), pick(cache_keys, remote),
+                         target_language, extra_args, options)
+    )
+    
+    # 翻译失败或改投到其他模型（结果不会写入该缓存键）的锁立即释放，让其他进程不必等到锁过期；
+    # 成功的锁随过期自动释放，期间由缓存提供结果
+    failed_keys = [
+        cache_keys[index] for index, (_, ok, used_model) in zip(local, local_results)
+        if not ok or used_model != model_names[index]
+    ]
+    if failed_keys:
+        await cache_service.release_locks(failed_keys, lock_token)
+    
+    results: List[Tuple[str, bool, str]] = [None] * len(texts)
+    for indexes, items in ((local, local_results), (remote, remote_results)):
+        for index, item in zip(indexes, items):
+            results[index] = item
+    return results
+
+async def _translate_uncached(kind: str, texts: List[str], model_names: List[str], target_language: str,
+                              extra_args: dict = None, options: dict = None) -> List[Tuple[str, bool, str]]:
+    """
+    翻译未命中缓存的文本，相同缓存键的并发未命中（包括同一请求内的重复文本）只调用一次模型
+    
+    Args:
+        kind: 翻译类型（"sentence" 或 "word"）
+        texts: 要翻译的文本列表
+        model_names: 每个文本使用的模型名称
+        target_language: 目标语言
+        extra_args: 额外的翻译要求（不含控制参数）
+        options: 控制参数
+    
+    Returns:
+        与输入顺序一致的 (翻译结果或错误信息, 是否翻译成功, 实际使用的模型名称) 列表
+    """
+    cache_keys = [
+        cache_service._generate_cache_key(kind, text, target_language, model_name, extra_args)
+        for text, model_name in zip(texts, model_names)
+    ]
+    # 允许改投的调用只与同样允许改投的调用合并，避免未允许改投的请求拿到其他模型的译文
+    route = bool((options or {}).get("route"))
+    flight_keys = [f"{cache_key}:route" if route else cache_key for cache_key in cache_keys]
+    claims = [singleflight.claim(flight_key) for flight_key in flight_keys]
+    leaders = [index for index, (is_leader, _) in enumerate(claims) if is_leader]
+    
+    try:
+        if leaders:
+            leader_results = await _translate_claimed(
+                kind,
+                [texts[index] for index in leaders],
+                [model_names[index] for index in leaders],
+                [cache_keys[index] for index in leaders],
+                target_language,
+                extra_args,
+                options
+            )
+            for index, item in zip(leaders, leader_results):
+                singleflight.resolve(flight_keys[index], claims[index][1], item)
+    finally:
+        # leader 被取消时通知等待者自行翻译
+        for index in leaders:
+            singleflight.resolve(flight_keys[index], claims[index][1], None)
+    
+    results: List[Tuple[str, bool, str]] = [None] * len(texts)
+    followers = []
+    for index, (is_leader, future) in enumerate(claims):
+        item = await asyncio.shield(future)
+        if item is None:
+            followers.append(index)
+        else:
+            results[index] = item
+    
+    if followers:
+        translated = await _translate_with_memory(
+            kind, [texts[index] for index in followers], [model_names[index] for index in followers],
+            target_language, extra_args, options
+        )
+        for index, item in zip(followers, translated):
+            results[index] = item
+    return results
+
+def _split_segments(segments: List[Segment]) -> Tuple[List[str], List[str], List[Tuple[int, int]]]:
+    """
+    预处理文本片段：规范化文本，并在开启按句拆分时把长片段拆成句子，每个句子作为独立的缓存和翻译单元
+    
+    Args:
+        segments: 文本片段列表
+    
+    Returns:
+        (各翻译单元的文本, 各翻译单元使用的模型, 每个片段对应的翻译单元区间 [start, end))
+    """
+    unit_texts: List[str] = []
+    unit_models: List[str] = []
+    spans: List[Tuple[int, int]] = []
+    for segment in segments:
+        text = _normalize_input(segment.text)
+        sentences = split_sentences(text, SENTENCE_SPLIT_MIN_CHARS) if SENTENCE_SPLIT_ENABLED else [text]
+        start = len(unit_texts)
+        unit_texts.extend(sentences)
+        unit_models.extend([segment.model or "deepseek-chat"] * len(sentences))
+        spans.append((start, len(unit_texts)))
+    return unit_texts, unit_models, spans
+
+def _join_units(items: List[Tuple[str, bool, str]]) -> Tuple[str, bool]:
+    """
+    按原顺序拼接一个片段各翻译单元的结果
+    
+    Args:
+        items: 各翻译单元的 (翻译结果或错误信息, 是否翻译成功, 实际使用的模型名称)
+    
+    Returns:
+        (片段的译文，任一单元失败时为第一个错误信息, 是否全部翻译成功)
+    """
+    if len(items) == 1:
+        return items[0][:2]
+    for text, ok, _ in items:
+        if not ok:
+            return text, False
+    return join_sentences([text for text, _, _ in items]), True
 
 async def translate_segments(segments: List[Segment], target_language: str, extra_args: dict = None) -> List[dict]:
     """
-    批量翻译文本片段
+    批量翻译文本片段：片段先规范化（并可按句拆分），一次批量查询缓存，未命中的部分并发（或打包）调用模型，
+    新结果一次批量写回缓存，最后按原顺序拼接成各片段的译文
     
     Args:
         segments: 文本片段列表
         target_language: 目标语言
-        extra_args: 额外的翻译要求
+        extra_args: 额外的翻译要求，其中 pack 为真时开启多片段打包翻译
     
     Returns:
-        翻译结果列表
+        翻译结果列表（与输入顺序一致），每项为 {"id", "text", "error"}，error 为真时 text 为错误信息
     """
+    extra_args, options = _split_extra_args(extra_args)
+    unit_texts, unit_models, spans = _split_segments(segments)
+    
+    # 一次往返批量查询句子级缓存
+    cached_results = await cache_service.get_sentence_cache_many(
+        list(zip(unit_texts, unit_models)),
+        target_language,
+        extra_args
+    )
+    
+    unit_results: List[Tuple[str, bool, str]] = [
+        (cached_result, True, model_name) if cached_result else None
+        for cached_result, model_name in zip(cached_results, unit_models)
+    ]
+    missed_indexes = [index for index, item in enumerate(unit_results) if item is None]
+    
+    if missed_indexes:
+        logger.info(f"{len(missed_indexes)} 个翻译单元未命中缓存，将调用模型API")
+        translated = await _translate_uncached(
+            "sentence",
+            [unit_texts[index] for index in missed_indexes],
+            [unit_models[index] for index in missed_indexes],
+            target_language,
+            extra_args,
+            options
+        )
+        
+        new_cache_items = []
+        for index, item in zip(missed_indexes, translated):
+            unit_results[index] = item
+            text, ok, used_model = item
+            if ok:
+                # 改投到其他模型的译文写入实际使用的模型的缓存键
+                new_cache_items.append((unit_texts[index], used_model, text))
+        
+        # 一次往返批量写回新的翻译结果
+        if new_cache_items:
+            await cache_service.set_sentence_cache_many(new_cache_items, target_language, extra_args)
+    
     results = []
+    for segment, (start, end) in zip(segments, spans):
+        text, ok = _join_units(unit_results[start:end])
+        results.append({"id": segment.id, "text": text, "error": not ok})
+    return results
+
+async def translate_segments_stream(segments: List[Segment], target_language: str, extra_args: dict = None) -> AsyncIterator[dict]:
+    """
+    流式批量翻译文本片段：先输出完全命中缓存的片段，其余片段的全部翻译单元完成后逐个输出，最后输出汇总记录。
+    生成器被关闭或取消（如客户端断开）时，取消所有未完成的模型调用
     
-    for segment in segments:
-        try:
-            model_name = segment.model or "deepseek-chat"
-            translated_text = await translate_sentence(segment.text, target_language, model_name, extra_args)
-            results.append({
-                "id": segment.id,
-                "text": translated_text
-            })
-        except Exception as e:
-            results.append({
-                "id": segment.id,
-                "text": f"翻译错误: {str(e)}"
-            })
+    Args:
+        segments: 文本片段列表
+        target_language: 目标语言
+        extra_args: 额外的翻译要求，其中 pack 为真时按打包分组翻译，每组完成后一起输出
+    
+    Returns:
+        异步生成的记录：
+        - 片段记录 {"type": "segment", "id", "text", "cached", "error"}
+        - 汇总记录 {"type": "summary", "total", "cache_hits", "translated", "errors", "elapsed"}
+    """
+    start_time = time.perf_counter()
+    extra_args, options = _split_extra_args(extra_args)
+    unit_texts, unit_models, spans = _split_segments(segments)
+    # 每个翻译单元所属的片段
+    unit_segments = [index for index, (start, end) in enumerate(spans) for _ in range(start, end)]
+    
+    # 一次往返批量查询句子级缓存，全部翻译单元命中的片段立即输出
+    cached_results = await cache_service.get_sentence_cache_many(
+        list(zip(unit_texts, unit_models)),
+        target_language,
+        extra_args
+    )
+    unit_results: List[Tuple[str, bool, str]] = [
+        (cached_result, True, model_name) if cached_result else None
+        for cached_result, model_name in zip(cached_results, unit_models)
+    ]
+    missed_indexes = [index for index, item in enumerate(unit_results) if item is None]
+    # 每个片段尚未完成的翻译单元数
+    remaining = [0] * len(segments)
+    for index in missed_indexes:
+        remaining[unit_segments[index]] += 1
+    for segment, (start, end), count in zip(segments, spans, remaining):
+        if count == 0:
+            yield {"type": "segment", "id": segment.id, "text": _join_units(unit_results[start:end])[0], "cached": True, "error": False}
+    cache_hits = remaining.count(0)
+    
+    # 打包模式下按模型和打包预算分组，否则每个翻译单元单独成组，各组完成后立即输出已完成的片段
+    if options.get("pack"):
+        max_chars = int(options.get("pack_max_chars") or PACK_MAX_CHARS)
+        max_segments = int(options.get("pack_max_segments") or PACK_MAX_SEGMENTS)
+        indexes_by_model: Dict[str, List[int]] = {}
+        for index in missed_indexes:
+            indexes_by_model.setdefault(unit_models[index], []).append(index)
+        groups = [
+            group
+            for indexes in indexes_by_model.values()
+            for group in _pack_groups(indexes, unit_texts, max_chars, max_segments)
+        ]
+    else:
+        groups = [[index] for index in missed_indexes]
+    
+    tasks = {
+        asyncio.ensure_future(_translate_uncached(
+            "sentence",
+            [unit_texts[index] for index in group],
+            [unit_models[index] for index in group],
+            target_language,
+            extra_args,
+            options
+        )): group
+        for group in groups
+    }
+    
+    errors = 0
+    new_cache_items = []
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                for index, item in zip(tasks[task], task.result()):
+                    unit_results[index] = item
+                    text, ok, used_model = item
+                    if ok:
+                        new_cache_items.append((unit_texts[index], used_model, text))
+                    segment_index = unit_segments[index]
+                    remaining[segment_index] -= 1
+                    if remaining[segment_index]:
+                        continue
+                    start, end = spans[segment_index]
+                    text, ok = _join_units(unit_results[start:end])
+                    if not ok:
+                        errors += 1
+                    yield {"type": "segment", "id": segments[segment_index].id, "text": text, "cached": False, "error": not ok}
+    finally:
+        cancelled = [task for task in tasks if not task.done()]
+        for task in cancelled:
+            task.cancel()
+        if cancelled:
+            logger.info(f"流式翻译提前结束，已取消 {len(cancelled)} 组未完成的模型调用")
+        # 已完成的结果（包括提前结束前完成的部分）一次往返写回缓存
+        if new_cache_items:
+            try:
+                await asyncio.shield(cache_service.set_sentence_cache_many(new_cache_items, target_language, extra_args))
+            except Exception as e:
+                logger.warning(f"流式翻译结果写回缓存失败: {str(e)}")
+    
+    yield {
+        "type": "summary",
+        "total": len(segments),
+        "cache_hits": cache_hits,
+        "translated": len(segments) - cache_hits - errors,
+        "errors": errors,
+        "elapsed": round(time.perf_counter() - start_time, 4)
+    }
+
+async def translate_words(words: List[WordItem], target_language: str, model_name: str, extra_args: dict = None,
+                          source_language: str = None) -> List[dict]:
+    """
+    批量翻译单词：先查询本地词典，其余单词一次批量查询缓存，未命中的单词并发（或打包）调用模型，新结果一次批量写回缓存
+    
+    Args:
+        words: 单词条目列表
+        target_language: 目标语言
+        model_name: 使用的模型名称
+        extra_args: 额外的翻译要求，其中 pack 为真时开启多单词打包翻译
+        source_language: 源语言，只用于选择本地词典，为空时不查询词典
+    
+    Returns:
+        翻译结果列表（与输入顺序一致）
+    """
+    extra_args, options = _split_extra_args(extra_args)
+    results: List[dict] = [None] * len(words)
+    pending_indexes = list(range(len(words)))
+    
+    # 词典译文与模型和翻译要求无关，只在没有额外翻译要求、且请求指定了源语言时使用
+    if word_dictionary.enabled and source_language and not extra_args:
+        dictionary_results = word_dictionary.lookup_many([word_item.word for word_item in words], source_language, target_language)
+        pending_indexes = []
+        for index, (word_item, dictionary_result) in enumerate(zip(words, dictionary_results)):
+            if dictionary_result is not None:
+                results[index] = {"id": word_item.id, "word": dictionary_result}
+            else:
+                pending_indexes.append(index)
+        if not pending_indexes:
+            return results
+    
+    # 一次往返批量查询单词级缓存
+    cached_results = await cache_service.get_word_cache_many(
+        [words[index].word for index in pending_indexes],
+        target_language,
+        model_name,
+        extra_args
+    )
+    
+    missed_indexes = []
+    for index, cached_result in zip(pending_indexes, cached_results):
+        if cached_result:
+            results[index] = {"id": words[index].id, "word": cached_result}
+        else:
+            missed_indexes.append(index)
+    
+    if missed_indexes:
+        logger.info(f"{len(missed_indexes)} 个单词未命中缓存，将调用模型API")
+        translated = await _translate_uncached(
+            "word",
+            [words[index].word for index in missed_indexes],
+            [model_name] * len(missed_indexes),
+            target_language,
+            extra_args,
+            options
+        )
+        
+        # 按实际使用的模型分组写回，改投到其他模型的译文不写入请求的模型的缓存键
+        new_cache_items: Dict[str, List[Tuple[str, str]]] = {}
+        for index, (word, ok, used_model) in zip(missed_indexes, translated):
+            results[index] = {"id": words[index].id, "word": word}
+            if ok:
+                new_cache_items.setdefault(used_model, []).append((words[index].word, word))
+        
+        # 每个模型一次往返批量写回新的翻译结果
+        for used_model, items in new_cache_items.items():
+            await cache_service.set_word_cache_many(items, target_language, used_model, extra_args)
     
-    return results
\ No newline at end of file
+    return results
@@ -1,10 +1,22 @@
+import os
+import time
 import base64
+import hashlib
 import io
+import math
+import asyncio
 import logging
-from typing import Dict, List, Any
+import threading
+import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor, BrokenExecutor
+from typing import TYPE_CHECKING, Any, BinaryIO, Callable, Dict, List, Optional, Tuple, Union
 import numpy as np
 from PIL import Image
-from paddleocr import PaddleOCR
+from services.metrics_service import metrics_service
+from utils.env import env_flag
+
+if TYPE_CHECKING:
+    from paddleocr import PaddleOCR
 
 # 配置日志记录器
 logger = logging.getLogger(__name__)
@@ -17,98 +29,600 @@ if not logger.handlers:
     handler.setFormatter(formatter)
     logger.addHandler(handler)
 
-# 初始化PaddleOCR
-# use_angle_cls=True表示使用方向分类器
-# lang="ch"表示使用中英文模型
-# 注意：新版本中use_angle_cls已弃用，应使用use_textline_orientation
-ocr = PaddleOCR(use_textline_orientation=True, lang="ch")
+# 识别阶段每批处理的文本行裁剪图数量（批量接口中多张图片的裁剪图共同组批）
+OCR_REC_BATCH_SIZE = int(os.getenv("OCR_REC_BATCH_SIZE", 16))
+# 批量OCR接口单次请求最多包含的图片数
+OCR_BATCH_MAX_IMAGES = int(os.getenv("OCR_BATCH_MAX_IMAGES", 16))
+# OCR流水线每批送入的图片数（PaddleX流水线默认为1，即逐张检测识别，裁剪图无法跨图片组批）
+OCR_PIPELINE_BATCH_SIZE = int(os.getenv("OCR_PIPELINE_BATCH_SIZE", OCR_BATCH_MAX_IMAGES))
 
-def process_image_from_base64(image_base64: str) -> Dict[str, Any]:
+# 每个OCR工作线程（或进程）各自持有一个PaddleOCR实例
+_worker_state = threading.local()
+
+def _get_ocr() -> "PaddleOCR":
     """
-    处理base64编码的图片并进行OCR识别
+    获取当前工作线程的PaddleOCR实例，首次调用时导入Paddle并加载模型
+    
+    Returns:
+        PaddleOCR实例
+    """
+    ocr = getattr(_worker_state, "ocr", None)
+    if ocr is None:
+        # 延迟导入：只提供翻译服务的进程不加载Paddle
+        from paddleocr import PaddleOCR
+        from paddlex.inference import load_pipeline_config
+        
+        logger.info("正在加载PaddleOCR模型")
+        # 流水线级别的批大小只能通过PaddleX配置设置，其余参数仍由PaddleOCR覆盖到该配置上
+        pipeline_config = load_pipeline_config("OCR")
+        pipeline_config["batch_size"] = max(1, OCR_PIPELINE_BATCH_SIZE)
+        # 初始化PaddleOCR
+        # use_angle_cls=True表示使用方向分类器
+        # lang="ch"表示使用中英文模型
+        # 注意：新版本中use_angle_cls已弃用，应使用use_textline_orientation
+        ocr = PaddleOCR(
+            paddlex_config=pipeline_config,
+            use_textline_orientation=True,
+            lang="ch",
+            text_recognition_batch_size=OCR_REC_BATCH_SIZE
+        )
+        _worker_state.ocr = ocr
+    return ocr
+
+# 推理前图片最长边的上限（像素），超过时等比缩小，0 表示不缩放
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", 2048))
+
+def load_image(source: Union[bytes, bytearray, memoryview, BinaryIO], max_side: int = OCR_MAX_SIDE) -> Tuple[np.ndarray, Tuple[float, float]]:
+    """
+    直接从上传缓冲区解码图片：超大图片缩小到最长边不超过 max_side，并统一转换为RGB
     
     Args:
-        image_base64 (str): base64编码的图片数据
+        source: 图片的原始字节（bytes/memoryview）或文件对象（如 UploadFile.file 的 SpooledTemporaryFile）
+        max_side: 最长边上限（像素），0 表示不缩放
+        
+    Returns:
+        (RGB图片数组, (横向还原比例, 纵向还原比例))，识别结果坐标按轴乘以该比例即为原图坐标
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        # BytesIO 直接引用 bytes 的缓冲区，不会复制
+        source = io.BytesIO(source)
+    image = Image.open(source)
+    original_width, original_height = image.size
+    
+    if max_side and max(image.size) > max_side:
+        # 按整数倍缩小（盒式平均，比任意比例重采样快得多）
+        factor = math.ceil(max(image.size) / max_side)
+        # JPEG 在解码阶段直接按 1/2、1/4、1/8 缩小，避免解码完整尺寸
+        image.draft("RGB", (math.ceil(image.size[0] / factor), math.ceil(image.size[1] / factor)))
+        factor = math.ceil(max(image.size) / max_side)
+        if factor > 1:
+            image = image.reduce(factor)
+    
+    # 统一转换为RGB：带透明通道的图片先合成到白色背景上，调色板等模式直接转换
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+    
+    # 按整数倍缩小时两条边分别向上取整，宽高比会有细微变化，因此两个轴各自计算比例
+    return np.asarray(image), (original_width / image.size[0], original_height / image.size[1])
+
+def _scale_coordinates(poly: Any, scale: Tuple[float, float]) -> List[Any]:
+    """
+    将文本框坐标按轴还原到原图尺寸，保持坐标的数值类型（整数坐标还原后四舍五入为整数）
+    
+    Args:
+        poly: 文本框顶点坐标，形如 [[x, y], ...]
+        scale: (横向还原比例, 纵向还原比例)
+        
+    Returns:
+        还原后的坐标列表
+    """
+    points = np.asarray(poly)
+    if tuple(scale) == (1.0, 1.0) or points.size == 0:
+        return points.tolist()
+    scaled = points * np.asarray(scale)
+    if np.issubdtype(points.dtype, np.integer):
+        scaled = np.rint(scaled).astype(points.dtype)
+    return scaled.tolist()
+
+def _parse_ocr_result(result: Any, scale: Tuple[float, float] = (1.0, 1.0)) -> Dict[str, Any]:
+    """
+    解析PaddleOCR的识别结果，兼容新旧两种返回格式
+    
+    Args:
+        result: PaddleOCR 的返回值
+        scale: (横向还原比例, 纵向还原比例)
         
     Returns:
         Dict[str, Any]: 包含检测到的文本和完整文本的字典
     """
-    try:
-        logger.info("开始处理图片OCR识别")
+    # 处理识别结果
+    detected_text = []
+    full_text = ""
+    
+    # 新版本返回的是包含字典的列表
+    if result is not None and len(result) > 0:
+        # 获取第一个结果（通常只有一个结果）
+        ocr_result = result[0] if isinstance(result, list) else result
         
-        # 移除base64字符串中的前缀（如果有）
-        if image_base64.startswith('data:image'):
-            image_base64 = image_base64.split(',')[1]
+        # 从新格式中提取文本和置信度
+        if 'rec_texts' in ocr_result and 'rec_scores' in ocr_result and 'rec_polys' in ocr_result:
+            # 新版本格式
+            texts = ocr_result['rec_texts']
+            scores = ocr_result['rec_scores']
+            polys = ocr_result['rec_polys']
+            
+            for i in range(len(texts)):
+                text_info = {
+                    "text": texts[i],
+                    "confidence": float(scores[i]) if i < len(scores) else 0.0,
+                    "coordinates": _scale_coordinates(polys[i], scale) if i < len(polys) else []
+                }
+                detected_text.append(text_info)
+                full_text += texts[i] + "\n"
+        elif 'dt_polys' in ocr_result:
+            # 如果检测到了文本框但没有识别文本，则可能是空结果
+            pass
+        else:
+            # 尝试处理旧版本格式（以防万一）
+            if isinstance(ocr_result, list):
+                for res in ocr_result:
+                    if res is not None:
+                        for line in res:
+                            # 兼容旧版本格式
+                            # line[0] 是文本框的坐标
+                            # line[1][0] 是识别的文本
+                            # line[1][1] 是置信度
+                            try:
+                                text_info = {
+                                    "text": line[1][0],
+                                    "confidence": float(line[1][1]),
+                                    "coordinates": _scale_coordinates(line[0], scale)  # 文本框坐标
+                                }
+                                detected_text.append(text_info)
+                                full_text += line[1][0] + "\n"
+                            except (IndexError, TypeError) as e:
+                                # 如果格式不匹配，则跳过该项
+                                logger.warning("跳过无法解析的OCR结果项: %s", str(e))
+    
+    return {
+        "detected_text": detected_text,
+        "full_text": full_text.strip()
+    }
+
+def image_digest(image_np: np.ndarray, scale: Tuple[float, float]) -> str:
+    """
+    计算解码后像素数据的摘要，作为OCR结果缓存的内容寻址键；
+    同一张图片以不同的无损格式重新编码后摘要不变
+    
+    Args:
+        image_np: load_image 返回的RGB图片数组
+        scale: load_image 返回的坐标还原比例（原图尺寸不同时坐标不同）
         
-        # 将base64字符串解码为字节
-        image_bytes = base64.b64decode(image_base64)
+    Returns:
+        32位十六进制摘要
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(f"{image_np.shape}:{image_np.dtype}:{scale!r}".encode("utf-8"))
+    # 直接读取数组缓冲区，不复制像素数据
+    hasher.update(memoryview(np.ascontiguousarray(image_np)).cast("B"))
+    return hasher.hexdigest()
+
+def prepare_image(source: Union[bytes, bytearray, memoryview, BinaryIO]) -> Tuple[np.ndarray, Tuple[float, float], str]:
+    """
+    解码上传的图片并计算像素摘要，供查询OCR结果缓存
+    
+    Args:
+        source: 图片的原始字节或文件对象
         
-        # 将字节数据转换为PIL Image
-        image = Image.open(io.BytesIO(image_bytes))
+    Returns:
+        (RGB图片数组, 坐标还原比例, 像素摘要)
+    """
+    try:
+        image_np, scale = load_image(source)
+    except Exception as e:
+        logger.error("图片解码失败: %s", str(e))
+        raise Exception(f"OCR处理失败: {str(e)}")
+    return image_np, scale, image_digest(image_np, scale)
+
+def digest_image(source: Union[bytes, bytearray, memoryview, BinaryIO]) -> str:
+    """
+    解码上传的图片并只返回像素摘要（进程池模式使用，避免把像素数组pickle回主进程）
+    
+    Args:
+        source: 图片的原始字节或文件对象
         
-        # 转换为numpy数组供PaddleOCR使用
-        image_np = np.array(image)
+    Returns:
+        像素摘要
+    """
+    return prepare_image(source)[2]
+
+def recognize_image(image_np: np.ndarray, scale: Tuple[float, float] = (1.0, 1.0)) -> Dict[str, Any]:
+    """
+    对已解码的图片进行OCR识别
+    
+    Args:
+        image_np: RGB图片数组
+        scale: (横向还原比例, 纵向还原比例)
+        
+    Returns:
+        Dict[str, Any]: 包含检测到的文本和完整文本的字典
+    """
+    try:
+        logger.info("开始处理图片OCR识别")
         
         # 使用PaddleOCR进行文字识别
         # 注意：在新版本中，返回结果的格式已更改
-        result = ocr.ocr(image_np)
+        result = _parse_ocr_result(_get_ocr().ocr(image_np), scale)
         
-        # 处理识别结果
-        detected_text = []
-        full_text = ""
+        logger.info("OCR识别完成，共识别到 %d 条文本", len(result["detected_text"]))
         
-        # 新版本返回的是包含字典的列表
-        if result is not None and len(result) > 0:
-            # 获取第一个结果（通常只有一个结果）
-            ocr_result = result[0] if isinstance(result, list) else result
-            
-            # 从新格式中提取文本和置信度
-            if 'rec_texts' in ocr_result and 'rec_scores' in ocr_result and 'rec_polys' in ocr_result:
-                # 新版本格式
-                texts = ocr_result['rec_texts']
-                scores = ocr_result['rec_scores']
-                polys = ocr_result['rec_polys']
-                
-                for i in range(len(texts)):
-                    text_info = {
-                        "text": texts[i],
-                        "confidence": float(scores[i]) if i < len(scores) else 0.0,
-                        "coordinates": polys[i].tolist() if i < len(polys) else []
-                    }
-                    detected_text.append(text_info)
-                    full_text += texts[i] + "\n"
-            elif 'dt_polys' in ocr_result:
-                # 如果检测到了文本框但没有识别文本，则可能是空结果
-                pass
-            else:
-                # 尝试处理旧版本格式（以防万一）
-                if isinstance(ocr_result, list):
-                    for res in ocr_result:
-                        if res is not None:
-                            for line in res:
-                                # 兼容旧版本格式
-                                # line[0] 是文本框的坐标
-                                # line[1][0] 是识别的文本
-                                # line[1][1] 是置信度
-                                try:
-                                    text_info = {
-                                        "text": line[1][0],
-                                        "confidence": float(line[1][1]),
-                                        "coordinates": line[0]  # 文本框坐标
-                                    }
-                                    detected_text.append(text_info)
-                                    full_text += line[1][0] + "\n"
-                                except (IndexError, TypeError) as e:
-                                    # 如果格式不匹配，则跳过该项
-                                    logger.warning("跳过无法解析的OCR结果项: %s", str(e))
-        
-        logger.info("OCR识别完成，共识别到 %d 条文本", len(detected_text))
-        
-        return {
-            "detected_text": detected_text,
-            "full_text": full_text.strip()
-        }
+        return result
         
     except Exception as e:
         logger.error("OCR处理过程中发生错误: %s", str(e))
-        raise Exception(f"OCR处理失败: {str(e)}")
\ No newline at end of file
+        raise Exception(f"OCR处理失败: {str(e)}")
+
+def prepare_images(sources: List[Union[bytes, bytearray, memoryview, BinaryIO]]) -> List[Tuple[np.ndarray, Tuple[float, float], str]]:
+    """
+    批量解码上传的图片并计算像素摘要（在一次工作池任务中完成）
+    
+    Args:
+        sources: 图片的原始字节或文件对象列表
+        
+    Returns:
+        与输入顺序一致的 (RGB图片数组, 坐标还原比例, 像素摘要) 列表
+    """
+    return [prepare_image(source) for source in sources]
+
+def digest_images(sources: List[Union[bytes, bytearray, memoryview, BinaryIO]]) -> List[str]:
+    """
+    批量解码上传的图片并只返回像素摘要（进程池模式使用）
+    
+    Args:
+        sources: 图片的原始字节或文件对象列表
+        
+    Returns:
+        与输入顺序一致的像素摘要列表
+    """
+    return [digest_image(source) for source in sources]
+
+def recognize_images(images: List[np.ndarray], scales: List[Tuple[float, float]]) -> List[Dict[str, Any]]:
+    """
+    对多张已解码的图片进行批量OCR识别：流水线每批处理 OCR_PIPELINE_BATCH_SIZE 张图片，
+    同一批图片的文本行裁剪图合并后按 OCR_REC_BATCH_SIZE 组批推理
+    
+    Args:
+        images: RGB图片数组列表
+        scales: 与图片对应的坐标还原比例列表
+        
+    Returns:
+        与输入顺序一致的OCR结果列表
+    """
+    try:
+        logger.info("开始批量OCR识别，共 %d 张图片", len(images))
+        
+        raw_results = list(_get_ocr().predict(images))
+        if len(raw_results) != len(images):
+            raise ValueError(f"OCR结果数量与图片数量不一致: {len(raw_results)} != {len(images)}")
+        results = [_parse_ocr_result(raw_result, scale) for raw_result, scale in zip(raw_results, scales)]
+        
+        logger.info("批量OCR识别完成，共识别到 %d 条文本", sum(len(result["detected_text"]) for result in results))
+        
+        return results
+        
+    except Exception as e:
+        logger.error("批量OCR处理过程中发生错误: %s", str(e))
+        raise Exception(f"OCR处理失败: {str(e)}")
+
+def process_image(source: Union[bytes, bytearray, memoryview, BinaryIO]) -> Dict[str, Any]:
+    """
+    对上传的图片进行OCR识别（不经过结果缓存）
+    
+    Args:
+        source: 图片的原始字节或文件对象
+        
+    Returns:
+        Dict[str, Any]: 包含检测到的文本和完整文本的字典
+    """
+    # 解码、缩放并转换为RGB数组供PaddleOCR使用
+    image_np, scale, _ = prepare_image(source)
+    return recognize_image(image_np, scale)
+
+def process_images(sources: List[Union[bytes, bytearray, memoryview, BinaryIO]]) -> List[Dict[str, Any]]:
+    """
+    在同一次调用中解码并批量识别多张图片（不经过结果缓存），像素数组不离开工作进程
+    
+    Args:
+        sources: 图片的原始字节或文件对象列表
+        
+    Returns:
+        与输入顺序一致的OCR结果列表
+    """
+    prepared = prepare_images(sources)
+    return recognize_images([image_np for image_np, _, _ in prepared], [scale for _, scale, _ in prepared])
+
+def process_image_from_base64(image_base64: str) -> Dict[str, Any]:
+    """
+    处理base64编码的图片并进行OCR识别
+    
+    Args:
+        image_base64 (str): base64编码的图片数据
+        
+    Returns:
+        Dict[str, Any]: 包含检测到的文本和完整文本的字典
+    """
+    # 移除base64字符串中的前缀（如果有）
+    if image_base64.startswith('data:image'):
+        image_base64 = image_base64.split(',')[1]
+    
+    # 将base64字符串解码为字节
+    return process_image(base64.b64decode(image_base64))
+
+# 各OCR函数在指标中对应的阶段：decode（解码与摘要）、inference（检测与识别）、full（解码并识别）
+OCR_STAGES = {
+    prepare_image: "decode",
+    prepare_images: "decode",
+    digest_image: "decode",
+    digest_images: "decode",
+    recognize_image: "inference",
+    recognize_images: "inference",
+    process_image: "full",
+    process_images: "full"
+}
+
+class OCRQueueFullError(Exception):
+    """
+    OCR任务队列已满时抛出，调用方应返回503并携带 Retry-After
+    """
+    
+    def __init__(self, retry_after: int):
+        super().__init__("OCR服务繁忙，请稍后重试")
+        self.retry_after = retry_after
+
+def _init_worker() -> None:
+    """
+    工作线程/进程初始化：预先加载PaddleOCR模型
+    """
+    _get_ocr()
+
+def _warmup_worker() -> float:
+    """
+    预热当前工作线程/进程：加载模型并对空白图片执行一次完整识别，完成推理引擎的首次初始化
+    
+    Returns:
+        预热耗时秒数
+    """
+    start_time = time.perf_counter()
+    _get_ocr().predict([np.full((64, 256, 3), 255, dtype=np.uint8)])
+    return time.perf_counter() - start_time
+
+def _timed_call(func: Callable[..., Any], *args: Any) -> Tuple[Any, float]:
+    """
+    在工作线程/进程中执行OCR函数并计时
+    
+    Args:
+        func: 要执行的函数（需可被pickle，即模块级函数）
+        args: 函数参数
+        
+    Returns:
+        (函数返回值, 执行耗时秒数)
+    """
+    start_time = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start_time
+
+class OCRWorkerPool:
+    """
+    OCR工作池：在独立的线程池或进程池中执行OCR推理，避免阻塞事件循环，
+    排队任务数超过上限时立即拒绝（背压）
+    """
+    
+    def __init__(self):
+        """
+        读取工作池配置，执行器在首次使用时创建
+        """
+        # 是否启用OCR，关闭时本进程只提供翻译服务，不加载Paddle
+        self.enabled = env_flag("OCR_ENABLED", "true")
+        # 是否在启动后于后台预热模型；关闭时模型在首次请求时加载
+        self.warmup_on_start = env_flag("OCR_WARMUP", "true")
+        # thread：线程池（推理在Paddle内部释放GIL）；process：进程池（完全隔离，内存占用按进程数倍增）
+        self.executor_type = os.getenv("OCR_EXECUTOR", "thread").strip().lower()
+        self.workers = max(1, int(os.getenv("OCR_WORKERS", 1)))
+        # 除正在执行的任务外，最多允许排队等待的任务数
+        self.max_queue = max(0, int(os.getenv("OCR_MAX_QUEUE", 8)))
+        self.retry_after = int(os.getenv("OCR_RETRY_AFTER", 5))
+        self._executor: Optional[Executor] = None
+        self._warmup_task: Optional[asyncio.Task] = None
+        # 模型状态：disabled（未启用）、lazy（首次请求时加载）、loading（预热中）、ready（已就绪）、
+        # failed（预热失败，之后任一识别任务成功时恢复为 ready）
+        self._status = "lazy" if self.enabled else "disabled"
+        # 已提交但未完成的任务数（排队 + 执行中）
+        self._pending = 0
+        self._stats = {
+            "requests": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "inference_seconds": 0.0,
+            "max_inference_seconds": 0.0,
+            "queue_wait_seconds": 0.0,
+            "max_queue_depth": 0,
+            "warmup_seconds": 0.0
+        }
+    
+    def _get_executor(self) -> Executor:
+        """
+        获取执行器，不存在时按配置创建
+        
+        Returns:
+            线程池或进程池执行器
+        """
+        if self._executor is None:
+            if self.executor_type == "process":
+                # 使用spawn避免子进程继承父进程中的线程和模型状态
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="ocr-worker",
+                    initializer=_init_worker
+                )
+            logger.info(f"OCR工作池已创建: {self.executor_type} x {self.workers}, 最大排队数: {self.max_queue}")
+        return self._executor
+    
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        在工作池中执行OCR函数
+        
+        Args:
+            func: 要执行的函数（进程池模式下需为模块级函数）
+            args: 函数参数
+            
+        Returns:
+            函数返回值
+            
+        Raises:
+            OCRQueueFullError: 排队任务数已达上限
+        """
+        if self._pending >= self.workers + self.max_queue:
+            self._stats["rejected"] += 1
+            logger.warning(f"OCR任务队列已满，拒绝请求 (进行中及排队任务: {self._pending})")
+            raise OCRQueueFullError(self.retry_after)
+        
+        executor = self._get_executor()
+        self._stats["requests"] += 1
+        self._pending += 1
+        self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._pending - self.workers)
+        start_time = time.perf_counter()
+        try:
+            result, inference_seconds = await asyncio.get_running_loop().run_in_executor(
+                executor, _timed_call, func, *args
+            )
+        except BrokenExecutor:
+            # 工作者初始化（模型加载）失败后执行器不可再用，丢弃后下次请求重新创建
+            self._stats["failed"] += 1
+            self._reset_executor()
+            raise
+        except Exception:
+            self._stats["failed"] += 1
+            raise
+        finally:
+            self._pending -= 1
+        
+        self._stats["completed"] += 1
+        metrics_service.observe_ocr(OCR_STAGES.get(func, "other"), inference_seconds)
+        # 预热失败后，之后的识别任务成功说明模型已经可用，恢复为就绪
+        if self._status == "lazy" or (self._status == "failed" and OCR_STAGES.get(func) in ("inference", "full")):
+            self._status = "ready"
+        self._stats["inference_seconds"] += inference_seconds
+        self._stats["max_inference_seconds"] = max(self._stats["max_inference_seconds"], inference_seconds)
+        self._stats["queue_wait_seconds"] += max(0.0, time.perf_counter() - start_time - inference_seconds)
+        return result
+    
+    def _reset_executor(self) -> None:
+        """
+        丢弃已损坏的执行器
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    async def warmup(self) -> None:
+        """
+        预热工作池：每个工作者各加载一次模型并执行一次空白图片识别
+        """
+        self._status = "loading"
+        logger.info(f"开始预热OCR模型: {self.executor_type} x {self.workers}")
+        start_time = time.perf_counter()
+        try:
+            executor = self._get_executor()
+            loop = asyncio.get_running_loop()
+            # 同时提交与工作者数量相同的任务，使每个工作者都被创建并完成初始化
+            await asyncio.gather(*[loop.run_in_executor(executor, _warmup_worker) for _ in range(self.workers)])
+        except Exception as e:
+            self._status = "failed"
+            logger.error(f"OCR模型预热失败: {str(e)}")
+            if isinstance(e, BrokenExecutor):
+                self._reset_executor()
+            return
+        self._status = "ready"
+        self._stats["warmup_seconds"] = time.perf_counter() - start_time
+        logger.info(f"OCR模型预热完成，耗时 {self._stats['warmup_seconds']:.2f} 秒")
+    
+    def start_warmup(self) -> None:
+        """
+        按配置在后台启动预热，不阻塞应用启动，在应用启动时调用
+        """
+        if self.enabled and self.warmup_on_start and self._warmup_task is None:
+            # 立即标记为加载中，避免预热任务开始执行前的就绪检查误报为就绪
+            self._status = "loading"
+            self._warmup_task = asyncio.get_running_loop().create_task(self.warmup())
+    
+    @property
+    def status(self) -> str:
+        """
+        模型状态：disabled、lazy、loading、ready 或 failed
+        """
+        return self._status
+    
+    @property
+    def ready(self) -> bool:
+        """
+        是否可以接收OCR请求（未启用预热时模型在首次请求时加载，也视为就绪）
+        """
+        return self._status in ("lazy", "ready")
+    
+    @property
+    def shares_memory(self) -> bool:
+        """
+        工作者是否与事件循环共享内存（线程池模式），共享时可直接传递上传文件对象而无需复制
+        """
+        return self.executor_type != "process"
+    
+    def shutdown(self) -> None:
+        """
+        关闭工作池并取消排队中的任务，在应用关闭时调用
+        """
+        if self._warmup_task is not None:
+            self._warmup_task.cancel()
+            self._warmup_task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info("OCR工作池已关闭")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取工作池统计信息
+        
+        Returns:
+            队列深度、执行中任务数、拒绝次数、平均/最大推理耗时、平均排队耗时等
+        """
+        stats: Dict[str, Any] = dict(self._stats)
+        completed = stats["completed"]
+        stats["enabled"] = self.enabled
+        stats["status"] = self._status
+        stats["executor"] = self.executor_type
+        stats["workers"] = self.workers
+        stats["max_queue"] = self.max_queue
+        stats["in_flight"] = min(self._pending, self.workers)
+        stats["queue_depth"] = max(0, self._pending - self.workers)
+        stats["avg_inference_seconds"] = round(stats["inference_seconds"] / completed, 4) if completed else 0.0
+        stats["avg_queue_wait_seconds"] = round(stats["queue_wait_seconds"] / completed, 4) if completed else 0.0
+        stats["inference_seconds"] = round(stats["inference_seconds"], 4)
+        stats["max_inference_seconds"] = round(stats["max_inference_seconds"], 4)
+        stats["queue_wait_seconds"] = round(stats["queue_wait_seconds"], 4)
+        stats["warmup_seconds"] = round(stats["warmup_seconds"], 4)
+        return stats
+
+# 创建全局OCR工作池实例
+ocr_pool = OCRWorkerPool()
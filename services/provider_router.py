@@ -0,0 +1,263 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+from utils.env import env_flag
+
+# 配置日志记录器
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# 创建控制台处理器（如果还没有的话）
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+# 对候选模型发起一次调用的函数：模型名称 -> 上游返回结果
+CallFunc = Callable[[str], Awaitable[Any]]
+
+def _percentile(values: List[float], percentile: float) -> float:
+    """
+    计算百分位数（最近秩法）
+    
+    Args:
+        values: 样本列表（非空）
+        percentile: 百分位，取值0-1
+        
+    Returns:
+        对应的样本值
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(percentile * len(ordered)))]
+
+class ProviderRouter:
+    """
+    延迟感知的模型路由：按模型统计滚动窗口内的延迟与错误率，把每次调用发往允许集合中最快的健康模型；
+    主调用失败时改投次优模型一次；可选对冲（hedging）：主调用超过该模型延迟分位数仍未返回时，
+    向次优模型发出重复请求，取先成功的结果并取消另一个
+    """
+    
+    def __init__(self, models: Iterable[str]):
+        """
+        读取路由配置
+        
+        Args:
+            models: 可用的模型名称（已配置API密钥），ROUTER_MODELS 中不可用的模型被忽略
+        """
+        self.enabled = env_flag("ROUTER_ENABLED")
+        configured = [name.strip() for name in os.getenv("ROUTER_MODELS", "").split(",") if name.strip()]
+        models = list(models)
+        # 允许路由的模型集合，需显式配置；只有请求的模型在集合内、且请求允许改投时才会被改投到其他模型
+        self.models = [name for name in configured if name in models]
+        # 滚动窗口：每个模型最多保留的样本数，以及样本的最长保留时间
+        self.window_size = int(os.getenv("ROUTER_WINDOW_SIZE", 100))
+        self.window_seconds = float(os.getenv("ROUTER_WINDOW_SECONDS", 60))
+        # 样本数不少于该值时才根据统计判断健康状况和延迟
+        self.min_samples = int(os.getenv("ROUTER_MIN_SAMPLES", 5))
+        # 错误率达到该值的模型视为不健康，排在候选列表末尾且不作为对冲目标
+        self.max_error_rate = float(os.getenv("ROUTER_MAX_ERROR_RATE", 0.5))
+        self.hedge_enabled = env_flag("ROUTER_HEDGE_ENABLED")
+        # 主调用耗时超过其延迟的该分位数时发出对冲请求
+        self.hedge_percentile = float(os.getenv("ROUTER_HEDGE_PERCENTILE", 0.95))
+        # 样本不足时的对冲等待时间，以及对冲等待时间的下限
+        self.hedge_default_delay = float(os.getenv("ROUTER_HEDGE_DELAY_MS", 2000)) / 1000
+        self.hedge_min_delay = float(os.getenv("ROUTER_HEDGE_MIN_DELAY_MS", 100)) / 1000
+        # 模型名称 -> [(完成时间, 耗时秒数, 是否成功)]
+        self._samples: Dict[str, Deque[Tuple[float, float, bool]]] = {}
+        self._stats = {"calls": 0, "rerouted": 0, "fallbacks": 0, "hedges_fired": 0, "hedges_won": 0}
+    
+    def _window(self, model_name: str) -> Deque[Tuple[float, float, bool]]:
+        """
+        获取模型的滚动窗口，并丢弃超过保留时间的样本
+        
+        Args:
+            model_name: 模型名称
+            
+        Returns:
+            该模型的样本队列
+        """
+        samples = self._samples.get(model_name)
+        if samples is None:
+            samples = deque(maxlen=self.window_size)
+            self._samples[model_name] = samples
+        expire_before = time.monotonic() - self.window_seconds
+        while samples and samples[0][0] < expire_before:
+            samples.popleft()
+        return samples
+    
+    def record(self, model_name: str, seconds: float, ok: bool) -> None:
+        """
+        记录一次调用的结果
+        
+        Args:
+            model_name: 模型名称
+            seconds: 调用耗时
+            ok: 是否成功
+        """
+        self._window(model_name).append((time.monotonic(), seconds, ok))
+    
+    def _health(self, model_name: str) -> Tuple[bool, Optional[float], float]:
+        """
+        根据滚动窗口计算模型的健康状况
+        
+        Args:
+            model_name: 模型名称
+            
+        Returns:
+            (是否健康, 成功调用的延迟中位数（样本不足时为None）, 错误率)
+        """
+        samples = self._window(model_name)
+        if len(samples) < self.min_samples:
+            return True, None, 0.0
+        error_rate = sum(1 for _, _, ok in samples if not ok) / len(samples)
+        latencies = [seconds for _, seconds, ok in samples if ok]
+        median = _percentile(latencies, 0.5) if latencies else None
+        return error_rate < self.max_error_rate, median, error_rate
+    
+    def candidates(self, model_name: str) -> List[str]:
+        """
+        为一次调用生成候选模型列表：健康模型按延迟中位数升序（样本不足的模型排在前面以便探测），
+        延迟相同时优先请求的模型，不健康的模型排在最后
+        
+        Args:
+            model_name: 请求的模型名称
+            
+        Returns:
+            候选模型列表；未启用路由或请求的模型不在允许集合内时只包含请求的模型
+        """
+        if not self.enabled or model_name not in self.models:
+            return [model_name]
+        
+        def rank(name: str) -> Tuple[bool, float, bool]:
+            healthy, median, _ = self._health(name)
+            return not healthy, median or 0.0, name != model_name
+            
+        return sorted(self.models, key=rank)
+    
+    def _hedge_delay(self, model_name: str) -> float:
+        """
+        计算向次优模型发出对冲请求前的等待时间
+        
+        Args:
+            model_name: 主调用的模型名称
+            
+        Returns:
+            等待秒数
+        """
+        latencies = [seconds for _, seconds, ok in self._window(model_name) if ok]
+        if len(latencies) < self.min_samples:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, _percentile(latencies, self.hedge_percentile))
+    
+    async def _timed_call(self, model_name: str, call: CallFunc) -> Any:
+        """
+        调用候选模型并记录耗时与结果；被取消的调用不在这里记录，对冲中落败的一方由 call 记录
+        
+        Args:
+            model_name: 模型名称
+            call: 调用函数
+            
+        Returns:
+            上游返回结果
+        """
+        start_time = time.perf_counter()
+        try:
+            result = await call(model_name)
+        except Exception:
+            self.record(model_name, time.perf_counter() - start_time, False)
+            raise
+        self.record(model_name, time.perf_counter() - start_time, True)
+        return result
+    
+    async def call(self, model_name: str, call: CallFunc, route: bool = False) -> Tuple[Any, str]:
+        """
+        按路由策略执行一次调用：主调用在发出对冲请求之前失败时，改投次优的健康模型一次；
+        对冲请求发出后两个调用都失败时抛出最后一个错误
+        
+        Args:
+            model_name: 请求的模型名称
+            call: 对指定模型发起调用的函数
+            route: 请求是否允许改投到其他模型，不允许时只调用请求的模型
+            
+        Returns:
+            (最先成功的上游返回结果, 实际使用的模型名称)
+        """
+        candidates = self.candidates(model_name) if route else [model_name]
+        if len(candidates) == 1:
+            return await call(candidates[0]), candidates[0]
+            
+        self._stats["calls"] += 1
+        primary = candidates[0]
+        if primary != model_name:
+            self._stats["rerouted"] += 1
+        # 失败改投和对冲的目标只选健康的次优模型
+        backup = candidates[1] if self._health(candidates[1])[0] else None
+        primary_task = asyncio.ensure_future(self._timed_call(primary, call))
+        started = {primary_task: (primary, time.perf_counter())}
+        pending = {primary_task}
+        decided = False
+        try:
+            hedge_delay = self._hedge_delay(primary) if self.hedge_enabled and backup is not None else None
+            done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+            if done:
+                if primary_task.exception() is None or backup is None:
+                    return primary_task.result(), primary
+                self._stats["fallbacks"] += 1
+                logger.warning(f"模型 {primary} 调用失败，改投 {backup}: {str(primary_task.exception())}")
+                return await self._timed_call(backup, call), backup
+                
+            self._stats["hedges_fired"] += 1
+            logger.info(f"模型 {primary} 响应较慢，向 {backup} 发出对冲请求")
+            hedge_task = asyncio.ensure_future(self._timed_call(backup, call))
+            started[hedge_task] = (backup, time.perf_counter())
+            pending.add(hedge_task)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        decided = True
+                        if task is hedge_task:
+                            self._stats["hedges_won"] += 1
+                            return task.result(), backup
+                        return task.result(), primary
+                    error = task.exception()
+            raise error
+        finally:
+            # 取消落败或仍在进行的调用（包括调用方被取消的情况）；对冲中落败的一方以已等待的时间作为延迟下限记录，
+            # 避免慢模型因总是被取消而始终没有样本、一直被当作未探测的模型排在最前。调用方被取消时不记录
+            for task in pending:
+                if task.done():
+                    continue
+                task.cancel()
+                if decided:
+                    name, start_time = started[task]
+                    self.record(name, time.perf_counter() - start_time, True)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取路由统计信息
+        
+        Returns:
+            调用次数、改投次数、失败改投次数、对冲发出/获胜次数，以及各模型的样本数、错误率和延迟分位数
+        """
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["enabled"] = self.enabled
+        stats["hedge_enabled"] = self.hedge_enabled
+        models = {}
+        for name in self.models:
+            healthy, _, error_rate = self._health(name)
+            latencies = [seconds for _, seconds, ok in self._window(name) if ok]
+            models[name] = {
+                "samples": len(self._window(name)),
+                "healthy": healthy,
+                "error_rate": round(error_rate, 4),
+                "p50_seconds": round(_percentile(latencies, 0.5), 4) if latencies else None,
+                "p95_seconds": round(_percentile(latencies, 0.95), 4) if latencies else None
+            }
+        stats["models"] = models
+        return stats
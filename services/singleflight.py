@@ -0,0 +1,84 @@
+import os
+import asyncio
+from typing import Any, Dict, Hashable, Tuple
+from utils.env import env_flag
+
+class SingleFlight:
+    """
+    进程内单飞（single-flight）合并：相同键的并发请求只有第一个（leader）真正执行，
+    其余请求等待并共享 leader 的结果
+    """
+    
+    def __init__(self):
+        """
+        读取单飞配置
+        """
+        self.enabled = env_flag("SINGLEFLIGHT_ENABLED", "true")
+        # 是否额外使用Redis短锁在多个worker进程之间合并
+        self.use_redis_lock = env_flag("SINGLEFLIGHT_REDIS_LOCK")
+        # Redis锁的过期时间，也是等待其他进程结果的最长时间（锁提前释放时立即停止等待）
+        self.lock_ttl_ms = int(os.getenv("SINGLEFLIGHT_LOCK_TTL_MS", 15000))
+        # 等待其他进程结果时轮询缓存的间隔
+        self.poll_interval = float(os.getenv("SINGLEFLIGHT_POLL_MS", 100)) / 1000
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._stats = {"leaders": 0, "coalesced": 0, "remote_waits": 0, "remote_hits": 0, "remote_released": 0}
+    
+    def claim(self, key: Hashable) -> Tuple[bool, asyncio.Future]:
+        """
+        认领一个键：没有进行中的调用时成为 leader，否则返回进行中调用的 future
+        
+        Args:
+            key: 合并键（通常为规范化的缓存键）
+            
+        Returns:
+            (是否为 leader, 共享结果的 future)
+        """
+        future = self._calls.get(key) if self.enabled else None
+        if future is not None:
+            self._stats["coalesced"] += 1
+            return False, future
+        future = asyncio.get_running_loop().create_future()
+        if self.enabled:
+            self._calls[key] = future
+        self._stats["leaders"] += 1
+        return True, future
+    
+    def resolve(self, key: Hashable, future: asyncio.Future, result: Any) -> None:
+        """
+        leader 完成后发布结果并释放键，重复调用时忽略
+        
+        Args:
+            key: 合并键
+            future: claim 返回的 future
+            result: 要共享的结果
+        """
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.done():
+            future.set_result(result)
+    
+    def record_remote(self, waits: int, hits: int, released: int = 0) -> None:
+        """
+        记录跨进程等待的次数和结果
+        
+        Args:
+            waits: 因其他进程持有锁而等待的文本数
+            hits: 等待期间从缓存中拿到结果的文本数
+            released: 结果写入前锁已被释放（对方翻译失败）而提前结束等待的文本数
+        """
+        self._stats["remote_waits"] += waits
+        self._stats["remote_hits"] += hits
+        self._stats["remote_released"] += released
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取单飞统计信息
+        
+        Returns:
+            leader 次数、被合并的次数、跨进程等待/命中/提前结束等待的次数以及当前进行中的键数
+        """
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["enabled"] = self.enabled
+        stats["redis_lock"] = self.use_redis_lock
+        stats["in_flight"] = len(self._calls)
+        return stats
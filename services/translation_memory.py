@@ -0,0 +1,354 @@
+import os
+import re
+import time
+import json
+import random
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+import numpy as np
+import redis.asyncio as redis
+from services.cache_service import cache_service, CACHE_KEY_PREFIX, CACHE_KEY_VERSION
+from services.metrics_service import metrics_service
+from utils.env import env_flag
+
+# 配置日志记录器
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# 创建控制台处理器（如果还没有的话）
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+# 可替换的值：URL，以及数字（含正负号、小数、千分位、日期和时间，如 -5、1,299.00、2024-05-01、12:30）；
+# 紧跟在字母或数字后的连字符不视为负号（如 COVID-19）
+URL_PATTERN = re.compile(r"https?://[^\s<>\"'，。）)]+|www\.[^\s<>\"'，。）)]+")
+NUMBER_PATTERN = re.compile(r"(?:(?<!\w)[-+−])?\d+(?:[.,:/-]\d+)*")
+_DIGITS_PATTERN = re.compile(r"\d+")
+# 模板中替代URL和数字的占位符（Unicode私用区字符，不会出现在正常文本中）
+URL_PLACEHOLDER = "\ue001"
+NUMBER_PLACEHOLDER = "\ue000"
+# 规范化模板时保留的记号：单词（含中文）和占位符，标点与空白被忽略
+TOKEN_PATTERN = re.compile(rf"\w+|[{NUMBER_PLACEHOLDER}{URL_PLACEHOLDER}]")
+# MinHash使用的梅森素数，哈希值与置换参数都小于它，乘积不会溢出uint64
+MERSENNE_PRIME = (1 << 31) - 1
+
+def mask_values(text: str) -> Tuple[str, List[str]]:
+    """
+    把文本中的URL和数字替换为占位符
+    
+    Args:
+        text: 原文
+        
+    Returns:
+        (带占位符的文本, 按出现顺序排列的原始值)
+    """
+    # URL中可能包含数字，先找出URL并在等长的副本中遮住，再查找其余的数字；最后按位置排序
+    spans: List[Tuple[int, int, str]] = []
+    for match in URL_PATTERN.finditer(text):
+        spans.append((match.start(), match.end(), URL_PLACEHOLDER))
+    masked_urls = URL_PATTERN.sub(lambda match: URL_PLACEHOLDER * len(match.group(0)), text)
+    for match in NUMBER_PATTERN.finditer(masked_urls):
+        spans.append((match.start(), match.end(), NUMBER_PLACEHOLDER))
+    spans.sort()
+    
+    values: List[str] = []
+    parts = []
+    position = 0
+    for start, end, placeholder in spans:
+        parts.append(text[position:start])
+        parts.append(placeholder)
+        values.append(text[start:end])
+        position = end
+    parts.append(text[position:])
+    return "".join(parts), values
+
+def normalize_template(text: str) -> Tuple[str, List[str]]:
+    """
+    生成用于匹配的规范化模板：URL和数字替换为占位符，忽略标点和空白的差异；
+    数字的正负号和小数、千分位等分隔符保留在模板中（-5 与 5、3.5 与 35 的模板不同）
+    
+    Args:
+        text: 原文
+        
+    Returns:
+        (规范化模板, 按出现顺序排列的原始值)
+    """
+    masked, values = mask_values(text)
+    value_iter = iter(values)
+    tokens = []
+    for token in TOKEN_PATTERN.findall(masked):
+        if token in (NUMBER_PLACEHOLDER, URL_PLACEHOLDER):
+            value = next(value_iter)
+            if token == NUMBER_PLACEHOLDER:
+                token = _DIGITS_PATTERN.sub(NUMBER_PLACEHOLDER, value)
+        tokens.append(token)
+    return " ".join(tokens), values
+
+def _value_pattern(value: str) -> str:
+    """
+    生成在译文中查找原始值的正则，数字不匹配更长数字的一部分（如 3 不匹配 13 或 3.5 中的 3）
+    """
+    if value.lstrip("-+−")[:1].isdigit():
+        return rf"(?<![0-9A-Za-z.,:/+−-]){re.escape(value)}(?![0-9A-Za-z]|[.,:/-][0-9])"
+    return re.escape(value)
+
+def build_substitution(values: List[str], translation: str) -> bool:
+    """
+    判断译文能否通过替换原始值复用：原文中的每个值都以相同次数原样出现在译文中
+    
+    Args:
+        values: 原文中的原始值
+        translation: 译文
+        
+    Returns:
+        是否可以替换复用
+    """
+    for value in set(values):
+        if len(re.findall(_value_pattern(value), translation)) != values.count(value):
+            return False
+    return True
+
+def substitute_values(translation: str, old_values: List[str], new_values: List[str]) -> Optional[str]:
+    """
+    把译文中的旧值按位置替换为新原文中的值
+    
+    Args:
+        translation: 已有译文
+        old_values: 已有原文中的值
+        new_values: 新原文中的值（与 old_values 一一对应）
+        
+    Returns:
+        替换后的译文；同一个旧值在新原文中对应不同的值时无法确定替换方式，返回None
+    """
+    mapping: Dict[str, str] = {}
+    for old_value, new_value in zip(old_values, new_values):
+        if mapping.setdefault(old_value, new_value) != new_value:
+            return None
+    changed = {old: new for old, new in mapping.items() if old != new}
+    if not changed:
+        return translation
+    # 一次性替换所有值，避免替换后的值再被后续替换
+    pattern = re.compile("|".join(_value_pattern(value) for value in sorted(changed, key=len, reverse=True)))
+    return pattern.sub(lambda match: changed[match.group(0)], translation)
+
+def shingles(template: str, size: int = 3) -> Set[str]:
+    """
+    把模板切分为字符n-gram集合（对中文与英文都适用）
+    """
+    if len(template) <= size:
+        return {template}
+    return {template[index:index + size] for index in range(len(template) - size + 1)}
+
+def jaccard(first: Set[str], second: Set[str]) -> float:
+    """
+    计算两个集合的Jaccard相似度
+    """
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+class TranslationMemory:
+    """
+    模糊翻译记忆：按目标语言、模型和翻译参数持久化已有的句子译文，
+    对只有数字、日期、URL、标点或空白不同的句子替换数值后直接复用译文（不调用模型），
+    对相似（MinHash + LSH 检索，Jaccard相似度达到阈值）的句子把已有译文作为少样本示例提供给模型
+    """
+    
+    def __init__(self):
+        """
+        读取翻译记忆配置
+        """
+        self.enabled = env_flag("TM_ENABLED")
+        # 翻译记忆在Redis中的保留时间（默认30天，长于句子级缓存）
+        self.ttl = int(os.getenv("TM_TTL", 30 * 24 * 60 * 60))
+        # 规范化模板完全相同时是否直接复用译文
+        self.reuse_enabled = env_flag("TM_REUSE_ENABLED", "true")
+        # 相似度达到该值的已有译文作为少样本示例，为0时不提供示例
+        self.fewshot_threshold = float(os.getenv("TM_FEWSHOT_THRESHOLD", 0.6))
+        self.fewshot_examples = int(os.getenv("TM_FEWSHOT_EXAMPLES", 2))
+        # 规范化模板短于该长度的句子不做相似检索（过短的句子相似度没有意义）
+        self.min_chars = int(os.getenv("TM_MIN_CHARS", 10))
+        # MinHash签名长度与LSH分段数（每段 num_perm / bands 行），分段越多召回越高
+        self.num_perm = int(os.getenv("TM_NUM_PERM", 64))
+        self.bands = int(os.getenv("TM_BANDS", 16))
+        self.rows = max(1, self.num_perm // self.bands)
+        # 每个LSH桶最多取出的候选数（取最近写入的）
+        self.max_candidates = int(os.getenv("TM_MAX_CANDIDATES", 20))
+        # 每个LSH桶最多保留的成员数，写入时按写入时间裁剪最旧的成员
+        self.max_bucket = int(os.getenv("TM_MAX_BUCKET", 200))
+        rng = random.Random(1)
+        self._perm_a = np.array([rng.randrange(1, MERSENNE_PRIME) for _ in range(self.bands * self.rows)], dtype=np.uint64)
+        self._perm_b = np.array([rng.randrange(0, MERSENNE_PRIME) for _ in range(self.bands * self.rows)], dtype=np.uint64)
+        self._stats = {"lookups": 0, "reused": 0, "fewshot": 0, "misses": 0, "stored": 0, "errors": 0}
+    
+    def _scope(self, target_language: str, model_name: str, extra_args: Optional[dict]) -> str:
+        """
+        生成翻译记忆的作用域：目标语言、模型名称和翻译参数都相同的句子才会相互匹配
+        """
+        canonical = json.dumps([target_language, model_name, extra_args or {}], ensure_ascii=False,
+                               sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.blake2b(canonical.encode("utf-8"), digest_size=8).hexdigest()
+    
+    def _entry_key(self, scope: str, template: str) -> str:
+        """
+        生成条目键，格式为 wistrans:<版本>:tm:<作用域>:e:<模板摘要>
+        """
+        digest = hashlib.blake2b(template.encode("utf-8"), digest_size=16).hexdigest()
+        return f"{CACHE_KEY_PREFIX}:{CACHE_KEY_VERSION}:tm:{scope}:e:{digest}"
+    
+    def _band_keys(self, scope: str, template: str) -> List[str]:
+        """
+        计算模板的MinHash签名，并生成各LSH分段的桶键，格式为 wistrans:<版本>:tm:<作用域>:z:<分段>:<分段摘要>；
+        桶为有序集合，成员是条目的模板摘要，分数是写入时间
+        """
+        hashes = np.array([
+            int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little") % MERSENNE_PRIME
+            for shingle in shingles(template)
+        ], dtype=np.uint64)
+        signature = ((self._perm_a[:, None] * hashes[None, :] + self._perm_b[:, None]) % MERSENNE_PRIME).min(axis=1)
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            keys.append(f"{CACHE_KEY_PREFIX}:{CACHE_KEY_VERSION}:tm:{scope}:z:{band}:{hashlib.blake2b(rows, digest_size=8).hexdigest()}")
+        return keys
+    
+    async def lookup_many(self, texts: List[str], model_names: List[str], target_language: str,
+                          extra_args: Optional[dict] = None) -> List[Tuple[Optional[str], List[Tuple[str, str]]]]:
+        """
+        批量查询翻译记忆
+        
+        Args:
+            texts: 要翻译的句子
+            model_names: 每个句子使用的模型名称
+            target_language: 目标语言
+            extra_args: 额外参数（不含控制参数）
+            
+        Returns:
+            与输入顺序一致的 (可直接复用的译文或None, 少样本示例 [(原文, 译文)]) 列表
+        """
+        results: List[Tuple[Optional[str], List[Tuple[str, str]]]] = [(None, []) for _ in texts]
+        if not self.enabled or not texts:
+            return results
+        self._stats["lookups"] += len(texts)
+        scopes = [self._scope(target_language, model_name, extra_args) for model_name in model_names]
+        templates = [normalize_template(text) for text in texts]
+        entry_keys = [self._entry_key(scope, template) for scope, (template, _) in zip(scopes, templates)]
+        
+        try:
+            # 第一次往返：规范化模板完全相同的条目
+            entries = await cache_service.redis_client.mget(entry_keys)
+            pending = []
+            for index, raw in enumerate(entries):
+                entry = json.loads(raw) if raw else None
+                if entry and self.reuse_enabled and entry["ok"]:
+                    reused = substitute_values(entry["t"], entry["v"], templates[index][1])
+                    if reused is not None:
+                        results[index] = (reused, [])
+                        continue
+                if self.fewshot_threshold > 0 and len(templates[index][0]) >= self.min_chars:
+                    pending.append(index)
+                    
+            if pending:
+                # 第二次往返：各LSH桶中未过期的最近候选条目摘要
+                band_keys = {index: self._band_keys(scopes[index], templates[index][0]) for index in pending}
+                oldest = time.time() - self.ttl
+                async with cache_service.redis_client.pipeline(transaction=False) as pipe:
+                    for index in pending:
+                        for band_key in band_keys[index]:
+                            pipe.zrevrangebyscore(band_key, "+inf", oldest, start=0, num=self.max_candidates)
+                    members = await pipe.execute()
+                candidates: Dict[int, Set[str]] = {}
+                for position, index in enumerate(pending):
+                    found = set()
+                    for bucket in members[position * self.bands:(position + 1) * self.bands]:
+                        # Redis客户端不自动解码，集合成员为 bytes
+                        found.update(member.decode("utf-8") for member in bucket or [])
+                    candidates[index] = found
+                # 第三次往返：候选条目内容
+                candidate_keys = sorted({
+                    f"{CACHE_KEY_PREFIX}:{CACHE_KEY_VERSION}:tm:{scopes[index]}:e:{digest}"
+                    for index in pending for digest in candidates[index]
+                })
+                candidate_entries = dict(zip(candidate_keys, await cache_service.redis_client.mget(candidate_keys))) if candidate_keys else {}
+                for index in pending:
+                    query = shingles(templates[index][0])
+                    scored = []
+                    for digest in candidates[index]:
+                        raw = candidate_entries.get(f"{CACHE_KEY_PREFIX}:{CACHE_KEY_VERSION}:tm:{scopes[index]}:e:{digest}")
+                        if not raw:
+                            continue
+                        entry = json.loads(raw)
+                        similarity = jaccard(query, shingles(entry["n"]))
+                        if similarity >= self.fewshot_threshold:
+                            scored.append((similarity, entry["s"], entry["t"]))
+                    scored.sort(reverse=True)
+                    results[index] = (None, [(source, translation) for _, source, translation in scored[:self.fewshot_examples]])
+        except redis.RedisError as e:
+            self._stats["errors"] += 1
+            logger.warning(f"翻译记忆查询失败，按未命中处理: {str(e)}")
+            return [(None, []) for _ in texts]
+            
+        for reused, examples in results:
+            outcome = "reuse" if reused is not None else "fewshot" if examples else "miss"
+            self._stats[{"reuse": "reused", "fewshot": "fewshot", "miss": "misses"}[outcome]] += 1
+            metrics_service.count_memory_lookup(outcome)
+        reused_count = sum(1 for reused, _ in results if reused is not None)
+        if reused_count:
+            logger.info(f"翻译记忆复用 {reused_count}/{len(texts)} 个句子，避免了对应的模型调用")
+        return results
+    
+    async def add_many(self, items: List[Tuple[str, str, str]], target_language: str,
+                       extra_args: Optional[dict] = None) -> None:
+        """
+        把模型新翻译的句子写入翻译记忆（一次流水线往返）。LSH桶中的成员按写入时间计分，
+        每次写入时删除超过 TTL 的成员并只保留最近的 TM_MAX_BUCKET 个，桶的大小不会随持续写入无限增长
+        
+        Args:
+            items: (原文, 模型名称, 译文) 列表
+            target_language: 目标语言
+            extra_args: 额外参数（不含控制参数）
+        """
+        if not self.enabled or not items:
+            return
+        now = time.time()
+        try:
+            async with cache_service.redis_client.pipeline(transaction=False) as pipe:
+                for text, model_name, translation in items:
+                    scope = self._scope(target_language, model_name, extra_args)
+                    template, values = normalize_template(text)
+                    if not template:
+                        continue
+                    entry_key = self._entry_key(scope, template)
+                    entry = {"s": text, "t": translation, "n": template, "v": values, "ok": build_substitution(values, translation)}
+                    pipe.setex(entry_key, self.ttl, json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+                    if len(template) >= self.min_chars:
+                        digest = entry_key.rsplit(":", 1)[-1]
+                        for band_key in self._band_keys(scope, template):
+                            pipe.zadd(band_key, {digest: now})
+                            pipe.zremrangebyscore(band_key, "-inf", now - self.ttl)
+                            pipe.zremrangebyrank(band_key, 0, -self.max_bucket - 1)
+                            pipe.expire(band_key, self.ttl)
+                    self._stats["stored"] += 1
+                await pipe.execute()
+        except redis.RedisError as e:
+            self._stats["errors"] += 1
+            logger.warning(f"翻译记忆写入失败: {str(e)}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取翻译记忆统计信息
+        
+        Returns:
+            查询次数、直接复用（即避免的模型调用）次数、提供少样本示例次数、未命中次数、写入次数和错误次数
+        """
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["enabled"] = self.enabled
+        stats["llm_calls_avoided"] = self._stats["reused"]
+        return stats
+
+# 创建全局翻译记忆实例
+translation_memory = TranslationMemory()
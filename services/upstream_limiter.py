@@ -0,0 +1,340 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+import httpx
+from services.metrics_service import metrics_service
+
+# 配置日志记录器
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# 创建控制台处理器（如果还没有的话）
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+# 上游可重试的服务端错误状态码（429 单独处理）
+RETRYABLE_STATUS_CODES = (500, 502, 503, 504)
+
+class CircuitOpenError(Exception):
+    """
+    提供商熔断期间快速失败时抛出
+    """
+    
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"上游服务 {provider} 暂时不可用（熔断中），请 {retry_after:.1f} 秒后重试")
+        self.provider = provider
+        self.retry_after = retry_after
+
+def parse_retry_after(response: httpx.Response) -> Optional[float]:
+    """
+    解析 Retry-After 响应头，支持秒数和HTTP日期两种格式
+    
+    Args:
+        response: 上游响应
+        
+    Returns:
+        需要等待的秒数，没有或无法解析时返回None
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def classify_response(response: httpx.Response) -> str:
+    """
+    按状态码对上游响应分类
+    
+    Args:
+        response: 上游响应
+        
+    Returns:
+        "throttled"（429限流）、"error"（可重试的服务端错误）或 "success"（成功或不可重试的客户端错误）
+    """
+    if response.status_code == 429:
+        return "throttled"
+    if response.status_code in RETRYABLE_STATUS_CODES:
+        return "error"
+    return "success"
+
+class AdaptiveLimiter:
+    """
+    单个提供商的自适应限流器：
+    - AIMD并发窗口：成功时加性增大（每个窗口约+1），429时乘性减小；
+    - 收到 Retry-After 时在指定时间内暂停发出新请求；
+    - 熔断器：连续失败达到阈值后熔断，冷却期内快速失败，之后放行一个试探请求（半开），成功则恢复
+    """
+    
+    def __init__(self, provider: str, max_limit: int, min_limit: int, decrease_factor: float,
+                 failure_threshold: int, cooldown: float):
+        """
+        初始化限流器
+        
+        Args:
+            provider: 提供商名称
+            max_limit: 并发窗口上限（即配置的最大并发数）
+            min_limit: 并发窗口下限
+            decrease_factor: 收到429时并发窗口的缩小倍数
+            failure_threshold: 触发熔断的连续失败次数
+            cooldown: 熔断冷却时间（秒）
+        """
+        self.provider = provider
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.decrease_factor = decrease_factor
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        # 熔断器状态：closed（正常）、open（熔断）、half_open（试探）
+        self.state = "closed"
+        self._consecutive_failures = 0
+        self._opened_until = 0.0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+        self._stats = {
+            "requests": 0,
+            "throttled": 0,
+            "errors": 0,
+            "decreases": 0,
+            "circuit_opens": 0,
+            "fast_failures": 0
+        }
+    
+    def _check_circuit(self, now: float) -> None:
+        """
+        检查熔断状态，熔断期间抛出异常，冷却结束后转为半开
+        
+        Args:
+            now: 当前时间（monotonic）
+        """
+        if self.state == "open":
+            if now < self._opened_until:
+                self._stats["fast_failures"] += 1
+                metrics_service.count_upstream_error(self.provider, "circuit_open")
+                raise CircuitOpenError(self.provider, self._opened_until - now)
+            self.state = "half_open"
+            logger.info(f"上游服务 {self.provider} 熔断冷却结束，放行试探请求")
+    
+    def _has_capacity(self) -> bool:
+        """
+        是否可以再发出一个请求（半开状态只允许一个试探请求）
+        """
+        if self.state == "half_open":
+            return self.in_flight == 0
+        return self.in_flight < max(self.min_limit, int(self.limit))
+    
+    async def acquire(self) -> None:
+        """
+        等待获取一个请求名额
+        
+        Raises:
+            CircuitOpenError: 提供商处于熔断期
+        """
+        async with self._condition:
+            while True:
+                now = time.monotonic()
+                self._check_circuit(now)
+                pause = self._paused_until - now
+                if pause <= 0 and self._has_capacity():
+                    self.in_flight += 1
+                    self._stats["requests"] += 1
+                    return
+                try:
+                    # 暂停期间到期后重新检查；否则等待其他请求释放名额
+                    await asyncio.wait_for(self._condition.wait(), timeout=pause if pause > 0 else None)
+                except asyncio.TimeoutError:
+                    pass
+    
+    async def release(self, outcome: str, retry_after: Optional[float] = None) -> None:
+        """
+        释放请求名额，并根据结果调整并发窗口和熔断状态
+        
+        Args:
+            outcome: "success"、"throttled"、"error"，或 "cancelled"（只释放名额，不影响窗口和熔断状态）
+            retry_after: 上游给出的 Retry-After 秒数
+        """
+        async with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if outcome == "success":
+                self.limit = min(float(self.max_limit), self.limit + 1 / max(self.limit, 1.0))
+                self._consecutive_failures = 0
+                if self.state == "half_open":
+                    self.state = "closed"
+                    logger.info(f"上游服务 {self.provider} 已恢复，关闭熔断")
+            elif outcome == "throttled":
+                self._stats["throttled"] += 1
+                # 同一批并发请求先后返回的429只缩小一次窗口
+                if now - self._last_decrease >= 1.0:
+                    self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+                    self._last_decrease = now
+                    self._stats["decreases"] += 1
+                    logger.warning(f"上游服务 {self.provider} 限流，并发窗口缩小到 {int(self.limit)}")
+                if self.state == "half_open":
+                    self.state = "closed"
+            elif outcome == "error":
+                self._stats["errors"] += 1
+                self._consecutive_failures += 1
+                if self.state == "half_open" or self._consecutive_failures >= self.failure_threshold:
+                    self.state = "open"
+                    self._opened_until = now + self.cooldown
+                    self._stats["circuit_opens"] += 1
+                    logger.error(f"上游服务 {self.provider} 连续失败 {self._consecutive_failures} 次，熔断 {self.cooldown} 秒")
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            self._condition.notify_all()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取限流器统计信息
+        
+        Returns:
+            当前并发窗口、进行中请求数、熔断状态以及限流/错误/熔断次数
+        """
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["limit"] = round(self.limit, 2)
+        stats["max_limit"] = self.max_limit
+        stats["in_flight"] = self.in_flight
+        stats["state"] = self.state
+        stats["paused_seconds"] = round(max(0.0, self._paused_until - time.monotonic()), 2)
+        return stats
+
+class UpstreamLimiter:
+    """
+    上游调用保护：为每个提供商维护一个自适应限流器，并对限流和暂时性错误进行带抖动的有限次重试
+    """
+    
+    def __init__(self):
+        """
+        读取限流、重试与熔断配置
+        """
+        self.min_limit = int(os.getenv("UPSTREAM_MIN_CONCURRENCY", 1))
+        self.decrease_factor = float(os.getenv("UPSTREAM_DECREASE_FACTOR", 0.5))
+        # 最多重试次数（不含首次请求）
+        self.max_retries = int(os.getenv("UPSTREAM_MAX_RETRIES", 2))
+        # 指数退避的基础时间与单次等待上限，Retry-After 超过上限时不再重试
+        self.retry_base = float(os.getenv("UPSTREAM_RETRY_BASE_MS", 200)) / 1000
+        self.retry_max_delay = float(os.getenv("UPSTREAM_RETRY_MAX_DELAY_MS", 10000)) / 1000
+        self.failure_threshold = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))
+        self.cooldown = float(os.getenv("CIRCUIT_COOLDOWN_SECONDS", 30))
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        self._stats = {"retries": 0}
+    
+    def get_limiter(self, provider: str, max_concurrency: int) -> AdaptiveLimiter:
+        """
+        获取提供商对应的限流器，不存在时创建
+        
+        Args:
+            provider: 提供商名称
+            max_concurrency: 该提供商的最大并发数（并发窗口上限）
+            
+        Returns:
+            提供商的自适应限流器
+        """
+        limiter = self._limiters.get(provider)
+        if limiter is None:
+            limiter = AdaptiveLimiter(provider, max_concurrency, self.min_limit, self.decrease_factor,
+                                      self.failure_threshold, self.cooldown)
+            self._limiters[provider] = limiter
+            logger.info(f"上游服务 {provider} 最大并发数: {max_concurrency}")
+        return limiter
+    
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> Optional[float]:
+        """
+        计算重试前的等待时间：优先使用 Retry-After，否则使用全抖动指数退避
+        
+        Args:
+            attempt: 已重试次数
+            retry_after: 上游给出的 Retry-After 秒数
+            
+        Returns:
+            等待秒数；Retry-After 超过等待上限时返回None，表示不再重试
+        """
+        if retry_after is not None:
+            if retry_after > self.retry_max_delay:
+                return None
+            # 多个请求同时收到相同的 Retry-After 时错开重试时间
+            return retry_after + random.uniform(0, self.retry_base)
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base * (2 ** attempt)))
+    
+    async def request(self, provider: str, max_concurrency: int,
+                      send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """
+        在提供商限流器的约束下发送请求，对429、5xx和连接/超时错误进行有限次重试
+        
+        Args:
+            provider: 提供商名称
+            max_concurrency: 该提供商的最大并发数
+            send: 发送一次请求的函数
+            
+        Returns:
+            成功的上游响应
+            
+        Raises:
+            CircuitOpenError: 提供商处于熔断期
+            httpx.HTTPError: 重试后仍然失败
+        """
+        limiter = self.get_limiter(provider, max_concurrency)
+        attempt = 0
+        while True:
+            await limiter.acquire()
+            retry_after: Optional[float] = None
+            try:
+                response = await send()
+            except httpx.TransportError as e:
+                await limiter.release("error")
+                error: Optional[Exception] = e
+                outcome = "error"
+            except BaseException:
+                # 被取消等情况：不视为上游错误
+                await limiter.release("cancelled")
+                raise
+            else:
+                outcome = classify_response(response)
+                retry_after = parse_retry_after(response) if outcome != "success" else None
+                await limiter.release(outcome, retry_after)
+                error = None
+                if outcome == "success":
+                    response.raise_for_status()
+                    return response
+                    
+            delay = self._backoff(attempt, retry_after) if attempt < self.max_retries else None
+            if delay is None:
+                if error is not None:
+                    raise error
+                response.raise_for_status()
+            attempt += 1
+            self._stats["retries"] += 1
+            logger.warning(f"上游服务 {provider} 请求失败（{error or response.status_code}），{delay:.2f} 秒后第 {attempt} 次重试")
+            await asyncio.sleep(delay)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取上游保护的统计信息
+        
+        Returns:
+            重试次数以及各提供商限流器的统计信息
+        """
+        return {
+            "retries": self._stats["retries"],
+            "max_retries": self.max_retries,
+            "providers": {provider: limiter.get_stats() for provider, limiter in self._limiters.items()}
+        }
+
+# 创建全局上游限流实例
+upstream_limiter = UpstreamLimiter()
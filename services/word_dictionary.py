@@ -0,0 +1,305 @@
+import os
+import re
+import glob
+import json
+import mmap
+import struct
+import logging
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from services.metrics_service import metrics_service
+
+# 配置日志记录器
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# 创建控制台处理器（如果还没有的话）
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+# 词典文件格式（小端序）:
+#   文件头    魔数(8) 版本(u32) 词条数(u32) 元数据长度(u32)
+#   元数据    UTF-8 JSON：源语言、目标语言（可有多个别名）、词条数
+#   偏移表    (词条数 + 1) 个 u64，为各词条相对数据区起点的偏移（首项为0，末项为数据区长度）
+#   数据区    按键的UTF-8字节序排列的词条，每条为 键 + \0 + 译文
+# 查询时只读取文件头和元数据，词条通过 mmap 按需访问，多个工作进程共享操作系统的页缓存
+DICT_MAGIC = b"WTDICT\x00\x00"
+DICT_VERSION = 1
+DICT_SUFFIX = ".wdict"
+HEADER = struct.Struct("<8sIII")
+OFFSET = struct.Struct("<Q")
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+def normalize_word(word: str) -> str:
+    """
+    规范化词典键：Unicode NFC、合并空白并转为小写，构建和查询时使用相同的规则
+    
+    Args:
+        word: 单词或短语
+        
+    Returns:
+        规范化后的键
+    """
+    return _WHITESPACE_PATTERN.sub(" ", unicodedata.normalize("NFC", word)).strip().lower()
+
+def build_dictionary(entries: Iterable[Tuple[str, str]], path: str, source_language: str, target_languages: List[str]) -> int:
+    """
+    把词条编译为词典文件（先写临时文件再替换，正在使用旧文件的进程不受影响）
+    
+    Args:
+        entries: (单词, 译文) 列表，键规范化后重复的词条以后出现的为准
+        path: 输出文件路径
+        source_language: 源语言（需与请求中的 source 一致才会命中）
+        target_languages: 目标语言及其别名（需与请求中的 target 一致才会命中）
+        
+    Returns:
+        写入的词条数
+        
+    Raises:
+        ValueError: 没有源语言或目标语言，或单词、译文中包含 \\0
+    """
+    if not source_language:
+        raise ValueError("需要指定源语言")
+    if not target_languages:
+        raise ValueError("至少需要一个目标语言")
+    table: Dict[bytes, bytes] = {}
+    for word, translation in entries:
+        key = normalize_word(word)
+        if not key or not translation:
+            continue
+        if "\x00" in key or "\x00" in translation:
+            raise ValueError(f"词条中不能包含 \\0: {word!r}")
+        table[key.encode("utf-8")] = translation.encode("utf-8")
+        
+    keys = sorted(table)
+    meta = json.dumps({"source": source_language, "targets": target_languages, "entries": len(keys)},
+                      ensure_ascii=False).encode("utf-8")
+    offsets = [0]
+    for key in keys:
+        offsets.append(offsets[-1] + len(key) + 1 + len(table[key]))
+        
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as dict_file:
+        dict_file.write(HEADER.pack(DICT_MAGIC, DICT_VERSION, len(keys), len(meta)))
+        dict_file.write(meta)
+        dict_file.write(b"".join(OFFSET.pack(offset) for offset in offsets))
+        for key in keys:
+            dict_file.write(key + b"\x00" + table[key])
+    os.replace(temp_path, path)
+    return len(keys)
+
+class SortedStringTable:
+    """
+    只读的内存映射词典文件，按键二分查找
+    """
+    
+    def __init__(self, path: str):
+        """
+        打开词典文件，校验文件头，并按文件大小校验元数据、偏移表和数据区的范围
+        
+        Args:
+            path: 词典文件路径
+            
+        Raises:
+            ValueError: 文件格式或版本不正确，或文件已损坏（如被截断）
+        """
+        self.path = path
+        with open(path, "rb") as dict_file:
+            self._mm = mmap.mmap(dict_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, count, meta_len = HEADER.unpack_from(self._mm, 0)
+            if magic != DICT_MAGIC or version != DICT_VERSION:
+                raise ValueError(f"不支持的词典文件格式: {path}")
+            index_offset = HEADER.size + meta_len
+            data_offset = index_offset + OFFSET.size * (count + 1)
+            if data_offset > len(self._mm):
+                raise ValueError(f"词典文件已损坏（偏移表超出文件范围）: {path}")
+            first = OFFSET.unpack_from(self._mm, index_offset)[0]
+            last = OFFSET.unpack_from(self._mm, index_offset + OFFSET.size * count)[0]
+            if first != 0 or data_offset + last != len(self._mm):
+                raise ValueError(f"词典文件已损坏（数据区长度与文件大小不一致）: {path}")
+            meta = json.loads(self._mm[HEADER.size:index_offset].decode("utf-8"))
+        except (struct.error, UnicodeDecodeError, json.JSONDecodeError) as e:
+            self._mm.close()
+            raise ValueError(f"词典文件已损坏: {path}") from e
+        except ValueError:
+            self._mm.close()
+            raise
+        self.count = count
+        self.source_language = meta.get("source")
+        self.target_languages = list(meta.get("targets") or [])
+        self._index_offset = index_offset
+        self._data_offset = data_offset
+    
+    def _entry(self, index: int) -> Tuple[int, int, int]:
+        """
+        返回第 index 个词条的 (起点, 键结束位置, 终点)
+        
+        Raises:
+            ValueError: 偏移超出数据区或词条缺少分隔符（文件已损坏）
+        """
+        start = self._data_offset + OFFSET.unpack_from(self._mm, self._index_offset + OFFSET.size * index)[0]
+        end = self._data_offset + OFFSET.unpack_from(self._mm, self._index_offset + OFFSET.size * (index + 1))[0]
+        separator = self._mm.find(b"\x00", start, end) if start <= end <= len(self._mm) else -1
+        if separator < 0:
+            raise ValueError(f"词典文件已损坏（第 {index} 个词条）: {self.path}")
+        return start, separator, end
+    
+    def get(self, key: bytes) -> Optional[str]:
+        """
+        查询词条
+        
+        Args:
+            key: 规范化后的键（UTF-8编码）
+            
+        Returns:
+            译文，不存在时返回None
+            
+        Raises:
+            ValueError: 查询路径上的词条已损坏
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            start, separator, end = self._entry(middle)
+            current = self._mm[start:separator]
+            if current == key:
+                return self._mm[separator + 1:end].decode("utf-8")
+            if current < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+    
+    @property
+    def size(self) -> int:
+        """
+        文件大小（字节）
+        """
+        return len(self._mm)
+    
+    def close(self) -> None:
+        """
+        关闭内存映射
+        """
+        self._mm.close()
+
+class WordDictionary:
+    """
+    本地单词词典：单词翻译先查询按源语言和目标语言加载的词典文件，命中时不再查询缓存和调用模型
+    """
+    
+    def __init__(self):
+        """
+        读取词典配置
+        """
+        # 词典文件目录，加载其中所有 *.wdict 文件，为空时不使用本地词典
+        self.dict_dir = os.getenv("WORD_DICT_DIR", "").strip()
+        self._tables: List[SortedStringTable] = []
+        # (源语言, 目标语言) -> 词典列表
+        self._by_language: Dict[Tuple[str, str], List[SortedStringTable]] = {}
+        self._stats = {"lookups": 0, "hits": 0, "errors": 0}
+    
+    @property
+    def enabled(self) -> bool:
+        """
+        是否已加载任何词典
+        """
+        return bool(self._tables)
+    
+    def load(self) -> None:
+        """
+        打开词典目录中的所有词典文件，无法打开的文件记录错误后跳过
+        """
+        self.close()
+        if not self.dict_dir:
+            return
+        for path in sorted(glob.glob(os.path.join(self.dict_dir, f"*{DICT_SUFFIX}"))):
+            try:
+                table = SortedStringTable(path)
+            except (OSError, ValueError) as e:
+                logger.error(f"加载词典失败: {path}: {str(e)}")
+                continue
+            if not table.source_language:
+                logger.error(f"词典缺少源语言，已跳过: {path}")
+                table.close()
+                continue
+            self._tables.append(table)
+            for target_language in table.target_languages:
+                self._by_language.setdefault((table.source_language, target_language), []).append(table)
+            logger.info(f"已加载词典 {path}: {table.source_language} -> {'/'.join(table.target_languages)}，{table.count} 个词条")
+    
+    def lookup_many(self, words: List[str], source_language: Optional[str], target_language: str) -> List[Optional[str]]:
+        """
+        批量查询单词译文，只查询为该源语言和目标语言构建的词典；
+        词典文件损坏导致查询失败时记录错误并按未命中处理，由模型翻译
+        
+        Args:
+            words: 单词列表
+            source_language: 源语言，为空时无法确定应使用的词典，全部按未命中处理
+            target_language: 目标语言
+            
+        Returns:
+            与输入顺序一致的译文列表，未命中的位置为None
+        """
+        tables = self._by_language.get((source_language, target_language)) if source_language else None
+        if not tables:
+            return [None] * len(words)
+        results: List[Optional[str]] = []
+        for word in words:
+            key = normalize_word(word).encode("utf-8")
+            result = None
+            # 同一语言对有多个词典时依次查询
+            for table in tables:
+                try:
+                    result = table.get(key)
+                except (ValueError, struct.error, UnicodeDecodeError) as e:
+                    self._stats["errors"] += 1
+                    logger.error(f"词典查询失败，改由模型翻译: {table.path}: {str(e)}")
+                    result = None
+                if result is not None:
+                    break
+            results.append(result)
+        hits = sum(1 for result in results if result is not None)
+        self._stats["lookups"] += len(words)
+        self._stats["hits"] += hits
+        metrics_service.count_dictionary_lookup(hits, len(words) - hits)
+        return results
+    
+    def close(self) -> None:
+        """
+        关闭所有已加载的词典
+        """
+        for table in self._tables:
+            table.close()
+        self._tables = []
+        self._by_language = {}
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取词典统计信息
+        
+        Returns:
+            查询次数、命中次数、命中率、查询失败次数以及已加载的词典
+        """
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["enabled"] = self.enabled
+        stats["hit_ratio"] = round(self._stats["hits"] / self._stats["lookups"], 4) if self._stats["lookups"] else 0.0
+        stats["dictionaries"] = [
+            {
+                "path": table.path,
+                "source": table.source_language,
+                "targets": table.target_languages,
+                "entries": table.count,
+                "bytes": table.size
+            }
+            for table in self._tables
+        ]
+        return stats
+
+# 创建全局单词词典实例
+word_dictionary = WordDictionary()
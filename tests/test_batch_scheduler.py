@@ -0,0 +1,75 @@
+"""
+跨请求微批调度测试：窗口到期或达到批次上限时分发，不同批次键互不合并，批次大小与排队延迟计入统计和指标
+"""
+import asyncio
+import pytest
+from services.batch_scheduler import BatchScheduler
+from services.metrics_service import metrics_service
+
+@pytest.fixture
+def scheduler_env(monkeypatch):
+    monkeypatch.setenv("BATCH_SCHEDULER_ENABLED", "true")
+    monkeypatch.setenv("BATCH_WINDOW_MS", "20")
+    monkeypatch.setenv("BATCH_MAX_WAIT_MS", "200")
+    monkeypatch.setenv("BATCH_MAX_SIZE", "4")
+
+def make_scheduler():
+    """
+    创建调度器，返回 (调度器, 记录每次分发的 (批次键, 文本列表) 的列表)
+    """
+    calls = []
+    
+    async def dispatch(key, texts):
+        calls.append((key, list(texts)))
+        return [(f"T({text})", True, "m") for text in texts]
+    return BatchScheduler(dispatch), calls
+
+def metric_count(name: str) -> float:
+    return metrics_service.registry.get_sample_value(f"wistrans_{name}_count") or 0.0
+
+def test_flush_by_window(scheduler_env):
+    async def run():
+        scheduler, calls = make_scheduler()
+        first = asyncio.ensure_future(scheduler.submit("k", "a"))
+        await asyncio.sleep(0.005)
+        second = asyncio.ensure_future(scheduler.submit("k", "b"))
+        # 窗口内还没有分发
+        await asyncio.sleep(0.005)
+        assert calls == []
+        results = await asyncio.gather(first, second)
+        return scheduler, calls, results
+        
+    scheduler, calls, results = asyncio.run(run())
+    assert calls == [("k", ["a", "b"])]
+    assert results == [("T(a)", True, "m"), ("T(b)", True, "m")]
+    stats = scheduler.get_stats()
+    assert (stats["batches"], stats["items"], stats["flush_timer"], stats["flush_full"]) == (1, 2, 1, 0)
+
+def test_flush_by_size(scheduler_env):
+    async def run():
+        scheduler, calls = make_scheduler()
+        futures = [asyncio.ensure_future(scheduler.submit("k", str(index))) for index in range(6)]
+        # 前 4 条达到批次上限立即分发，不等待窗口
+        await asyncio.sleep(0.001)
+        full_batches = list(calls)
+        results = await asyncio.gather(*futures)
+        return scheduler, calls, full_batches, results
+        
+    batches_before, delays_before = metric_count("batch_size"), metric_count("batch_queue_delay_seconds")
+    scheduler, calls, full_batches, results = asyncio.run(run())
+    assert full_batches == [("k", ["0", "1", "2", "3"])]
+    assert calls == [("k", ["0", "1", "2", "3"]), ("k", ["4", "5"])]
+    assert [text for text, _, _ in results] == [f"T({index})" for index in range(6)]
+    stats = scheduler.get_stats()
+    assert (stats["flush_full"], stats["flush_timer"], stats["max_batch_size"]) == (1, 1, 4)
+    assert stats["batch_size_buckets"]["2"] == 1 and stats["batch_size_buckets"]["4"] == 1
+    assert metric_count("batch_size") - batches_before == 2
+    assert metric_count("batch_queue_delay_seconds") - delays_before == 6
+
+def test_keys_are_batched_separately(scheduler_env):
+    async def run():
+        scheduler, calls = make_scheduler()
+        await asyncio.gather(scheduler.submit("x", "a"), scheduler.submit("y", "b"), scheduler.submit("x", "c"))
+        return calls
+        
+    assert sorted(asyncio.run(run())) == [("x", ["a", "c"]), ("y", ["b"])]
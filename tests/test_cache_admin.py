@@ -0,0 +1,40 @@
+"""
+缓存维护命令的键匹配测试：flush-legacy 只能匹配旧版缓存键，不能误删同一数据库中的其他键
+"""
+import base64
+import json
+from scripts.cache_admin import is_legacy_key, is_stale_version_key
+
+def legacy_key(key_type: str, text: str, target_language: str, model_name: str, extra_args: dict = None) -> str:
+    """
+    按旧版规则生成缓存键（可读部分 + "_" + base64编码的前20个字符）
+    """
+    key_data = f"{key_type}:{text}:{target_language}:{model_name}"
+    if extra_args:
+        key_data += f":{json.dumps(extra_args, sort_keys=True)}"
+    return f"{text[:30].replace(' ', '_')}_{base64.b64encode(key_data.encode()).decode()[:20]}"
+
+def test_legacy_keys_match():
+    keys = [
+        legacy_key("sentence", "Hello world, this is a fairly long sentence.", "中文", "deepseek-chat"),
+        legacy_key("sentence", "你好", "English", "qwen-turbo-latest", {"style": "正式"}),
+        legacy_key("word", "apple", "中文", "deepseek-chat"),
+        legacy_key("word", "a", "x", "m")
+    ]
+    assert all(is_legacy_key(key) for key in keys)
+
+def test_unrelated_keys_do_not_match():
+    keys = [
+        "session_ABCDEFGHIJKLMNOPQRST",
+        "user_profile_0123456789",
+        "celery_task_meta_abcdefghij",
+        "prefix_c2VudGVuY2U6aGk6ZW46bW9kZWwtbmFtZS1sb25n",
+        "a_much_longer_readable_part_than_thirty_chars_d29yZDphOmVuOm0=",
+        "wistrans:v1:sentence:0123456789abcdef0123456789abcdef"
+    ]
+    assert not any(is_legacy_key(key) for key in keys)
+
+def test_stale_version_keys():
+    assert is_stale_version_key("wistrans:v0:sentence:abc")
+    assert not is_stale_version_key("wistrans:v1:sentence:abc")
+    assert not is_stale_version_key("other:v0:sentence:abc")
@@ -0,0 +1,80 @@
+"""
+缓存值编解码测试：各压缩方式的封装往返、旧格式纯文本的兼容读取、损坏数据按未命中处理，以及封装大小估算
+"""
+import pytest
+from services.cache_codec import CacheCodec, ENVELOPE_HEADER, model_tag
+
+LONG_TEXT = "这是一个需要压缩的较长译文，包含重复的内容。" * 20
+
+def make_codec(monkeypatch, **env) -> CacheCodec:
+    """
+    按给定的环境变量创建编解码器
+    """
+    monkeypatch.setenv("CACHE_ENVELOPE_ENABLED", "true")
+    monkeypatch.delenv("CACHE_ZSTD_DICT", raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return CacheCodec()
+
+@pytest.mark.parametrize("compression", ["zlib", "zstd", "none"])
+@pytest.mark.parametrize("value", ["短", "", LONG_TEXT])
+def test_round_trip(monkeypatch, compression: str, value: str):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    codec = make_codec(monkeypatch, CACHE_COMPRESSION=compression)
+    encoded = codec.encode(value, "deepseek-chat")
+    assert codec.decode(encoded) == value
+    parsed = codec.inspect(encoded)
+    assert parsed["text"] == value
+    assert parsed["model_tag"] == model_tag("deepseek-chat")
+
+def test_long_values_are_compressed(monkeypatch):
+    codec = make_codec(monkeypatch, CACHE_COMPRESSION="zlib")
+    encoded = codec.encode(LONG_TEXT)
+    assert len(encoded) < len(LONG_TEXT.encode("utf-8"))
+    assert codec.inspect(encoded)["format"] == "zlib"
+    assert codec.get_stats()["compressed"] == 1
+
+def test_short_values_are_stored_raw(monkeypatch):
+    codec = make_codec(monkeypatch, CACHE_COMPRESSION="zlib", CACHE_COMPRESS_MIN_BYTES="128")
+    encoded = codec.encode("hello")
+    assert codec.inspect(encoded)["format"] == "raw"
+    assert len(encoded) == ENVELOPE_HEADER.size + len("hello")
+
+def test_envelope_disabled_writes_plain_text(monkeypatch):
+    codec = make_codec(monkeypatch, CACHE_ENVELOPE_ENABLED="false")
+    assert codec.encode(LONG_TEXT) == LONG_TEXT.encode("utf-8")
+
+@pytest.mark.parametrize("raw", ["你好".encode("utf-8"), b"Hello world", b"{\"detected_text\": []}"])
+def test_legacy_plain_text_is_readable(monkeypatch, raw: bytes):
+    codec = make_codec(monkeypatch)
+    assert codec.decode(raw) == raw.decode("utf-8")
+    assert codec.inspect(raw)["format"] == "legacy"
+    assert codec.get_stats()["legacy_reads"] == 1
+
+def test_missing_value_decodes_to_none(monkeypatch):
+    assert make_codec(monkeypatch).decode(None) is None
+
+@pytest.mark.parametrize("corrupt", [
+    b"\x00",
+    b"\x00\x01\x01junk",
+    b"\x00\x09\x00" + b"\x00" * 6 + b"text",
+    lambda codec: codec.encode(LONG_TEXT)[:-5],
+    b"\xff\xfe\xfd",
+])
+def test_corrupt_values_decode_to_none(monkeypatch, corrupt):
+    codec = make_codec(monkeypatch, CACHE_COMPRESSION="zlib")
+    raw = corrupt(codec) if callable(corrupt) else corrupt
+    assert codec.decode(raw) is None
+    assert codec.get_stats()["decode_errors"] == 1
+
+def test_estimate_matches_encoded_size_without_side_effects(monkeypatch):
+    codec = make_codec(monkeypatch, CACHE_COMPRESSION="zlib")
+    for value in ("hello", LONG_TEXT):
+        assert codec.estimate(value) == len(codec.encode(value))
+    encoded_before = codec.get_stats()["encoded"]
+    codec.estimate(LONG_TEXT)
+    assert codec.get_stats()["encoded"] == encoded_before
+    # 未开启封装写入时同样按封装格式估算
+    disabled = make_codec(monkeypatch, CACHE_ENVELOPE_ENABLED="false", CACHE_COMPRESSION="zlib")
+    assert disabled.estimate(LONG_TEXT) == codec.estimate(LONG_TEXT)
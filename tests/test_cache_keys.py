@@ -0,0 +1,60 @@
+"""
+缓存键生成规则测试：不同目标语言、模型、extra_args 和键类型必须得到不同的键，读写共用同一规则
+"""
+import re
+import pytest
+from services.cache_service import CacheService, CACHE_KEY_PREFIX, CACHE_KEY_VERSION
+
+KEY_PATTERN = re.compile(rf"^{CACHE_KEY_PREFIX}:{CACHE_KEY_VERSION}:(sentence|word):[0-9a-f]{{32}}$")
+
+@pytest.fixture(scope="module")
+def service() -> CacheService:
+    """
+    缓存服务实例（生成缓存键不需要连接Redis）
+    """
+    return CacheService()
+
+def test_key_format(service: CacheService):
+    key = service._generate_cache_key("sentence", "Hello world", "中文", "deepseek-chat")
+    assert key.startswith("wistrans:v1:sentence:")
+    assert KEY_PATTERN.match(key)
+    assert KEY_PATTERN.match(service._generate_cache_key("word", "apple", "中文", "deepseek-chat"))
+
+def test_key_is_deterministic(service: CacheService):
+    first = service._generate_cache_key("sentence", "Hello world", "中文", "deepseek-chat", {"style": "正式"})
+    second = service._generate_cache_key("sentence", "Hello world", "中文", "deepseek-chat", {"style": "正式"})
+    assert first == second
+
+def test_key_differs_by_target_language(service: CacheService):
+    assert (service._generate_cache_key("sentence", "Hello", "中文", "deepseek-chat")
+            != service._generate_cache_key("sentence", "Hello", "English", "deepseek-chat"))
+
+def test_key_differs_by_model(service: CacheService):
+    assert (service._generate_cache_key("sentence", "Hello", "中文", "deepseek-chat")
+            != service._generate_cache_key("sentence", "Hello", "中文", "qwen-turbo-latest"))
+
+def test_key_differs_by_extra_args_content(service: CacheService):
+    keys = {
+        service._generate_cache_key("sentence", "Hello", "中文", "deepseek-chat", extra_args)
+        for extra_args in (None, {"style": "正式"}, {"style": "口语"}, {"identity": "程序专家"})
+    }
+    assert len(keys) == 4
+
+def test_key_ignores_extra_args_order(service: CacheService):
+    assert (service._generate_cache_key("sentence", "Hello", "中文", "deepseek-chat", {"style": "正式", "identity": "通用专家"})
+            == service._generate_cache_key("sentence", "Hello", "中文", "deepseek-chat", {"identity": "通用专家", "style": "正式"}))
+
+def test_empty_extra_args_equals_none(service: CacheService):
+    assert (service._generate_cache_key("sentence", "Hello", "中文", "deepseek-chat", {})
+            == service._generate_cache_key("sentence", "Hello", "中文", "deepseek-chat", None))
+
+def test_key_differs_by_kind(service: CacheService):
+    sentence_key = service._generate_cache_key("sentence", "apple", "中文", "deepseek-chat")
+    word_key = service._generate_cache_key("word", "apple", "中文", "deepseek-chat")
+    assert sentence_key != word_key
+    assert sentence_key.split(":")[2] == "sentence"
+    assert word_key.split(":")[2] == "word"
+
+def test_word_key_ignores_punctuation(service: CacheService):
+    assert (service._generate_cache_key("word", "apple!", "中文", "deepseek-chat")
+            == service._generate_cache_key("word", "apple", "中文", "deepseek-chat"))
@@ -0,0 +1,85 @@
+"""
+进程内LRU缓存测试：按条目数和字节数淘汰最久未使用的条目、过期、覆盖写入与统计
+"""
+import pytest
+from utils import lru_cache
+from utils.lru_cache import LRUCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    可手动推进的单调时钟
+    """
+    now = [1000.0]
+    monkeypatch.setattr(lru_cache.time, "monotonic", lambda: now[0])
+    return now
+
+def test_get_and_set():
+    cache = LRUCache(10, 1000, 60)
+    assert cache.get("a") is None
+    cache.set("a", "1")
+    assert cache.get("a") == "1"
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["bytes"]) == (1, 1, 1, 2)
+
+def test_evicts_least_recently_used_by_entries():
+    cache = LRUCache(2, 1000, 60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    # 访问 a 后 b 成为最久未使用的条目
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("1", "3")
+    assert cache.get_stats()["evictions"] == 1
+
+def test_evicts_by_bytes():
+    cache = LRUCache(100, 10, 60)
+    cache.set("a", "1234")
+    cache.set("b", "5678")
+    cache.set("c", "90")
+    assert cache.get("a") is None
+    assert cache.get_stats()["bytes"] <= 10
+    # 中文按UTF-8字节数计算
+    cache.set("d", "中文")
+    assert cache.get_stats()["bytes"] == len("d中文".encode("utf-8")) + len("c90")
+
+def test_oversized_entry_is_not_cached():
+    cache = LRUCache(10, 5, 60)
+    cache.set("a", "1")
+    cache.set("big", "0123456789")
+    assert cache.get("big") is None
+    assert cache.get("a") == "1"
+
+def test_overwrite_updates_size():
+    cache = LRUCache(10, 1000, 60)
+    cache.set("a", "1")
+    cache.set("a", "12345")
+    stats = cache.get_stats()
+    assert (stats["entries"], stats["bytes"]) == (1, 6)
+    assert cache.get("a") == "12345"
+
+def test_expiration(clock):
+    cache = LRUCache(10, 1000, 60)
+    cache.set("a", "1")
+    # 单个条目的过期时间不超过默认过期时间
+    cache.set("b", "2", ttl=600)
+    cache.set("c", "3", ttl=5)
+    clock[0] += 10
+    assert cache.get("c") is None
+    assert cache.get("a") == "1"
+    clock[0] += 60
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+    stats = cache.get_stats()
+    assert (stats["expirations"], stats["entries"], stats["bytes"]) == (3, 0, 0)
+
+def test_delete_and_clear():
+    cache = LRUCache(10, 1000, 60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.delete("a")
+    cache.delete("missing")
+    assert cache.get("a") is None
+    cache.clear()
+    assert (cache.get_stats()["entries"], cache.get_stats()["bytes"]) == (0, 0)
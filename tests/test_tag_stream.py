@@ -0,0 +1,70 @@
+"""
+流式标签提取测试：分块输入的结果必须与对完整输出做 re.search 后 strip() 一致，未闭合的标签不输出残缺的结束标签
+"""
+import re
+import pytest
+from utils.tag_stream import TagStreamExtractor
+
+PATTERN = re.compile(r"<translated_text>(.*?)</translated_text>", re.DOTALL)
+
+def run(chunks):
+    """
+    依次输入所有分块，返回 (实际输出的拼接结果, 提取器)
+    """
+    extractor = TagStreamExtractor("translated_text")
+    output = "".join(extractor.feed(chunk) for chunk in chunks)
+    output += extractor.finish()
+    assert output == extractor.text
+    return output, extractor
+
+def reference(raw: str) -> str:
+    """
+    非流式路径的解析结果
+    """
+    match = PATTERN.search(raw)
+    return match.group(1).strip() if match else raw
+
+def split_every(raw: str, size: int):
+    return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+@pytest.mark.parametrize("raw", [
+    "<translated_text>你好，世界</translated_text>",
+    "思考过程……\n<translated_text>\n  你好，世界  \n</translated_text>\n",
+    "<translated_text>a < b </ c </translated</translated_text>",
+    "<translated_text>   </translated_text>",
+    "没有标签的原始输出",
+])
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_matches_non_stream(raw: str, size: int):
+    output, extractor = run(split_every(raw, size))
+    assert output == reference(raw)
+    assert extractor.complete
+
+def test_tags_split_across_chunks():
+    output, _ = run(["<transl", "ated_text>ab", "c</transla", "ted_text>tail"])
+    assert output == "abc"
+
+def test_stops_after_close_tag():
+    extractor = TagStreamExtractor("translated_text")
+    assert extractor.feed("<translated_text>abc</translated_text>") == "abc"
+    assert extractor.feed("<translated_text>more</translated_text>") == ""
+    assert extractor.finish() == ""
+
+def test_surrounding_whitespace_held_until_content():
+    extractor = TagStreamExtractor("translated_text")
+    assert extractor.feed("<translated_text>\n  ") == ""
+    assert extractor.feed("ab  ") == "ab"
+    assert extractor.feed("  cd \n") == "    cd"
+    assert extractor.feed("</translated_text>") == ""
+    assert extractor.text == "ab    cd"
+
+@pytest.mark.parametrize("tail", ["", "<", "</", "</translated_", "</translated_text"])
+def test_unclosed_drops_partial_close_tag(tail: str):
+    output, extractor = run(["<translated_text> abc ", tail])
+    assert output == "abc"
+    assert not extractor.complete
+
+def test_unclosed_keeps_text_that_is_not_a_tag_prefix():
+    output, extractor = run(["<translated_text>a </b"])
+    assert output == "a </b"
+    assert not extractor.complete
@@ -0,0 +1,50 @@
+"""
+文本规范化、按句拆分与拼接测试：规范化默认保留换行，列表序号和缩写不作为句子结束，拼接按中日韩字符决定是否加空格
+"""
+import pytest
+from utils.text_segmenter import normalize_text, split_sentences, join_sentences
+
+def test_normalize_entities_nfc_and_invisible_characters():
+    assert normalize_text("café &amp; te\u200bst&nbsp;x") == "café & test x"
+
+def test_normalize_keeps_line_breaks_by_default():
+    assert normalize_text("  a   b  \r\n  c\t \r\n\nd ") == "a b\n  c\n\nd"
+
+def test_normalize_collapses_line_breaks_when_requested():
+    assert normalize_text("a \r\n b\n\nc", collapse_newlines=True) == "a b c"
+
+def test_normalize_returns_original_when_empty():
+    assert normalize_text("\u200b") == "\u200b"
+
+@pytest.mark.parametrize("text, expected", [
+    ("Hello world. How are you? Fine!", ["Hello world.", "How are you?", "Fine!"]),
+    ("你好。今天天气很好！“真的吗？”是的", ["你好。", "今天天气很好！", "“真的吗？”", "是的"]),
+    ("Pi is 3.14 and see example.com for more. Next.", ["Pi is 3.14 and see example.com for more.", "Next."]),
+    ("Mr. Smith met Dr. Jones, e.g. at noon. J. K. Rowling wrote it.",
+     ["Mr. Smith met Dr. Jones, e.g. at noon.", "J. K. Rowling wrote it."]),
+    ("He said \"Stop.\" Then left.", ["He said \"Stop.\"", "Then left."]),
+])
+def test_split_sentences(text, expected):
+    assert split_sentences(text) == expected
+
+@pytest.mark.parametrize("text, expected", [
+    ("1. First item. 2. Second item.", ["1. First item.", "2. Second item."]),
+    ("Steps: do it. 10. Done here.", ["Steps: do it.", "10. Done here."]),
+    ("Intro\n1. One thing\n2. Another", ["Intro\n1. One thing\n2. Another"]),
+    ("I was born in 1990. Then I moved.", ["I was born in 1990.", "Then I moved."]),
+])
+def test_split_list_markers(text, expected):
+    assert split_sentences(text) == expected
+
+def test_split_after_normalize_with_collapsed_newlines():
+    text = normalize_text("1. First item.\n2. Second item.", collapse_newlines=True)
+    assert split_sentences(text) == ["1. First item.", "2. Second item."]
+
+def test_split_below_min_chars():
+    assert split_sentences("One. Two.", min_chars=100) == ["One. Two."]
+
+def test_split_keeps_text_without_boundaries():
+    assert split_sentences("no boundary here") == ["no boundary here"]
+
+def test_join_sentences():
+    assert join_sentences(["你好。", "今天天气很好", "Hello.", " World ", ""]) == "你好。今天天气很好Hello. World"
@@ -0,0 +1,88 @@
+"""
+翻译记忆测试：数字和URL的模板替换（保留正负号和小数分隔符）、按值替换复用译文、MinHash + LSH 分桶与桶大小上限
+"""
+import asyncio
+import pytest
+from services.translation_memory import (
+    TranslationMemory, NUMBER_PLACEHOLDER, URL_PLACEHOLDER,
+    mask_values, normalize_template, build_substitution, substitute_values, shingles, jaccard
+)
+
+def test_mask_values_keeps_order_of_urls_and_numbers():
+    masked, values = mask_values("Visit https://a.com/2 on 2024-05-01 for 3 items")
+    assert values == ["https://a.com/2", "2024-05-01", "3"]
+    assert masked == f"Visit {URL_PLACEHOLDER} on {NUMBER_PLACEHOLDER} for {NUMBER_PLACEHOLDER} items"
+
+def test_template_ignores_whitespace_punctuation_and_values():
+    first, first_values = normalize_template("Only 3 items left!")
+    second, second_values = normalize_template("Only  7 items left.")
+    assert first == second
+    assert (first_values, second_values) == (["3"], ["7"])
+
+@pytest.mark.parametrize("first, second", [
+    ("Change: -5 today", "Change: 5 today"),
+    ("Change: +5 today", "Change: 5 today"),
+    ("Price 3.5 now", "Price 35 now"),
+    ("Price 1,299 now", "Price 1.299 now"),
+])
+def test_template_keeps_sign_and_decimal_punctuation(first: str, second: str):
+    assert normalize_template(first)[0] != normalize_template(second)[0]
+
+def test_hyphen_after_word_is_not_a_sign():
+    template, values = normalize_template("COVID-19 cases")
+    assert values == ["19"]
+    assert template == f"COVID {NUMBER_PLACEHOLDER} cases"
+
+def test_substitution_replaces_values_by_position():
+    assert build_substitution(["3", "2024-05-01"], "剩余 3 件，截至 2024-05-01")
+    assert substitute_values("剩余 3 件，截至 2024-05-01", ["3", "2024-05-01"], ["7", "2024-06-02"]) == "剩余 7 件，截至 2024-06-02"
+    assert substitute_values("变化 -5", ["-5"], ["-12"]) == "变化 -12"
+
+def test_substitution_rejects_rewritten_or_partial_values():
+    # 译文改写了数字格式，或旧值只是更长数字的一部分
+    assert not build_substitution(["1,299.00"], "价格 1299 元")
+    assert not build_substitution(["3"], "共 13 件")
+    assert not build_substitution(["5"], "变化 -5")
+    # 同一旧值对应不同的新值时无法确定替换方式
+    assert substitute_values("3 和 3", ["3", "3"], ["4", "5"]) is None
+
+def test_shingles_and_jaccard():
+    assert shingles("ab") == {"ab"}
+    assert shingles("abcd") == {"abc", "bcd"}
+    assert jaccard({"a", "b"}, {"b", "c"}) == pytest.approx(1 / 3)
+    assert jaccard(set(), {"a"}) == 0.0
+
+def test_lsh_band_keys_group_similar_templates():
+    memory = TranslationMemory()
+    base = normalize_template("Free shipping on all orders over $50 this week")[0]
+    similar = normalize_template("Free shipping on all orders over $50 this month")[0]
+    unrelated = normalize_template("The quick brown fox jumps over the lazy dog")[0]
+    keys = memory._band_keys("scope", base)
+    assert len(keys) == memory.bands
+    assert keys == memory._band_keys("scope", base)
+    assert set(keys) & set(memory._band_keys("scope", similar))
+    assert not set(keys) & set(memory._band_keys("scope", unrelated))
+    assert not set(keys) & set(memory._band_keys("other", base))
+
+def test_lsh_buckets_are_bounded(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    from services.cache_service import cache_service
+    monkeypatch.setattr(cache_service, "redis_client", fakeredis.FakeAsyncRedis())
+    monkeypatch.setenv("TM_ENABLED", "true")
+    monkeypatch.setenv("TM_MAX_BUCKET", "3")
+    memory = TranslationMemory()
+    
+    async def run():
+        items = [(f"Free shipping on all orders over the limit, variant {word}", "m", f"译{word}")
+                 for word in ("alpha", "bravo", "charlie", "delta", "echo")]
+        for item in items:
+            await memory.add_many([item], "中文")
+        band_keys = await cache_service.redis_client.keys("*:tm:*:z:*")
+        sizes = [await cache_service.redis_client.zcard(key) for key in band_keys]
+        (_, examples), = await memory.lookup_many(["Free shipping on all orders over the limit, variant foxtrot"], ["m"], "中文")
+        return sizes, examples
+        
+    sizes, examples = asyncio.run(run())
+    # 五个相似句子落入相同的桶，每个桶裁剪到最近的 3 个成员
+    assert sizes and max(sizes) == 3
+    assert examples
@@ -0,0 +1,157 @@
+"""
+上游调用保护测试：AIMD并发窗口、Retry-After 解析、带退避的有限次重试，以及熔断器的 closed -> open -> half_open 状态转换
+"""
+import asyncio
+import httpx
+import pytest
+from services import upstream_limiter as limiter_module
+from services.upstream_limiter import AdaptiveLimiter, CircuitOpenError, UpstreamLimiter, classify_response, parse_retry_after
+
+REQUEST = httpx.Request("POST", "https://upstream.example/v1/chat/completions")
+
+def response(status_code: int, **headers) -> httpx.Response:
+    return httpx.Response(status_code, headers=headers, request=REQUEST)
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    可手动推进的单调时钟
+    """
+    now = [1000.0]
+    monkeypatch.setattr(limiter_module.time, "monotonic", lambda: now[0])
+    return now
+
+def make_limiter(max_limit: int = 8, threshold: int = 3, cooldown: float = 30) -> AdaptiveLimiter:
+    return AdaptiveLimiter("test", max_limit, 1, 0.5, threshold, cooldown)
+
+def test_classify_and_retry_after():
+    assert classify_response(response(200)) == "success"
+    assert classify_response(response(400)) == "success"
+    assert classify_response(response(429)) == "throttled"
+    assert classify_response(response(503)) == "error"
+    assert parse_retry_after(response(429, **{"Retry-After": "2.5"})) == 2.5
+    assert parse_retry_after(response(429, **{"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert parse_retry_after(response(429, **{"Retry-After": "soon"})) is None
+    assert parse_retry_after(response(429)) is None
+
+def test_aimd_window(clock):
+    async def run():
+        limiter = make_limiter(max_limit=8)
+        await limiter.acquire()
+        await limiter.release("throttled")
+        assert limiter.limit == 4
+        # 一秒内的后续429不再缩小窗口
+        await limiter.acquire()
+        await limiter.release("throttled")
+        assert limiter.limit == 4
+        clock[0] += 1
+        await limiter.acquire()
+        await limiter.release("throttled")
+        assert limiter.limit == 2
+        # 成功时每个窗口约增大1
+        for _ in range(2):
+            await limiter.acquire()
+            await limiter.release("success")
+        assert limiter.limit == pytest.approx(2 + 1 / 2 + 1 / 2.5)
+        for _ in range(100):
+            await limiter.acquire()
+            await limiter.release("success")
+        assert limiter.limit == 8
+        return limiter.get_stats()
+        
+    stats = asyncio.run(run())
+    assert (stats["throttled"], stats["decreases"]) == (3, 2)
+
+def test_window_limits_concurrency():
+    async def run():
+        limiter = make_limiter(max_limit=2)
+        await limiter.acquire()
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        await limiter.release("cancelled")
+        await asyncio.wait_for(waiter, 1)
+        return limiter
+        
+    limiter = asyncio.run(run())
+    assert limiter.in_flight == 2
+    assert limiter.limit == 2
+
+def test_circuit_breaker_state_machine(clock):
+    async def run():
+        limiter = make_limiter(threshold=3, cooldown=30)
+        for _ in range(2):
+            await limiter.acquire()
+            await limiter.release("error")
+        assert limiter.state == "closed"
+        await limiter.acquire()
+        await limiter.release("error")
+        assert limiter.state == "open"
+        with pytest.raises(CircuitOpenError):
+            await limiter.acquire()
+        # 冷却结束后半开，只放行一个试探请求
+        clock[0] += 30
+        await limiter.acquire()
+        assert limiter.state == "half_open"
+        assert not limiter._has_capacity()
+        # 试探失败立即重新熔断
+        await limiter.release("error")
+        assert limiter.state == "open"
+        clock[0] += 30
+        await limiter.acquire()
+        await limiter.release("success")
+        assert limiter.state == "closed"
+        return limiter.get_stats()
+        
+    stats = asyncio.run(run())
+    assert (stats["circuit_opens"], stats["fast_failures"], stats["errors"]) == (2, 1, 4)
+
+@pytest.fixture
+def upstream(monkeypatch) -> UpstreamLimiter:
+    monkeypatch.setenv("UPSTREAM_MAX_RETRIES", "2")
+    monkeypatch.setenv("UPSTREAM_RETRY_BASE_MS", "1")
+    monkeypatch.setenv("UPSTREAM_RETRY_MAX_DELAY_MS", "50")
+    return UpstreamLimiter()
+
+def sender(*outcomes):
+    """
+    依次返回给定响应或抛出给定异常的发送函数
+    """
+    outcomes = list(outcomes)
+    calls = []
+    
+    async def send():
+        calls.append(1)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    return send, calls
+
+def test_retries_then_succeeds(upstream: UpstreamLimiter):
+    send, calls = sender(response(503), httpx.ConnectError("boom", request=REQUEST), response(200))
+    result = asyncio.run(upstream.request("p", 4, send))
+    assert result.status_code == 200
+    assert len(calls) == 3
+    assert upstream.get_stats()["retries"] == 2
+
+def test_gives_up_after_max_retries(upstream: UpstreamLimiter):
+    send, calls = sender(response(500), response(502), response(503), response(200))
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(upstream.request("p", 4, send))
+    assert len(calls) == 3
+
+def test_client_errors_are_not_retried(upstream: UpstreamLimiter):
+    send, calls = sender(response(400), response(200))
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(upstream.request("p", 4, send))
+    assert len(calls) == 1
+    assert upstream.get_stats()["providers"]["p"]["errors"] == 0
+
+def test_long_retry_after_is_not_retried(upstream: UpstreamLimiter):
+    send, calls = sender(response(429, **{"Retry-After": "5"}), response(200))
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(upstream.request("p", 4, send))
+    assert len(calls) == 1
+    assert upstream.get_stats()["providers"]["p"]["paused_seconds"] > 0
@@ -0,0 +1,84 @@
+"""
+本地单词词典测试：构建与查询、按源语言和目标语言选择词典、加载时校验文件范围、查询时损坏的文件按未命中处理
+"""
+import struct
+import pytest
+from services.word_dictionary import (
+    SortedStringTable, WordDictionary, build_dictionary, normalize_word, HEADER, OFFSET, DICT_SUFFIX
+)
+
+ENTRIES = [("apple", "苹果"), ("Banana ", "香蕉"), ("ice  cream", "冰淇淋"), ("APPLE", "苹果（水果）"), ("", "空")]
+
+@pytest.fixture
+def dict_path(tmp_path) -> str:
+    """
+    构建一个英文到中文的测试词典
+    """
+    path = str(tmp_path / f"en-zh{DICT_SUFFIX}")
+    build_dictionary(ENTRIES, path, "en", ["中文", "zh"])
+    return path
+
+def test_normalize_word():
+    assert normalize_word("  Ice　 Cream ") == "ice cream"
+
+def test_build_and_lookup(dict_path: str):
+    table = SortedStringTable(dict_path)
+    try:
+        assert table.count == 3
+        assert (table.source_language, table.target_languages) == ("en", ["中文", "zh"])
+        # 规范化后重复的键以后出现的为准
+        assert table.get(normalize_word("Apple").encode("utf-8")) == "苹果（水果）"
+        assert table.get(b"banana") == "香蕉"
+        assert table.get(b"ice cream") == "冰淇淋"
+        assert table.get(b"cherry") is None
+        assert table.get(b"") is None
+    finally:
+        table.close()
+
+def test_build_requires_languages(tmp_path):
+    with pytest.raises(ValueError):
+        build_dictionary(ENTRIES, str(tmp_path / "a.wdict"), "", ["zh"])
+    with pytest.raises(ValueError):
+        build_dictionary(ENTRIES, str(tmp_path / "a.wdict"), "en", [])
+
+def test_lookup_is_keyed_by_source_and_target(dict_path: str, tmp_path, monkeypatch):
+    build_dictionary([("chat", "猫")], str(tmp_path / f"fr-zh{DICT_SUFFIX}"), "fr", ["中文"])
+    build_dictionary([("chat", "聊天")], str(tmp_path / f"en2-zh{DICT_SUFFIX}"), "en", ["中文"])
+    monkeypatch.setenv("WORD_DICT_DIR", str(tmp_path))
+    dictionary = WordDictionary()
+    dictionary.load()
+    try:
+        assert dictionary.lookup_many(["chat", "apple"], "fr", "中文") == ["猫", None]
+        assert dictionary.lookup_many(["chat", "apple"], "en", "中文") == ["聊天", "苹果（水果）"]
+        assert dictionary.lookup_many(["apple"], "en", "zh") == ["苹果（水果）"]
+        assert dictionary.lookup_many(["apple"], None, "中文") == [None]
+        assert dictionary.lookup_many(["apple"], "en", "日本語") == [None]
+    finally:
+        dictionary.close()
+
+@pytest.mark.parametrize("truncate", [4, HEADER.size + 3, -OFFSET.size, -1])
+def test_load_rejects_truncated_files(dict_path: str, truncate: int):
+    with open(dict_path, "rb") as dict_file:
+        data = dict_file.read()
+    with open(dict_path, "wb") as dict_file:
+        dict_file.write(data[:truncate])
+    with pytest.raises(ValueError):
+        SortedStringTable(dict_path)
+
+def test_corrupt_entry_falls_through_to_miss(dict_path: str, tmp_path, monkeypatch):
+    # 把中间一个词条的偏移改到数据区之外，文件大小不变，加载时的范围校验无法发现
+    table = SortedStringTable(dict_path)
+    index_offset = table._index_offset
+    table.close()
+    with open(dict_path, "r+b") as dict_file:
+        dict_file.seek(index_offset + OFFSET.size)
+        dict_file.write(struct.pack("<Q", 1 << 40))
+    monkeypatch.setenv("WORD_DICT_DIR", str(tmp_path))
+    dictionary = WordDictionary()
+    dictionary.load()
+    try:
+        assert dictionary.enabled
+        assert dictionary.lookup_many(["apple", "banana"], "en", "中文") == [None, None]
+        assert dictionary.get_stats()["errors"] == 2
+    finally:
+        dictionary.close()
@@ -0,0 +1,17 @@
+import os
+
+# 布尔型环境变量视为真的取值（不区分大小写）
+_TRUE_VALUES = ("1", "true", "yes", "on")
+
+def env_flag(name: str, default: str = "false") -> bool:
+    """
+    读取布尔型环境变量
+    
+    Args:
+        name: 环境变量名
+        default: 未设置时的默认值
+        
+    Returns:
+        环境变量是否为真值（1、true、yes、on）
+    """
+    return os.getenv(name, default).strip().lower() in _TRUE_VALUES
@@ -0,0 +1,134 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+class LRUCache:
+    """
+    进程内LRU缓存，同时按条目数和字节数限制容量，每个条目带有独立的过期时间
+    """
+    
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        """
+        初始化缓存
+        
+        Args:
+            max_entries: 最大条目数
+            max_bytes: 最大占用字节数（按键和值的UTF-8长度估算）
+            ttl: 默认过期时间（秒）
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # 键 -> (值, 过期时间戳, 占用字节数)
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    @staticmethod
+    def _entry_size(key: str, value: str) -> int:
+        """
+        估算条目占用的字节数
+        
+        Args:
+            key: 缓存键
+            value: 缓存值
+            
+        Returns:
+            键和值的UTF-8字节长度之和
+        """
+        return len(key.encode("utf-8")) + len(value.encode("utf-8"))
+    
+    def _remove(self, key: str) -> None:
+        """
+        删除条目并更新字节计数
+        
+        Args:
+            key: 缓存键
+        """
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        读取缓存，命中时将条目移动到最近使用位置
+        
+        Args:
+            key: 缓存键
+            
+        Returns:
+            缓存值，未命中或已过期时返回None
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        """
+        写入缓存，超出容量时淘汰最久未使用的条目
+        
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期时间（秒），不超过默认过期时间
+        """
+        size = self._entry_size(key, value)
+        if size > self.max_bytes:
+            # 单个条目超过总容量，不进入缓存
+            return
+        if key in self._data:
+            self._remove(key)
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._data[key] = (value, time.monotonic() + ttl, size)
+        self._bytes += size
+        while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+            oldest_key = next(iter(self._data))
+            self._remove(oldest_key)
+            self.evictions += 1
+    
+    def delete(self, key: str) -> None:
+        """
+        删除缓存条目（不存在时忽略）
+        
+        Args:
+            key: 缓存键
+        """
+        if key in self._data:
+            self._remove(key)
+    
+    def clear(self) -> None:
+        """
+        清空缓存
+        """
+        self._data.clear()
+        self._bytes = 0
+    
+    def get_stats(self) -> Dict[str, int]:
+        """
+        获取缓存统计信息
+        
+        Returns:
+            命中、未命中、淘汰、过期次数以及当前条目数和字节数
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes
+        }
@@ -19,6 +19,12 @@ class TranslateResponse(BaseModel):
     translated: str
     segments: List[TranslatedSegment]
 
+class TextStreamRequest(BaseModel):
+    text: str
+    target: str
+    model: Optional[str] = "qwen-turbo-latest"
+    extra_args: Optional[Dict[str, Any]] = None
+
 # 单词翻译相关模型
 class WordItem(BaseModel):
     id: str
@@ -27,6 +33,7 @@ class WordItem(BaseModel):
 class WordTranslateRequest(BaseModel):
     word: List[WordItem]
     target: Optional[str] = "中文"
+    source: Optional[str] = None  # 源语言，只用于选择本地单词词典
     model: Optional[str] = "qwen-turbo-latest"
     extra_args: Optional[Dict[str, Any]] = None
 
@@ -43,4 +50,10 @@ class OCRRequest(BaseModel):
 
 class OCRResponse(BaseModel):
     detected_text: List[Dict[str, Any]]  # 检测到的文本列表，包括文本内容和位置信息
-    full_text: str  # 完整的识别文本
\ No newline at end of file
+    full_text: str  # 完整的识别文本
+    cached: bool = False  # 是否命中OCR结果缓存
+
+class OCRBatchResponse(BaseModel):
+    results: Dict[str, OCRResponse]  # 客户端图片ID -> 该图片的OCR识别结果
+    elapsed_seconds: float  # 整批处理耗时（秒）
+    images_per_second: float  # 整批处理吞吐量（张/秒）
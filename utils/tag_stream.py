@@ -0,0 +1,141 @@
+from typing import List
+
+class TagStreamExtractor:
+    """
+    增量标签提取器：从分块到达的模型输出中提取 <tag>...</tag> 内的内容，
+    检测到开始标签后立即逐块输出。标签完整闭合时，结果与对完整输出做 re.search 后 strip() 一致；
+    没有出现开始标签时返回完整原始输出，与非流式的回退行为一致；
+    出现开始标签但输出结束时仍未闭合时，返回开始标签之后的内容（去除末尾残缺的结束标签），
+    此时非流式会回退为完整原始输出，两者不一致，调用方可通过 complete 判断是否应写入共享缓存
+    """
+    
+    def __init__(self, tag: str):
+        """
+        初始化提取器
+        
+        Args:
+            tag: 标签名，如 "translated_text"
+        """
+        self.open_tag = f"<{tag}>"
+        self.close_tag = f"</{tag}>"
+        # 开始标签出现之前的原始输出（未找到标签时作为完整结果返回）
+        self._raw = ""
+        # 开始标签之后、尚未输出的内容（可能是结束标签的前缀或末尾空白）
+        self._pending = ""
+        self._opened = False
+        self._closed = False
+        # 是否读到了完整的结束标签（finish 时强制结束不算）
+        self._close_seen = False
+        # 是否已输出过非空内容，用于去除开头的空白
+        self._started = False
+        self._parts: List[str] = []
+    
+    def feed(self, chunk: str) -> str:
+        """
+        输入一块模型输出
+        
+        Args:
+            chunk: 新到达的输出片段
+            
+        Returns:
+            本次可以输出的内容（可能为空字符串）
+        """
+        if self._closed or not chunk:
+            return ""
+        if not self._opened:
+            self._raw += chunk
+            position = self._raw.find(self.open_tag)
+            if position < 0:
+                return ""
+            self._opened = True
+            chunk = self._raw[position + len(self.open_tag):]
+        return self._consume(chunk)
+    
+    def _consume(self, chunk: str) -> str:
+        """
+        处理开始标签之后的内容，保留可能属于结束标签或末尾空白的部分
+        
+        Args:
+            chunk: 开始标签之后的新内容
+            
+        Returns:
+            本次可以输出的内容
+        """
+        self._pending += chunk
+        position = self._pending.find(self.close_tag)
+        if position >= 0:
+            self._closed = True
+            self._close_seen = True
+            return self._emit(self._pending[:position].rstrip())
+            
+        # 末尾可能是结束标签的前缀，暂不输出
+        hold = self._partial_close_length(self._pending)
+        ready = self._pending[:len(self._pending) - hold]
+        # 末尾空白可能是结果的结尾，等到后面出现非空白内容再输出
+        stripped = ready.rstrip()
+        self._pending = ready[len(stripped):] + self._pending[len(ready):]
+        return self._emit(stripped)
+    
+    def _partial_close_length(self, text: str) -> int:
+        """
+        计算文本末尾与结束标签前缀重合的长度
+        
+        Args:
+            text: 待检查的文本
+            
+        Returns:
+            末尾属于结束标签前缀的字符数，不重合时为 0
+        """
+        for length in range(min(len(self.close_tag) - 1, len(text)), 0, -1):
+            if self.close_tag.startswith(text[-length:]):
+                return length
+        return 0
+    
+    def _emit(self, text: str) -> str:
+        """
+        记录并返回要输出的内容，去除结果开头的空白
+        
+        Args:
+            text: 待输出内容
+            
+        Returns:
+            实际输出的内容
+        """
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+        self._parts.append(text)
+        return text
+    
+    def finish(self) -> str:
+        """
+        输出结束时调用，返回剩余需要输出的内容
+        
+        Returns:
+            剩余内容；始终没有出现开始标签时返回完整原始输出（与非流式的向后兼容行为一致），
+            开始标签未闭合时丢弃末尾残缺的结束标签
+        """
+        if not self._opened:
+            self._parts = [self._raw]
+            return self._raw
+        if not self._closed:
+            self._closed = True
+            remaining = self._pending[:len(self._pending) - self._partial_close_length(self._pending)]
+            return self._emit(remaining.rstrip())
+        return ""
+    
+    @property
+    def complete(self) -> bool:
+        """
+        结果是否与非流式解析一致：出现了完整的结束标签，或始终没有出现开始标签
+        """
+        return not self._opened or self._close_seen
+    
+    @property
+    def text(self) -> str:
+        """
+        已输出内容的完整拼接结果
+        """
+        return "".join(self._parts)
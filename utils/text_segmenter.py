@@ -0,0 +1,132 @@
+import re
+import html
+import unicodedata
+from typing import List
+
+# 不可见的格式字符（零宽空格、零宽连接符、BOM等），规范化时删除
+_INVISIBLE_PATTERN = re.compile("[\u200b\u200c\u200d\u2060\ufeff\u00ad]")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+# 行内连续空白（不含换行）及行尾空白，保留换行时使用；行首缩进不合并
+_INLINE_WHITESPACE_PATTERN = re.compile(r"(?<=\S)[^\S\n]+")
+_TRAILING_WHITESPACE_PATTERN = re.compile(r"[^\S\n]+(?=\n)")
+_LINE_BREAK_PATTERN = re.compile(r"\r\n?|[\u2028\u2029\x85]")
+
+# 中文句末标点（可连续出现，如“！？”、“……”），之后可跟右引号或右括号，无需空白即可断句
+_CJK_BOUNDARY_PATTERN = re.compile("[。！？；…]+[”’」』）》\"')\\]]*")
+# 西文句末标点，之后可跟右引号或右括号，且必须跟空白才断句（避免拆开 3.14、example.com 等）
+_LATIN_BOUNDARY_PATTERN = re.compile("[.!?;]+[”’\"')\\]]*(?=\\s)")
+
+# 前一个词以这些字符结尾时，紧随其后的“数字 + 句点”视为列表序号（1. First. 2. Second.）
+_SENTENCE_END_CHARS = ".!?;。！？；…”’」』）》\"')]"
+
+# 以句点结尾但通常不表示句子结束的缩写（小写比较）
+ABBREVIATIONS = frozenset((
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "cf", "no", "vol",
+    "fig", "p", "pp", "inc", "ltd", "co", "corp", "jan", "feb", "mar", "apr", "jun", "jul", "aug",
+    "sep", "sept", "oct", "nov", "dec", "u.s", "u.k", "a.m", "p.m"
+))
+
+# 句子末尾的中日韩字符或全角标点，拼接译文时其后不加空格
+_CJK_END_PATTERN = re.compile("[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]$")
+
+def normalize_text(text: str, collapse_newlines: bool = False) -> str:
+    """
+    规范化文本：解码HTML实体、Unicode NFC规范化、删除不可见字符，合并行内连续空白（包括不间断空格）并去除行尾空白；
+    统一换行符并保留换行，开启 collapse_newlines 时换行也与其他空白一起合并为一个空格（会改变原文的分行排版）
+    
+    Args:
+        text: 原始文本
+        collapse_newlines: 是否把换行也合并为空格
+        
+    Returns:
+        规范化后的文本；规范化后为空时返回原文
+    """
+    normalized = html.unescape(text) if "&" in text else text
+    normalized = unicodedata.normalize("NFC", normalized)
+    normalized = _INVISIBLE_PATTERN.sub("", normalized)
+    if collapse_newlines:
+        normalized = _WHITESPACE_PATTERN.sub(" ", normalized)
+    else:
+        normalized = _LINE_BREAK_PATTERN.sub("\n", normalized)
+        normalized = _INLINE_WHITESPACE_PATTERN.sub(" ", normalized)
+        normalized = _TRAILING_WHITESPACE_PATTERN.sub("", normalized)
+    normalized = normalized.strip()
+    return normalized or text
+
+def _is_abbreviation(text: str, end: int) -> bool:
+    """
+    判断位置 end 处的句点是否属于缩写、单个字母的首字母缩写或列表序号
+    
+    Args:
+        text: 文本
+        end: 句点的位置
+        
+    Returns:
+        是否不应在此断句
+    """
+    start = end
+    while start > 0 and not text[start - 1].isspace():
+        start -= 1
+    token = text[start:end].lstrip("(\"'“‘").lower()
+    if token in ABBREVIATIONS:
+        return True
+    # 单个字母（J. K. Rowling）
+    if len(token) == 1 and token.isalpha():
+        return True
+    if not token.isdigit():
+        return False
+    # 列表序号（1. 2. ...）：位于段首、行首或上一句的句末标点之后
+    before = text[:start]
+    stripped = before.rstrip()
+    return not stripped or "\n" in before[len(stripped):] or stripped[-1] in _SENTENCE_END_CHARS
+
+def split_sentences(text: str, min_chars: int = 0) -> List[str]:
+    """
+    按中文和西文句末标点把文本拆分为句子，句末标点保留在句子中，句间空白被丢弃
+    
+    Args:
+        text: 规范化后的文本
+        min_chars: 文本长度低于该值时不拆分
+        
+    Returns:
+        句子列表（至少包含一个元素），拼接顺序与原文一致
+    """
+    if len(text) < min_chars:
+        return [text]
+    boundaries = [match.end() for match in _CJK_BOUNDARY_PATTERN.finditer(text)]
+    for match in _LATIN_BOUNDARY_PATTERN.finditer(text):
+        if text[match.start()] == "." and match.end() - match.start() == 1 and _is_abbreviation(text, match.start()):
+            continue
+        boundaries.append(match.end())
+        
+    sentences = []
+    start = 0
+    for end in sorted(set(boundaries)):
+        sentence = text[start:end].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = end
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences or [text]
+
+def join_sentences(sentences: List[str]) -> str:
+    """
+    按顺序拼接逐句翻译的结果：前一句以中日韩字符或全角标点结尾时直接相连，否则以空格分隔
+    
+    Args:
+        sentences: 各句的译文
+        
+    Returns:
+        拼接后的文本
+    """
+    parts = []
+    for sentence in sentences:
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if parts and not _CJK_END_PATTERN.search(parts[-1]):
+            parts.append(" ")
+        parts.append(sentence)
+    return "".join(parts)